@@ -1,22 +1,125 @@
 import os
+import math
 import subprocess
 import threading
 import pandas as pd
 import time
 import collections
+import uuid
+import json
+import tempfile
 from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask_sock import Sock
 from patterns.grb_tester import light_tree
+from patterns.control import CONTROL_ENV, send_params
+from patterns.spiral_palette import THEMES
+from patterns.framebus import PreviewHub, encode_delta
 from rpi_ws281x import PixelStrip, Color
 from ambient_brightness import read_lux, map_lux_to_brightness
 
 app = Flask(__name__)
+sock = Sock(app)
 
 BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV   = os.path.join(BASE_DIR, 'coordinates.csv')
 PATTERNS_DIR = os.path.join(BASE_DIR, 'patterns')
+PREVIEW_FPS  = 20     # default preview rate; clients may ask for up to 60
+PLAYLISTS_DIR = os.path.join(BASE_DIR, 'playlists')
+LED_COUNT    = len(pd.read_csv(COORDS_CSV))
 
 task_process = None
 grb_thread   = None
+current      = None   # pattern started through the JSON API: name, params, control socket
+
+def _param(kind, default, live=False, **limits):
+    """
+    One entry of a pattern's parameter schema. kind is int, float, bool,
+    rgb or choice (with choices=[...]); min/max bound numbers. Live params
+    are pushed to the running pattern, the rest relaunch it.
+    """
+    return dict(type=kind, default=default, live=live, **limits)
+
+# Parameter schema per pattern for the JSON API. Names are the script's
+# argparse dests; the flag is --name with dashes.
+PATTERNS = {
+    'compass': ('compass_rose.py', {
+        'num_slices':        _param('int', 8, min=1, max=64),
+        'width':             _param('int', 1, live=True, min=1, max=64),
+        'rps':               _param('float', 0.2, live=True, min=-5.0, max=5.0),
+        'interval':          _param('float', 0.05, live=True, min=0.005, max=1.0),
+        'color':             _param('rgb', [255, 255, 255], live=True),
+        'reverse':           _param('bool', False, live=True),
+        'soft':              _param('bool', False, live=True),
+    }),
+    'voronoi': ('voronoi_bloom.py', {
+        'num_seeds':         _param('int', 5, min=1, max=50),
+        'interval':          _param('float', 0.1, min=0.005, max=1.0),
+        'change_interval':   _param('float', 10.0, min=0.1, max=600.0),
+        'transition':        _param('float', 2.0, min=0.0, max=60.0),
+    }),
+    'platonic': ('rotating_platonic.py', {
+        'shape':             _param('choice', 'tetra', choices=['tetra', 'cube', 'icosa']),
+        'interval':          _param('float', 0.05, min=0.005, max=1.0),
+        'speed':             _param('float', 0.1, min=-5.0, max=5.0),
+        'threshold':         _param('float', 0.2, min=0.0, max=1.0),
+        'vertex_color':      _param('rgb', [255, 0, 0]),
+        'edge_color':        _param('rgb', [0, 0, 255]),
+        'show_edges':        _param('bool', False),
+    }),
+    'twister': ('twister.py', {
+        'interval':          _param('float', 0.05, live=True, min=0.005, max=1.0),
+        'rotations_per_sec': _param('float', 0.2, live=True, min=-5.0, max=5.0),
+        'turns':             _param('float', 3.0, live=True, min=0.0, max=20.0),
+        'range':             _param('float', 1.0, live=True, min=0.0, max=1.0),
+        'reverse':           _param('bool', False, live=True),
+    }),
+    'snake': ('snake.py', {
+        'num_snakes':        _param('int', 1, min=1, max=20),
+        'length':            _param('int', 15, min=1, max=200),
+        'delay':             _param('float', 0.1, min=0.005, max=1.0),
+        'neighbors':         _param('int', 6, min=1, max=20),
+        'min_bright':        _param('int', 50, min=0, max=255),
+        'max_bright':        _param('int', 255, min=0, max=255),
+    }),
+    'random_plane': ('random_plane.py', {}),
+    'contagious':   ('covid.py', {}),
+    'fireworks':    ('fireworks.py', {}),
+    'pulse': ('pulse.py', {
+        'center':            _param('int', None, min=0, max=LED_COUNT - 1),
+        'interval':          _param('float', 0.05, live=True, min=0.005, max=1.0),
+        'speed':             _param('float', 10.0, live=True, min=0.1, max=200.0),
+        'thickness':         _param('float', 0.1, live=True, min=0.01, max=1.0),
+        'color':             _param('rgb', [255, 255, 255], live=True),
+        'period':            _param('float', None, min=0.05, max=60.0),
+        'random_centers':    _param('bool', False),
+        'random_colors':     _param('bool', False, live=True),
+        'blend':             _param('choice', 'max', live=True, choices=['max', 'add']),
+    }),
+    'helix': ('helix.py', {
+        'interval':          _param('float', 0.05, live=True, min=0.005, max=1.0),
+        'rps':               _param('float', 0.2, live=True, min=-5.0, max=5.0),
+        'turns':             _param('float', 3.0, live=True, min=0.0, max=20.0),
+        'color1':            _param('rgb', [255, 0, 0], live=True),
+        'color2':            _param('rgb', [0, 0, 255], live=True),
+        'reverse':           _param('bool', False, live=True),
+        'range':             _param('float', 1.0, live=True, min=0.0, max=1.0),
+        'strands':           _param('int', 2, min=1, max=12),
+    }),
+    'heartbeat': ('heartbeat.py', {
+        'period':            _param('float', 1.0, live=True, min=0.2, max=5.0),
+        'min_intensity':     _param('int', 20, live=True, min=0, max=255),
+        'max_intensity':     _param('int', 255, live=True, min=0, max=255),
+        'frame_delay':       _param('float', 0.02, live=True, min=0.005, max=1.0),
+        'spatial':           _param('bool', False),
+        'wave_speed':        _param('float', 20.0, min=0.1, max=200.0),
+    }),
+    'spiral_themes': ('spiral_themes.py', {
+        'theme':             _param('choice', 'gwu', live=True, choices=sorted(THEMES) + ['rainbow']),
+        'interval':          _param('float', 0.05, live=True, min=0.005, max=1.0),
+        'speed':             _param('float', 1.5, live=True, min=-20.0, max=20.0),
+        'spiral_factor':     _param('float', 12.566, live=True, min=0.0, max=100.0),
+    }),
+}
 
 def clear_all_leds():
     """Instantiate the strip and turn every LED off immediately."""
@@ -51,11 +154,80 @@ def run_grb_test():
     grb_thread.start()
     return redirect(url_for('index'))
 
-def _start_pattern(cmd):
+def _drop_current():
+    """Forget the API-started pattern and remove its control socket."""
+    global current
+    if current and os.path.exists(current['socket']):
+        os.unlink(current['socket'])
+    current = None
+
+def _start_pattern(cmd, env=None):
     global task_process
     if task_process:
         task_process.terminate()
-    task_process = subprocess.Popen(cmd)
+    _drop_current()
+    task_process = subprocess.Popen(cmd, env=env)
+
+def _coerce(name, spec, value):
+    """Check one API value against its schema entry; raises ValueError."""
+    kind = spec['type']
+    if value is None and spec['default'] is None:
+        return None
+    if kind == 'bool':
+        if not isinstance(value, bool):
+            raise ValueError("%s must be true or false" % name)
+        return value
+    if kind == 'rgb':
+        if (not isinstance(value, list) or len(value) != 3
+                or not all(type(c) is int and 0 <= c <= 255 for c in value)):
+            raise ValueError("%s must be [r, g, b] with 0-255 integers" % name)
+        return value
+    if kind == 'choice':
+        if value not in spec['choices']:
+            raise ValueError("%s must be one of %s" % (name, ", ".join(spec['choices'])))
+        return value
+    # JSON numbers only: no bools, strings, NaN or infinities.
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("%s must be a number" % name)
+    if kind == 'int':
+        if value != int(value):
+            raise ValueError("%s must be an integer" % name)
+        value = int(value)
+    else:
+        value = float(value)
+    if ('min' in spec and value < spec['min']) or ('max' in spec and value > spec['max']):
+        raise ValueError("%s must be between %s and %s" % (name, spec.get('min'), spec.get('max')))
+    return value
+
+def _validate(name, values):
+    """Validated copy of the API values for pattern `name`; raises ValueError."""
+    schema = PATTERNS[name][1]
+    unknown = sorted(set(values) - set(schema))
+    if unknown:
+        raise ValueError("unknown parameter(s) for %s: %s" % (name, ", ".join(unknown)))
+    return {key: _coerce(key, schema[key], value) for key, value in values.items()}
+
+def _pattern_argv(name, params):
+    script, schema = PATTERNS[name]
+    cmd = ['python3', os.path.join(PATTERNS_DIR, script)]
+    for key, value in params.items():
+        flag = '--' + key.replace('_', '-')
+        if value is None or value is False:
+            continue
+        if value is True:
+            cmd.append(flag)
+        elif schema[key]['type'] == 'rgb':
+            cmd.extend([flag] + [str(c) for c in value])
+        else:
+            cmd.extend([flag, str(value)])
+    return cmd
+
+def _launch(name, params):
+    """Start a pattern with a fresh control socket and remember it as current."""
+    global current
+    path = os.path.join(tempfile.gettempdir(), 'xmas-control-%s.sock' % uuid.uuid4().hex[:8])
+    _start_pattern(_pattern_argv(name, params), env=dict(os.environ, **{CONTROL_ENV: path}))
+    current = {'name': name, 'params': params, 'socket': path}
 
 @app.route('/run_compass', methods=['POST'])
 def run_compass():
@@ -203,12 +375,182 @@ def run_heartbeat():
     _start_pattern(cmd)
     return redirect(url_for('index'))
 
+@app.route('/run_spiral_themes', methods=['POST'])
+def run_spiral_themes():
+    cmd = [
+        'python3', os.path.join(PATTERNS_DIR, 'spiral_themes.py'),
+        '--theme',         request.form.get('theme', 'gwu'),
+        '--interval',      request.form.get('interval_s', '0.05'),
+        '--speed',         request.form.get('speed_s', '1.5'),
+        '--spiral-factor', request.form.get('spiral_factor', '12.566'),
+    ]
+    _start_pattern(cmd)
+    return redirect(url_for('index'))
+
+def _send_live(values, wait=3.0):
+    """
+    Push values to the running pattern's control socket, waiting up to
+    `wait` seconds for a freshly started pattern to bind it.
+    """
+    deadline = time.time() + wait
+    while task_process and task_process.poll() is None:
+        if send_params(current['socket'], values):
+            return True
+        if time.time() > deadline:
+            break
+        time.sleep(0.05)
+    return False
+
+@app.route('/api/patterns', methods=['GET'])
+def api_patterns():
+    return jsonify({
+        'patterns': {name: params for name, (script, params) in PATTERNS.items()},
+        'current':  current and {'name': current['name'], 'params': current['params']}
+    })
+
+@app.route('/api/patterns/<name>', methods=['POST'])
+def api_start_pattern(name):
+    if name not in PATTERNS:
+        return jsonify({'error': 'unknown pattern: %s' % name}), 404
+    try:
+        values = _validate(name, request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    params = {key: spec['default'] for key, spec in PATTERNS[name][1].items()}
+    params.update(values)
+    _launch(name, params)
+    return jsonify({'name': name, 'params': params})
+
+@app.route('/api/patterns/current', methods=['GET'])
+def api_current_pattern():
+    if current is None:
+        return jsonify({'error': 'no pattern started through the API is running'}), 404
+    return jsonify({'name': current['name'], 'params': current['params']})
+
+@app.route('/api/patterns/current', methods=['PATCH'])
+def api_update_pattern():
+    """
+    Change parameters of the running pattern. Live parameters are sent over
+    its control socket and show up on the next frame; changing any other
+    parameter relaunches the pattern.
+    """
+    if current is None:
+        return jsonify({'error': 'no pattern started through the API is running'}), 409
+    name = current['name']
+    try:
+        values = _validate(name, request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    params = dict(current['params'], **values)
+    schema = PATTERNS[name][1]
+    if all(schema[key]['live'] for key in values) and _send_live(values):
+        current['params'] = params
+        applied = 'live'
+    else:
+        # Not live-adjustable, or the pattern has exited: relaunch.
+        _launch(name, params)
+        applied = 'restart'
+    return jsonify({'name': name, 'params': params, 'applied': applied})
+
+def _check_window(window, what):
+    try:
+        if window is not None:
+            if len(window) != 2:
+                raise ValueError
+            for w in window:
+                h, m = w.split(':')
+                if not (0 <= int(h) < 24 and 0 <= int(m) < 60):
+                    raise ValueError
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError('%s must be ["HH:MM", "HH:MM"]' % what)
+
+def _seconds(value, what, allow_zero=False):
+    """A positive (or zero), finite number of seconds from a playlist spec; raises ValueError."""
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or not math.isfinite(value) or value < 0 or (value == 0 and not allow_zero)):
+        raise ValueError('%s must be a %s number of seconds'
+                         % (what, 'non-negative' if allow_zero else 'positive'))
+    return float(value)
+
+def _resolve_playlist(spec):
+    """
+    Validate a playlist spec and turn each entry's pattern and params into
+    the command line the runner (patterns/playlist.py) starts; raises
+    ValueError.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('playlist must be a JSON object')
+    if spec.get('order', 'sequential') not in ('sequential', 'shuffle'):
+        raise ValueError('order must be sequential or shuffle')
+    _check_window(spec.get('hours'), 'hours')
+    transition = _seconds(spec.get('transition', 3.0), 'transition', allow_zero=True)
+    preload = _seconds(spec.get('preload', 10.0), 'preload')
+    if not isinstance(spec.get('entries', []), list):
+        raise ValueError('entries must be a list')
+    entries = []
+    for n, e in enumerate(spec.get('entries') or []):
+        if not isinstance(e, dict):
+            raise ValueError('entry %d must be an object' % (n + 1))
+        name = e.get('pattern')
+        if not isinstance(name, str) or name not in PATTERNS:
+            raise ValueError('entry %d: unknown pattern: %s' % (n + 1, name))
+        if not isinstance(e.get('params', {}), dict):
+            raise ValueError('entry %d: params must be an object' % (n + 1))
+        params = {key: p['default'] for key, p in PATTERNS[name][1].items()}
+        params.update(_validate(name, e.get('params', {})))
+        duration = _seconds(e.get('duration', 60), 'entry %d: duration' % (n + 1))
+        _check_window(e.get('between'), 'entry %d: between' % (n + 1))
+        entries.append({'name': name, 'cmd': _pattern_argv(name, params),
+                        'duration': duration, 'between': e.get('between')})
+    if not entries:
+        raise ValueError('playlist has no entries')
+    return {'order': spec.get('order', 'sequential'), 'hours': spec.get('hours'),
+            'transition': transition, 'preload': preload, 'entries': entries}
+
+def _play(spec):
+    resolved = _resolve_playlist(spec)
+    fd, path = tempfile.mkstemp(prefix='xmas-playlist-', suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(resolved, f)
+    _start_pattern(['python3', os.path.join(PATTERNS_DIR, 'playlist.py'), '--playlist', path])
+    return resolved
+
+@app.route('/api/playlists', methods=['GET'])
+def api_playlists():
+    if not os.path.isdir(PLAYLISTS_DIR):
+        return jsonify({'playlists': []})
+    return jsonify({'playlists': sorted(f[:-5] for f in os.listdir(PLAYLISTS_DIR) if f.endswith('.json'))})
+
+@app.route('/api/playlists/<name>', methods=['POST'])
+def api_play_saved_playlist(name):
+    """Play playlists/<name>.json."""
+    path = os.path.join(PLAYLISTS_DIR, os.path.basename(name) + '.json')
+    if not os.path.exists(path):
+        return jsonify({'error': 'unknown playlist: %s' % name}), 404
+    with open(path) as f:
+        spec = json.load(f)
+    try:
+        resolved = _play(spec)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'playlist': name, 'entries': [e['name'] for e in resolved['entries']]})
+
+@app.route('/api/playlist', methods=['POST'])
+def api_play_playlist():
+    """Play a playlist spec sent as the JSON body."""
+    try:
+        resolved = _play(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'entries': [e['name'] for e in resolved['entries']]})
+
 @app.route('/all_off', methods=['POST'])
 def all_off():
     global task_process
     if task_process:
         task_process.terminate()
         task_process = None
+    _drop_current()
     clear_all_leds()
     return redirect(url_for('index'))
 
@@ -218,12 +560,69 @@ def stop():
     if task_process:
         task_process.terminate()
         task_process = None
+    _drop_current()
     return redirect(url_for('index'))
 
 @app.route('/dashboard')
 def dashboard():
     return render_template('dashboard.html')
 
+@app.route('/preview')
+def preview():
+    return render_template('preview.html')
+
+@app.route('/api/geometry')
+def api_geometry():
+    df = pd.read_csv(COORDS_CSV)
+    return jsonify({'positions': df[['X', 'Y', 'Z']].values.tolist()})
+
+preview_hub = PreviewHub(LED_COUNT)   # idle until the first client joins
+
+def _preview_fps(value, fallback):
+    """Requested preview rate clamped to 1..max_fps; fallback if unparseable."""
+    try:
+        fps = float(value)
+    except (TypeError, ValueError):
+        return fallback
+    if not math.isfinite(fps):
+        return fallback
+    return min(max(fps, 1.0), preview_hub.max_fps)
+
+@sock.route('/preview/stream')
+def preview_stream(ws):
+    """
+    Stream the frames shown on the tree as binary messages (see
+    patterns/framebus.py for the key/delta layout), decimated to the
+    client's ?fps=; ?delta=0 sends whole frames only. A JSON stats message
+    with the pattern's own frame rate follows about once a second, and the
+    client may send {"fps": n} to change its rate.
+    """
+    fps   = _preview_fps(request.args.get('fps'), PREVIEW_FPS)
+    delta = request.args.get('delta', '1') != '0'
+    preview_hub.join()
+    try:
+        last_seq, last_rgb, next_stats = None, None, 0.0
+        while True:
+            msg = ws.receive(timeout=0)
+            if msg:
+                try:
+                    update = json.loads(msg)
+                except ValueError:
+                    update = None
+                if isinstance(update, dict):
+                    fps = _preview_fps(update.get('fps'), fps)
+            latest = preview_hub.latest
+            if latest is not None and latest[0] != last_seq:
+                seq, rgb, key = latest
+                ws.send(encode_delta(rgb, last_rgb) if delta and last_rgb is not None else key)
+                last_seq, last_rgb = seq, rgb
+            if time.time() >= next_stats:
+                ws.send(preview_hub.stats())
+                next_stats = time.time() + 1.0
+            time.sleep(1.0 / fps)
+    finally:
+        preview_hub.leave()
+
 MAX_POINTS = 100
 timestamps  = collections.deque(maxlen=MAX_POINTS)
 lux_values  = collections.deque(maxlen=MAX_POINTS)
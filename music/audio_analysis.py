@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Offline audio analysis with an on-disk feature cache.
+
+A track is decoded block by block (audio_stream.PCMStream) and its STFT is
+computed in batches of frames with one strided view and one rfft per batch.
+Per frame we keep the log-band energies the visualizer maps onto LEDs, the
+RMS and the dominant-frequency position; from the band energies we derive an
+onset-strength envelope, onset times, a tempo estimate and beat times.
+
+Results are stored as a compressed .npz in CACHE_DIR, named after the SHA-1
+of the audio file and the analysis settings, so playback only has to index
+precomputed rows by timestamp. New tracks can be analysed in the background
+through a process pool.
+
+Usage: python3 audio_analysis.py audio/*.mp3
+       python3 audio_analysis.py --check-tempo
+"""
+import os
+import sys
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from audio_stream import PCMStream
+from spectrum import log_filterbank
+
+CACHE_DIR      = 'analysis_cache'
+SAMPLE_RATE    = 44100
+CHUNK_SIZE     = 1024
+HOP_SIZE       = 1024
+BATCH_FRAMES   = 256
+TEMPO_RANGE    = (60.0, 180.0)   # BPM searched by the tempo estimate
+ONSET_DELTA    = 0.07            # onset threshold above the local mean
+ONSET_GAP      = 0.1             # minimum seconds between onsets
+OCTAVE_RATIO   = 0.6             # autocorrelation at half the period to prefer it
+COMB_RATIO     = 1.2             # comb energy at twice the period to prefer it
+
+
+def file_hash(path, block=1 << 20):
+    """SHA-1 hex digest of a file, read in 1 MB blocks."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(block), b''):
+            h.update(data)
+    return h.hexdigest()
+
+
+def cache_path(path, n_bands, chunk_size=CHUNK_SIZE, hop=HOP_SIZE, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, "%s-%db%dc%dh.npz" % (file_hash(path), n_bands, chunk_size, hop))
+
+
+def stft_features(blocks, n_bands, sample_rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE,
+                  hop=HOP_SIZE, batch=BATCH_FRAMES):
+    """
+    Band energies (float16), RMS and normalized dominant bin for every
+    `hop`-spaced frame of the sample blocks. Frames are gathered into a
+    buffer of `batch` frames and transformed together.
+    """
+    if hop > chunk_size:
+        raise ValueError("hop must not exceed chunk_size")
+    window = np.hanning(chunk_size).astype(np.float32)
+    fb = log_filterbank(n_bands, chunk_size, sample_rate)
+    buf = np.empty(hop * (batch - 1) + chunk_size, dtype=np.float32)
+    fill = 0
+    bands, rms, dominant = [], [], []
+
+    def flush():
+        nonlocal fill
+        if fill < chunk_size:
+            return
+        frames = sliding_window_view(buf[:fill], chunk_size)[::hop]
+        mag = np.abs(np.fft.rfft(frames * window, axis=1))
+        bands.append((mag @ fb.T).astype(np.float16))
+        rms.append(np.sqrt(np.mean(frames**2, axis=1)))
+        dominant.append(np.argmax(mag, axis=1) / (mag.shape[1] - 1))
+        used = len(frames) * hop
+        buf[:fill - used] = buf[used:fill]
+        fill -= used
+
+    for block in blocks:
+        pos = 0
+        while pos < len(block):
+            n = min(len(block) - pos, len(buf) - fill)
+            buf[fill:fill + n] = block[pos:pos + n]
+            fill += n
+            pos += n
+            if fill == len(buf):
+                flush()
+    flush()
+
+    if not bands:
+        return (np.zeros((0, n_bands), np.float16), np.zeros(0, np.float32),
+                np.zeros(0, np.float32))
+    return (np.concatenate(bands), np.concatenate(rms).astype(np.float32),
+            np.concatenate(dominant).astype(np.float32))
+
+
+def onset_envelope(bands):
+    """Half-wave rectified log spectral flux, normalized to [0, 1]."""
+    logb = np.log1p(100.0 * bands.astype(np.float32))
+    env = np.zeros(len(bands), dtype=np.float32)
+    env[1:] = np.maximum(np.diff(logb, axis=0), 0).sum(axis=1)
+    peak = env.max() if len(env) else 0
+    return env / peak if peak > 0 else env
+
+
+def _moving(x, radius, fn):
+    padded = np.pad(x, radius, mode='edge')
+    return fn(sliding_window_view(padded, 2 * radius + 1), axis=1)
+
+
+def pick_onsets(env, frame_rate, delta=ONSET_DELTA, min_gap=ONSET_GAP):
+    """Frame indices of local maxima that clear the local mean by `delta`."""
+    if len(env) < 3:
+        return np.zeros(0, dtype=np.int64)
+    is_peak = env >= _moving(env, 3, np.max)
+    strong = env > _moving(env, 16, np.mean) + delta
+    cand = np.flatnonzero(is_peak & strong)
+    keep, last = [], -np.inf
+    gap = min_gap * frame_rate
+    for i in cand:
+        if i - last >= gap:
+            keep.append(i)
+            last = i
+    return np.asarray(keep, dtype=np.int64)
+
+
+def _peak_lag(ac, lag, lo, hi):
+    """Sub-frame position of the autocorrelation peak nearest integer `lag`."""
+    lag = int(np.clip(lag, lo, hi))
+    while lo < lag < hi and ac[lag + 1] > ac[lag]:
+        lag += 1
+    while lo < lag < hi and ac[lag - 1] > ac[lag]:
+        lag -= 1
+    if 0 < lag < len(ac) - 1:
+        a, b, c = ac[lag - 1], ac[lag], ac[lag + 1]
+        denom = a - 2 * b + c
+        if denom != 0:
+            return lag + 0.5 * (a - c) / denom
+    return float(lag)
+
+
+def _comb_strength(env, period):
+    """Mean envelope along the best-aligned comb of spacing `period` frames."""
+    peak = _moving(env, 1, np.max)
+    teeth = np.arange(int(len(env) / period)) * period
+    best = 0.0
+    for ph in range(int(np.ceil(period))):
+        idx = np.rint(ph + teeth).astype(np.int64)
+        idx = idx[idx < len(env)]
+        if len(idx):
+            best = max(best, float(peak[idx].mean()))
+    return best
+
+
+def estimate_tempo(env, frame_rate, bpm_range=TEMPO_RANGE):
+    """
+    Beat period in frames from the onset envelope's autocorrelation,
+    weighted toward 120 BPM. The envelope is Gaussian-smoothed first so beat
+    periods that are not a whole number of frames still give a single clear
+    peak.
+
+    The weighting alone doesn't stop octave errors: a period whose half also
+    autocorrelates about as strongly is replaced by that half, and a period
+    whose double collects clearly more onset energy along a comb (on-beats
+    with weak off-beats) is doubled.
+    """
+    kernel = np.exp(-0.5 * (np.arange(-6, 7) / 2.0) ** 2)
+    x = np.convolve(env, kernel / kernel.sum(), mode='same')
+    x = x - x.mean()
+    n = 1 << int(np.ceil(np.log2(2 * len(x) + 1)))
+    spec = np.fft.rfft(x, n)
+    ac = np.fft.irfft(spec * np.conj(spec), n)[:len(x)]
+    lo = max(1, int(frame_rate * 60.0 / bpm_range[1]))
+    hi = min(len(ac) - 1, int(np.ceil(frame_rate * 60.0 / bpm_range[0])))
+    if hi <= lo:
+        return 0.0
+    lags = np.arange(lo, hi + 1)
+    bpm = 60.0 * frame_rate / lags
+    weight = np.exp(-0.5 * (np.log2(bpm / 120.0) / 1.0) ** 2)
+    period = _peak_lag(ac, lags[np.argmax(ac[lo:hi + 1] * weight)], lo, hi)
+
+    frames = np.arange(len(ac))
+    while period / 2 >= lo:
+        half = np.interp(period / 2, frames, ac)
+        if half < OCTAVE_RATIO * np.interp(period, frames, ac):
+            break
+        shorter = _peak_lag(ac, round(period / 2), lo, hi)
+        if shorter >= 0.75 * period:
+            break
+        period = shorter
+    if 2 * period <= hi and _comb_strength(env, 2 * period) > COMB_RATIO * _comb_strength(env, period):
+        period = _peak_lag(ac, round(2 * period), lo, hi)
+    return period
+
+
+def track_beats(env, period):
+    """
+    Beat frame indices: pick the comb phase with the most onset energy,
+    then step one period at a time, snapping each beat to the strongest
+    envelope frame within an eighth of a period.
+    """
+    if period <= 0 or len(env) == 0:
+        return np.zeros(0, dtype=np.int64)
+    p = int(round(period))
+    phase_score = [env[ph::p].sum() for ph in range(p)]
+    beat = float(np.argmax(phase_score))
+    tol = max(1, int(period / 8))
+    beats = []
+    while beat < len(env):
+        c = int(round(beat))
+        lo, hi = max(0, c - tol), min(len(env), c + tol + 1)
+        snapped = lo + int(np.argmax(env[lo:hi]))
+        beats.append(snapped)
+        beat = snapped + period
+    return np.asarray(beats, dtype=np.int64)
+
+
+def analyze_track(path, n_bands, sample_rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE,
+                  hop=HOP_SIZE, cache_dir=CACHE_DIR):
+    """
+    Analyse one audio file (unless already cached) and return its cache path.
+    """
+    out = cache_path(path, n_bands, chunk_size, hop, cache_dir)
+    if os.path.exists(out):
+        return out
+    with PCMStream(path, sample_rate=sample_rate) as stream:
+        bands, rms, dominant = stft_features(stream.blocks(), n_bands, sample_rate,
+                                             chunk_size, hop)
+    frame_rate = sample_rate / hop
+    env = onset_envelope(bands)
+    onsets = pick_onsets(env, frame_rate)
+    period = estimate_tempo(env, frame_rate)
+    beats = track_beats(env, period)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = out + ".tmp.npz"
+    np.savez_compressed(
+        tmp, sample_rate=sample_rate, chunk_size=chunk_size, hop=hop,
+        bands=bands, rms=rms, dominant=dominant, onset_env=env.astype(np.float16),
+        onsets=onsets / frame_rate, beats=beats / frame_rate,
+        tempo=60.0 * frame_rate / period if period > 0 else 0.0)
+    os.replace(tmp, out)
+    return out
+
+
+def check_tempo(bpms=(120.0, 140.0), seconds=30.0, sample_rate=SAMPLE_RATE, tolerance=2.0):
+    """
+    Run click tracks at the given tempos through the tempo estimate; returns
+    a list of (bpm, estimated bpm) pairs that missed by more than `tolerance`.
+    """
+    misses = []
+    frame_rate = sample_rate / HOP_SIZE
+    for bpm in bpms:
+        clicks = np.zeros(int(seconds * sample_rate), dtype=np.float32)
+        clicks[(np.arange(0.003, seconds, 60.0 / bpm) * sample_rate).astype(np.int64)] = 1.0
+        bands, _, _ = stft_features([clicks], 32, sample_rate)
+        period = estimate_tempo(onset_envelope(bands), frame_rate)
+        found = 60.0 * frame_rate / period if period > 0 else 0.0
+        if abs(found - bpm) > tolerance:
+            misses.append((bpm, found))
+    return misses
+
+
+class TrackFeatures:
+    """
+    Precomputed features of one track, indexed by playback time.
+
+    Frame i covers samples [i * hop, i * hop + chunk_size), matching the
+    window the live visualizer takes at time i * hop / sample_rate.
+    """
+
+    def __init__(self, cache_file):
+        with np.load(cache_file) as data:
+            self.sample_rate = int(data['sample_rate'])
+            self.chunk_size  = int(data['chunk_size'])
+            self.hop         = int(data['hop'])
+            self.bands       = data['bands']
+            self.rms         = data['rms']
+            self.dominant    = data['dominant']
+            self.onset_env   = data['onset_env']
+            self.onsets      = data['onsets']
+            self.beats       = data['beats']
+            self.tempo       = float(data['tempo'])
+        self.frame_rate = self.sample_rate / self.hop
+        self.duration   = (len(self.rms) * self.hop + self.chunk_size - self.hop) / self.sample_rate
+
+    def __len__(self):
+        return len(self.rms)
+
+    def index(self, t):
+        """Frame index for playback time t (seconds), or -1 past the end."""
+        i = int(t * self.frame_rate)
+        return i if 0 <= i < len(self.rms) else -1
+
+    @classmethod
+    def load(cls, path, n_bands, chunk_size=CHUNK_SIZE, hop=HOP_SIZE, cache_dir=CACHE_DIR):
+        """Cached features for `path`, or None if it has not been analysed."""
+        cached = cache_path(path, n_bands, chunk_size, hop, cache_dir)
+        return cls(cached) if os.path.exists(cached) else None
+
+
+class AnalysisPool:
+    """
+    Background analysis of new tracks in worker processes. Tracks already
+    cached or already queued are skipped.
+    """
+
+    def __init__(self, max_workers=1):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.pending  = {}
+
+    def submit(self, path, n_bands, **kwargs):
+        key = (os.path.abspath(path), n_bands)
+        fut = self.pending.get(key)
+        if fut is None or (fut.done() and fut.exception() is not None):
+            fut = self.executor.submit(analyze_track, path, n_bands, **kwargs)
+            self.pending[key] = fut
+        return fut
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute audio features for the music shows")
+    parser.add_argument("tracks", nargs="*", help="Audio files to analyse")
+    parser.add_argument("--bands", type=int, default=32,
+                        help="Number of log-spaced bands")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes")
+    parser.add_argument("--check-tempo", action="store_true",
+                        help="Check the tempo estimate on synthetic 120 and 140 BPM click tracks")
+    args = parser.parse_args()
+
+    if args.check_tempo:
+        misses = check_tempo()
+        for bpm, found in misses:
+            print("%.0f BPM clicks estimated as %.1f BPM" % (bpm, found), file=sys.stderr)
+        if misses or not args.tracks:
+            sys.exit(1 if misses else 0)
+    elif not args.tracks:
+        parser.error("no tracks given")
+
+    pool = AnalysisPool(args.workers)
+    futures = {track: pool.submit(track, args.bands) for track in args.tracks}
+    status = 0
+    for track, fut in futures.items():
+        try:
+            print("%s -> %s" % (track, fut.result()))
+        except Exception as e:
+            print("%s: analysis failed: %s" % (track, e), file=sys.stderr)
+            status = 1
+    pool.shutdown(wait=True)
+    sys.exit(status)
@@ -1,40 +1,67 @@
 #!/usr/bin/env python3
 import os
-from flask import Flask, send_from_directory, render_template_string, jsonify
+from flask import Flask, send_from_directory, render_template_string, jsonify, request
 from threading import Thread
+from flask_sock import Sock
 import time
 import numpy as np
 import pandas as pd
-import colorsys
-from rpi_ws281x import PixelStrip, Color
-from pydub import AudioSegment
-from io import BytesIO
+from rpi_ws281x import PixelStrip
+from audio_stream import PCMStream
+from color_math import show_rgb
+from spectrum import SpectrumVisualizer, band_weights, MAPPINGS, HUE_SPAN
+from audio_analysis import TrackFeatures, AnalysisPool
+from playback_clock import PlaybackClock, handle_sync_message
+from client_bands import ClientBands
+
+CSV_FILE         = 'coordinates.csv'
+SPECTRUM_BANDS   = 32         # log-spaced bands spread over the tree
+SPECTRUM_MAPPING = 'height'   # one of spectrum.MAPPINGS
+IDLE_TIMEOUT     = 60.0       # seconds paused before the show gives up
 
 app = Flask(__name__)
+sock = Sock(app)
 led_thread = None
+playback_clock = PlaybackClock()
+analysis_pool = None
+client_bands = ClientBands(SPECTRUM_BANDS, fps=20.0)
+
+def schedule_analysis(mp3_file, n_bands, chunk_size):
+    """Queue a track for offline analysis in a background worker process."""
+    global analysis_pool
+    if analysis_pool is None:
+        analysis_pool = AnalysisPool(max_workers=1)
+    return analysis_pool.submit(mp3_file, n_bands, chunk_size=chunk_size, hop=chunk_size)
 
-def animate_music_sync_rich(csv_file, mp3_file, chunk_size=1024, interval=0.05, led_scale=10.0, global_scale=3.0):
+def animate_music_sync_rich(csv_file, mp3_file, chunk_size=1024, interval=0.05, led_scale=10.0, global_scale=3.0,
+                            mapping=SPECTRUM_MAPPING, n_bands=SPECTRUM_BANDS, client=None):
     """
     Enhanced LED animation synchronized with music using both amplitude and refined frequency data.
 
     Modifications include:
-    - A fixed LED_COUNT so that all LEDs on the tree are used.
+    - LED count and band layout taken from the tree geometry in the CSV: bass at the
+      base rising to treble at the top ("height"), bands around the trunk ("theta"),
+      or LED order ("index").
     - Logarithmic frequency binning to better reflect human hearing.
     - Smoothing of brightness for a more fluid "bounce" effect.
     - Hue adjustment that combines a global dominant frequency offset with a local brightness boost.
-    """
-    # Define total number of LEDs on your tree.
-    TOTAL_LED_COUNT = 150  # Adjust this to match your hardware setup.
-    LED_COUNT = TOTAL_LED_COUNT
 
-    # Optionally try to load LED coordinates from CSV for ordering.
-    # If the CSV has fewer entries than TOTAL_LED_COUNT, a warning is printed and defaults are used.
-    try:
-        df = pd.read_csv(csv_file)
-        if len(df) < TOTAL_LED_COUNT:
-            print("Warning: CSV file contains fewer rows than total LED count. Using default positions for missing LEDs.")
-    except Exception as e:
-        print("Could not load CSV file, using default LED count.")
+    Band energies come from a precomputed filterbank matrix folded together with the
+    LED-to-band weight matrix, so a frame is one matrix product; all per-LED math is
+    vectorized (see spectrum.SpectrumVisualizer). Tracks with a cached offline analysis
+    (see audio_analysis) play back by indexing precomputed features by timestamp;
+    otherwise audio is decoded block by block through an ffmpeg pipe (see
+    audio_stream.PCMStream) and analysed live while the track is queued for analysis.
+    Playback position comes from playback_clock, kept in sync with the page's audio.
+    The show ends with the audio, or after IDLE_TIMEOUT seconds paused.
+    While the page streams its own band analysis (see client_bands), frames are built
+    from that and the Pi skips its FFTs; it falls back to the paths above when the
+    browser stops sending.
+    """
+    # The LED count and the band layout come from the tree's coordinates.
+    df = pd.read_csv(csv_file)
+    positions = df[['X', 'Y', 'Z']].to_numpy(dtype=float)
+    LED_COUNT = len(positions)
     
     # LED strip configuration.
     LED_PIN        = 18
@@ -46,97 +73,66 @@ def animate_music_sync_rich(csv_file, mp3_file, chunk_size=1024, interval=0.05,
     strip = PixelStrip(LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
     strip.begin()
     
-    # Load the MP3 file entirely into memory.
-    with open(mp3_file, 'rb') as f:
-        mp3_data = f.read()
-    try:
-        song = AudioSegment.from_file(BytesIO(mp3_data), format="mp3")
-    except Exception as e:
-        print("Error loading MP3 file:", e)
-        return
+    # Precompute the band filterbank, geometry weights, window and per-LED hue layout.
+    sample_rate = 44100
+    visualizer = SpectrumVisualizer(LED_COUNT, sample_rate, chunk_size,
+                                    led_scale=led_scale, global_scale=global_scale,
+                                    weights=band_weights(positions, n_bands, mapping))
     
-    # Prepare audio samples.
-    samples = np.array(song.get_array_of_samples())
-    if song.channels > 1:
-        samples = samples.reshape((-1, song.channels))
-        samples = samples[:, 0]  # Use the first channel if stereo.
-    samples = samples.astype(np.float32) / (2**15)  # Normalize to [-1,1]
-    sample_rate = song.frame_rate
-    total_samples = len(samples)
+    def show_client_frame():
+        # Bands analysed by the browser, if it is streaming them.
+        latest = client.fresh() if client is not None else None
+        if latest is None:
+            return False
+        band_mag, rms, hue_offset = latest
+        show_rgb(strip, visualizer.render(visualizer.map_bands(band_mag), rms, hue_offset))
+        return True
     
-    # Pre-calculate FFT frequency bins.
-    frequencies = np.fft.rfftfreq(chunk_size, d=1.0/sample_rate)
+    # Prefer the cached offline analysis: each frame is then just a row lookup.
+    features = TrackFeatures.load(mp3_file, n_bands, chunk_size=chunk_size, hop=chunk_size)
+    if features is not None:
+        while True:
+            i = features.index(playback_clock.now())
+            if i < 0 or playback_clock.finished(IDLE_TIMEOUT):
+                break
+            if show_client_frame():
+                time.sleep(interval)
+                continue
+            show_rgb(strip, visualizer.render(visualizer.map_bands(features.bands[i]),
+                                              features.rms[i], features.dominant[i] * HUE_SPAN))
+            time.sleep(interval)
+        show_rgb(strip, np.zeros((LED_COUNT, 3)))
+        return
     
-    # Compute logarithmically spaced frequency boundaries (from 20 Hz to Nyquist).
-    f_min = 20
-    f_max = sample_rate / 2.0
-    freq_boundaries = np.logspace(np.log10(f_min), np.log10(f_max), LED_COUNT + 1)
+    # Not analysed yet: analyse in the background for next time and fall back to live FFTs.
+    schedule_analysis(mp3_file, n_bands, chunk_size)
     
-    # Prepare smoothing state for each LED.
-    prev_brightness = np.zeros(LED_COUNT)
-    smoothing_factor = 0.3  # Lower values mean faster response (more bounce), higher values add persistence.
+    # Decode the MP3 as a stream of fixed-size PCM blocks into a bounded ring buffer.
+    stream = PCMStream(mp3_file, sample_rate=sample_rate)
+    try:
+        stream.open()
+    except OSError as e:
+        print("Error starting MP3 decoder:", e)
+        return
     
-    start_time = time.time()
+    chunk = np.empty(chunk_size, dtype=np.float32)
     
-    while True:
-        elapsed = time.time() - start_time
-        current_sample = int(elapsed * sample_rate)
-        if current_sample + chunk_size > total_samples:
-            break
-        
-        # Get the current chunk and compute its RMS amplitude.
-        chunk = samples[current_sample: current_sample + chunk_size]
-        rms = np.sqrt(np.mean(chunk**2))
-        
-        # Compute FFT to get frequency data.
-        window = np.hanning(len(chunk))
-        windowed = chunk * window
-        fft_result = np.fft.rfft(windowed)
-        magnitude = np.abs(fft_result)
-        
-        # Derive a global hue offset from the dominant frequency in the chunk.
-        dominant_idx = np.argmax(magnitude)
-        dominant_norm = dominant_idx / (len(magnitude) - 1)  # Normalized value between 0 and 1.
-        hue_offset = dominant_norm * 0.66  # Scale to a hue range (red to blue).
-        
-        # Update each LED.
-        for led in range(LED_COUNT):
-            # Determine frequency band for this LED using logarithmic boundaries.
-            lower_bound = freq_boundaries[led]
-            upper_bound = freq_boundaries[led+1]
-            # Find FFT bin indices in this frequency band.
-            indices = np.where((frequencies >= lower_bound) & (frequencies < upper_bound))[0]
-            if len(indices) > 0:
-                band_mag = np.mean(magnitude[indices])
-            else:
-                band_mag = 0
-            
-            # Blend local frequency magnitude and overall amplitude.
-            brightness_val = np.clip(np.tanh((band_mag * led_scale) + (rms * global_scale)), 0, 1)
-            
-            # Smooth the brightness for a more fluid effect.
-            brightness_val = (smoothing_factor * prev_brightness[led] + 
-                              (1 - smoothing_factor) * brightness_val)
-            prev_brightness[led] = brightness_val
-            
-            # Calculate a base hue from the LED's index.
-            base_hue = (led / LED_COUNT) * 0.66
-            # Add dynamic hue offset and a slight boost from the brightness.
-            hue = (base_hue + hue_offset + 0.1 * brightness_val) % 1.0
+    try:
+        while not playback_clock.finished(IDLE_TIMEOUT):
+            if show_client_frame():
+                time.sleep(interval)
+                continue
+            current_sample = int(max(playback_clock.now(), 0.0) * sample_rate)
+            if stream.window(current_sample, chunk_size, out=chunk) is None:
+                break
             
-            # Convert HSV to RGB.
-            r_float, g_float, b_float = colorsys.hsv_to_rgb(hue, 1, brightness_val)
-            r = int(r_float * 255)
-            g = int(g_float * 255)
-            b = int(b_float * 255)
-            strip.setPixelColor(led, Color(r, g, b))
-        strip.show()
-        time.sleep(interval)
+            show_rgb(strip, visualizer.process(chunk))
+            time.sleep(interval)
+    finally:
+        stream.close()
     
     # Turn off all LEDs when finished.
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
-    strip.show()
+    show_rgb(strip, np.zeros((LED_COUNT, 3)))
 
 @app.route('/')
 def index():
@@ -145,9 +141,12 @@ def index():
     <html>
       <head>
         <title>Enhanced LED Music Sync</title>
+        <script src="/static/playback_sync.js"></script>
+        <script src="/static/band_stream.js"></script>
         <script>
           function startShow() {
-            fetch('/start', {method: 'POST'})
+            var mapping = document.getElementById('mapping').value;
+            fetch('/start?mapping=' + mapping, {method: 'POST'})
               .then(response => response.json())
               .then(data => {
                 console.log(data);
@@ -161,12 +160,22 @@ def index():
       </head>
       <body>
         <h1>Enhanced LED Music Sync</h1>
+        <label for="mapping">Spectrum layout:</label>
+        <select id="mapping">
+          <option value="height">Bass at the base, treble at the top</option>
+          <option value="theta">Bands around the tree</option>
+          <option value="index">LED order</option>
+        </select>
         <button onclick="startShow()">Start Light Show</button>
         <br><br>
         <audio id="audio" controls>
           <source src="/audio/mariah.mp3" type="audio/mpeg">
           Your browser does not support the audio element.
         </audio>
+        <script>
+          startPlaybackSync(document.getElementById('audio'));
+          startBandStream(document.getElementById('audio'));
+        </script>
         <p>Enjoy the enhanced, synchronized LED show!</p>
       </body>
     </html>
@@ -176,18 +185,41 @@ def index():
 @app.route('/start', methods=['POST'])
 def start():
     global led_thread
+    mapping = request.args.get('mapping', SPECTRUM_MAPPING)
+    if mapping not in MAPPINGS:
+        return jsonify({"status": "Unknown spectrum layout: %s" % mapping}), 400
     if led_thread is None or not led_thread.is_alive():
+        # Free-run from 0 until the page's first sync report takes over.
+        playback_clock.start(0.0)
         led_thread = Thread(target=animate_music_sync_rich,
-                            args=('coordinates.csv', 'audio/mariah.mp3', 1024, 0.05, 10.0, 3.0))
+                            args=(CSV_FILE, 'audio/mariah.mp3', 1024, 0.05, 10.0, 3.0, mapping,
+                                  SPECTRUM_BANDS, client_bands))
         led_thread.daemon = True
         led_thread.start()
         return jsonify({"status": "Enhanced light show started"})
     else:
         return jsonify({"status": "Light show already running"})
 
+@sock.route('/sync')
+def sync(ws):
+    while True:
+        reply = handle_sync_message(playback_clock, ws.receive())
+        if reply is not None:
+            ws.send(reply)
+
+@sock.route('/bands')
+def bands(ws):
+    ws.send(client_bands.config_message())
+    while True:
+        client_bands.receive(ws.receive())
+
 @app.route('/audio/<path:filename>')
 def audio(filename):
     return send_from_directory('audio', filename)
 
 if __name__ == '__main__':
+    # Analyse any new tracks in the background so later shows use the cache.
+    for name in sorted(os.listdir('audio')) if os.path.isdir('audio') else []:
+        if name.lower().endswith('.mp3'):
+            schedule_analysis(os.path.join('audio', name), SPECTRUM_BANDS, 1024)
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,115 @@
+"""
+Streaming PCM decode for the music shows.
+
+ffmpeg decodes the track to mono 16-bit PCM on a pipe. Fixed-size blocks are
+read into one reusable buffer and copied into a float32 ring buffer, so memory
+stays bounded by the ring capacity no matter how long the track is.
+"""
+import subprocess
+import numpy as np
+
+
+class PCMStream:
+    """
+    Block-wise decoder for one audio file.
+
+    path:        audio file (anything ffmpeg can read).
+    sample_rate: output sample rate in Hz (ffmpeg resamples if needed).
+    block_size:  samples pulled from the decoder per read.
+    capacity:    ring buffer length in samples; must exceed the largest
+                 window requested plus one block.
+    """
+
+    def __init__(self, path, sample_rate=44100, block_size=4096, capacity=1 << 16):
+        if capacity < 2 * block_size:
+            raise ValueError("capacity must be at least two blocks")
+        self.path        = path
+        self.sample_rate = sample_rate
+        self.block_size  = block_size
+        self.capacity    = capacity
+        self.ring        = np.zeros(capacity, dtype=np.float32)
+        self.written     = 0      # total samples decoded so far
+        self.eof         = False
+        self._raw        = bytearray(block_size * 2)
+        self._pcm        = np.frombuffer(self._raw, dtype=np.int16)
+        self._proc       = None
+
+    def open(self):
+        # pan=mono|c0=c0 keeps the first channel, like the old in-memory path.
+        self._proc = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-i", self.path,
+             "-af", "pan=mono|c0=c0", "-ar", str(self.sample_rate),
+             "-f", "s16le", "-acodec", "pcm_s16le", "-"],
+            stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, bufsize=0)
+        return self
+
+    def close(self):
+        if self._proc is not None:
+            self._proc.stdout.close()
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_block(self):
+        """Decode the next block into the ring; returns samples read (0 at EOF)."""
+        view, got = memoryview(self._raw), 0
+        while got < len(self._raw):
+            n = self._proc.stdout.readinto(view[got:])
+            if not n:
+                break
+            got += n
+        n = got // 2
+        if n == 0:
+            self.eof = True
+            return 0
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.ring[start:start + first] = self._pcm[:first] * (1.0 / 32768)
+        if first < n:
+            self.ring[:n - first] = self._pcm[first:n] * (1.0 / 32768)
+        self.written += n
+        if n < self.block_size:
+            self.eof = True
+        return n
+
+    def blocks(self):
+        """
+        Yield consecutive float32 blocks of `block_size` samples (the last
+        one may be shorter). Each yielded array is reused by the next step,
+        so copy it if it must be kept.
+        """
+        out = np.empty(self.block_size, dtype=np.float32)
+        while not self.eof:
+            n = self._read_block()
+            if n == 0:
+                break
+            out[:n] = self.window(self.written - n, n)
+            yield out[:n]
+
+    def window(self, start, length, out=None):
+        """
+        Samples [start, start + length) as float32, decoding ahead as needed.
+        Returns None once the window runs past the end of the track. Windows
+        that have already scrolled out of the ring are clamped to the oldest
+        samples still held.
+        """
+        if length > self.capacity - self.block_size:
+            raise ValueError("window longer than the ring buffer")
+        while self.written < start + length and not self.eof:
+            self._read_block()
+        if self.written < start + length:
+            return None
+        start = max(start, self.written - self.capacity)
+        if out is None:
+            out = np.empty(length, dtype=np.float32)
+        i = start % self.capacity
+        first = min(length, self.capacity - i)
+        out[:first] = self.ring[i:i + first]
+        out[first:] = self.ring[:length - first]
+        return out
@@ -0,0 +1,75 @@
+"""
+Band energies computed in the browser.
+
+The page playing the audio runs a Web Audio AnalyserNode on it
+(static/band_stream.js) and streams one compact binary message per frame
+over a WebSocket, so the Pi only has to map bands to LEDs:
+
+  n_bands bytes   band magnitude, log-coded between MIN_DB and MAX_DB
+  1 byte          chunk RMS, 0-1 linear
+  1 byte          dominant frequency as a fraction of Nyquist
+
+Magnitudes are scaled in the browser to match np.fft.rfft of a Hann-windowed
+chunk, so they feed SpectrumVisualizer.render unchanged. On connect the
+server sends the band edges, FFT size, frame rate and dB range, so both
+sides use the same band layout.
+"""
+import json
+import time
+import threading
+import numpy as np
+from spectrum import HUE_SPAN
+
+MIN_DB = -60.0   # band magnitude coded as 0 (treated as silence)
+MAX_DB = 40.0    # band magnitude coded as 255
+
+
+class ClientBands:
+    """
+    Latest band vector received from the browser.
+
+    n_bands:     bands per message.
+    sample_rate: rate the band edges are derived for (Nyquist limit).
+    chunk_size:  FFT size the browser analyses with.
+    fps:         frames per second the browser should send.
+    max_age:     seconds after which a client is considered gone.
+    """
+
+    def __init__(self, n_bands, sample_rate=44100, chunk_size=1024, fps=20.0, max_age=0.5,
+                 clock=time.monotonic):
+        self.n_bands     = n_bands
+        self.sample_rate = sample_rate
+        self.chunk_size  = chunk_size
+        self.fps         = fps
+        self.max_age     = max_age
+        self.clock       = clock
+        self.lock        = threading.Lock()
+        self.latest      = None
+        self.received_at = float("-inf")
+
+    def config_message(self):
+        """JSON config sent to the browser when its socket connects."""
+        edges = np.logspace(np.log10(20.0), np.log10(self.sample_rate / 2.0), self.n_bands + 1)
+        return json.dumps({"type": "config", "edges": edges.round(2).tolist(),
+                           "fft_size": self.chunk_size, "fps": self.fps,
+                           "min_db": MIN_DB, "max_db": MAX_DB})
+
+    def receive(self, payload):
+        """Decode one binary band message; text messages are ignored."""
+        if not isinstance(payload, (bytes, bytearray)) or len(payload) != self.n_bands + 2:
+            return
+        q = np.frombuffer(payload, dtype=np.uint8)
+        db = MIN_DB + q[:self.n_bands] * ((MAX_DB - MIN_DB) / 255.0)
+        band_mag = np.where(q[:self.n_bands] > 0, 10.0 ** (db / 20.0), 0.0).astype(np.float32)
+        rms = q[self.n_bands] / 255.0
+        hue_offset = q[self.n_bands + 1] / 255.0 * HUE_SPAN
+        with self.lock:
+            self.latest = (band_mag, rms, hue_offset)
+            self.received_at = self.clock()
+
+    def fresh(self):
+        """(band_mag, rms, hue_offset) if the browser is streaming, else None."""
+        with self.lock:
+            if self.clock() - self.received_at > self.max_age:
+                return None
+            return self.latest
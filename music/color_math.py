@@ -0,0 +1,97 @@
+"""
+Array color helpers for the music shows.
+
+Colors are handled as (N, 3) float/uint8 arrays or as packed 24-bit
+ints in rpi_ws281x.Color layout, so per-LED work is done by NumPy instead of
+Python loops.
+"""
+import numpy as np
+
+
+def hsv_to_rgb(h, s, v):
+    """
+    Vectorized colorsys.hsv_to_rgb: h, s, v are arrays (or scalars) in
+    [0, 1]; returns an (..., 3) float array in [0, 1].
+    """
+    h, s, v = np.broadcast_arrays(np.asarray(h, dtype=np.float64),
+                                  np.asarray(s, dtype=np.float64),
+                                  np.asarray(v, dtype=np.float64))
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(np.int64) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=-1)
+
+
+def pack_rgb(rgb):
+    """
+    Pack an (N, 3) array of 0-255 values into uint32 Color(r, g, b) ints.
+    The music apps run from music/ and can't import patterns/led_frame.py,
+    so this is a copy of its pack_rgb; keep the two identical.
+    """
+    rgb = np.clip(rgb, 0, 255).astype(np.uint32)
+    return (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+def show_rgb(strip, rgb):
+    """Write an (N, 3) RGB frame to every LED of the strip and show it."""
+    strip[:] = pack_rgb(rgb).tolist()
+    strip.show()
+
+
+def unpack_rgb(packed):
+    """Inverse of pack_rgb: (N,) Color ints -> (N, 3) uint8 array."""
+    packed = np.asarray(packed, dtype=np.uint32)
+    return np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF],
+                    axis=-1).astype(np.uint8)
+
+
+def grb(rgb):
+    """Reorder RGB colors (..., 3) into the GRB channel order of the tree's strip."""
+    return np.asarray(rgb)[..., [1, 0, 2]]
+
+
+def palette(colors):
+    """(K, 3) float array of a list of RGB tuples, in strip (GRB) order."""
+    return grb(np.asarray(colors, dtype=np.float32).reshape(-1, 3))
+
+
+def gather(palette, index):
+    """Palette colors picked by an integer index array (wrapping around)."""
+    return palette[np.asarray(index) % len(palette)]
+
+
+def random_colors(palette, n, rng=np.random):
+    """n colors drawn uniformly from the palette."""
+    return palette[rng.randint(0, len(palette), size=n)]
+
+
+def scale_colors(colors, factor):
+    """Colors scaled by a scalar or per-LED factor, truncated to integers."""
+    factor = np.asarray(factor, dtype=np.float32)
+    if factor.ndim == 1:
+        factor = factor[:, None]
+    return np.floor(colors * factor)
+
+
+def blend_colors(c1, c2, t):
+    """Linear mix from c1 (t = 0) to c2 (t = 1), truncated to integers."""
+    return np.floor(np.asarray(c1, dtype=np.float32) * (1 - t) + np.asarray(c2, dtype=np.float32) * t)
+
+
+def z_normalize(z):
+    """Heights scaled to [0, 1] (all zeros for a flat layout)."""
+    z = np.asarray(z, dtype=np.float64)
+    span = z.max() - z.min()
+    return (z - z.min()) / span if span > 0 else np.zeros_like(z)
+
+
+def show_packed(strip, packed):
+    """Write a frame of already packed Color ints to the strip and show it."""
+    strip[:] = packed.tolist()
+    strip.show()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Live audio-input visualizer.
+
+Three threads:
+  capture   reads small blocks of 16-bit mono PCM from an ALSA device
+            (arecord), a named pipe, or a WAV file played back in real time,
+            and writes them into a single-producer/single-consumer ring.
+  analysis  on every hop takes the newest window from the ring and runs the
+            same filterbank/geometry pipeline as the MP3 visualizer
+            (spectrum.SpectrumVisualizer). Windows overlap by
+            chunk - hop samples; if it falls behind it skips to the newest
+            hop, so latency stays bounded by one hop plus one frame.
+  render    turns the latest analysis into a frame, writes the strip, and
+            records capture-to-LED latency.
+
+Usage:
+  python3 live_input.py --device hw:1,0           # USB sound card / mic
+  python3 live_input.py --wav band.wav            # file stand-in
+  python3 live_input.py --fifo /tmp/pcm           # raw s16le mono on a pipe
+"""
+import time
+import wave
+import argparse
+import threading
+import subprocess
+import numpy as np
+import pandas as pd
+from rpi_ws281x import PixelStrip
+from color_math import show_rgb
+from spectrum import SpectrumVisualizer, band_weights, MAPPINGS
+
+
+class SPSCRing:
+    """
+    Lock-free ring buffer for one writer thread and one reader thread.
+
+    The writer copies samples in and only then publishes the new total in a
+    single attribute store (with its capture time), so the reader never sees
+    a count ahead of the data. The reader keeps its own position and detects
+    being lapped (overrun) by comparing against that total.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data     = np.zeros(capacity, dtype=np.float32)
+        self.stamp    = (0, time.monotonic())   # (samples written, capture time)
+
+    @property
+    def written(self):
+        return self.stamp[0]
+
+    def write(self, samples, captured_at):
+        n = len(samples)
+        w = self.stamp[0]
+        i = w % self.capacity
+        first = min(n, self.capacity - i)
+        self.data[i:i + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.stamp = (w + n, captured_at)
+
+    def read(self, start, out):
+        """
+        Copy samples [start, start + len(out)) into out. Returns False if
+        they have been overwritten or are not written yet.
+        """
+        n = len(out)
+        w = self.stamp[0]
+        if start < w - self.capacity or start + n > w:
+            return False
+        i = start % self.capacity
+        first = min(n, self.capacity - i)
+        out[:first] = self.data[i:i + first]
+        out[first:] = self.data[:n - first]
+        # The writer may have lapped us while copying.
+        return start >= self.stamp[0] - self.capacity
+
+
+class LatencyMeter:
+    """Capture-to-LED latency: running mean and worst case per report period."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.count, self.total, self.worst = 0, 0.0, 0.0
+
+    def add(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            self.worst = max(self.worst, seconds)
+
+    def take(self):
+        """(mean, worst, frames) since the last call."""
+        with self.lock:
+            stats = (self.total / self.count if self.count else 0.0, self.worst, self.count)
+            self.reset()
+            return stats
+
+
+def _read_exact(stream, buf):
+    view, got = memoryview(buf), 0
+    while got < len(buf):
+        n = stream.readinto(view[got:])
+        if not n:
+            break
+        got += n
+    return got
+
+
+def capture_pcm(stream, ring, block, stop):
+    """Capture thread body for raw s16le mono streams (arecord stdout, FIFO)."""
+    raw = bytearray(block * 2)
+    pcm = np.frombuffer(raw, dtype=np.int16)
+    try:
+        while not stop.is_set():
+            got = _read_exact(stream, raw) // 2
+            if got == 0:
+                break
+            ring.write(pcm[:got] * (1.0 / 32768), time.monotonic())
+    finally:
+        stop.set()
+
+
+def capture_wav(path, ring, block, stop):
+    """
+    Capture thread body replaying a WAV file at its real-time rate. Whatever
+    ends it, stop is set so the other threads don't wait on it.
+    """
+    try:
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("WAV stand-in must be 16-bit PCM")
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            next_t = time.monotonic()
+            while not stop.is_set():
+                frames = wav.readframes(block)
+                if not frames:
+                    break
+                pcm = np.frombuffer(frames, dtype=np.int16)[::channels]
+                next_t += len(pcm) / rate
+                time.sleep(max(0.0, next_t - time.monotonic()))
+                ring.write(pcm * (1.0 / 32768), time.monotonic())
+    finally:
+        stop.set()
+
+
+class LiveAnalyzer:
+    """
+    Analysis thread: an overlapped, windowed STFT advanced one hop at a
+    time. `latest` holds (led_mag, rms, hue_offset, capture_time, seq) of
+    the newest window, replaced in one store.
+    """
+
+    def __init__(self, ring, visualizer, sample_rate, hop):
+        self.ring        = ring
+        self.visualizer  = visualizer
+        self.sample_rate = sample_rate
+        self.hop         = hop
+        self.window      = np.zeros(visualizer.chunk_size, dtype=np.float32)
+        self.latest      = None
+        self.skipped     = 0
+
+    def run(self, stop):
+        chunk = self.visualizer.chunk_size
+        end, seq = chunk, 0
+        while not stop.is_set():
+            written, captured_at = self.ring.stamp
+            if written < end:
+                time.sleep(self.hop / self.sample_rate / 4)
+                continue
+            if written - end >= self.hop:
+                # Behind by a hop or more: drop the stale hops.
+                missed = (written - end) // self.hop
+                self.skipped += missed
+                end += missed * self.hop
+            if not self.ring.read(end - chunk, self.window):
+                end = self.ring.written
+                self.skipped += 1
+                continue
+            led_mag, rms, hue_offset = self.visualizer.analyze(self.window)
+            # Capture time of the newest sample in this window.
+            sample_t = captured_at - (written - end) / self.sample_rate
+            seq += 1
+            self.latest = (led_mag, rms, hue_offset, sample_t, seq)
+            end += self.hop
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Live audio-input LED visualizer")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--device", default="default",
+                        help="ALSA capture device for arecord (default: 'default')")
+    source.add_argument("--wav", help="16-bit WAV file to replay as a live stand-in")
+    source.add_argument("--fifo", help="Named pipe carrying raw s16le mono PCM")
+    parser.add_argument("--rate", type=int, default=44100,
+                        help="Sample rate for --device / --fifo")
+    parser.add_argument("--chunk", type=int, default=1024, help="STFT window in samples")
+    parser.add_argument("--hop", type=int, default=512, help="STFT hop in samples")
+    parser.add_argument("--block", type=int, default=256, help="Capture block in samples")
+    parser.add_argument("--fps", type=float, default=60.0, help="Maximum LED frame rate")
+    parser.add_argument("--mapping", choices=MAPPINGS, default="height",
+                        help="How bands are laid out over the tree")
+    parser.add_argument("--bands", type=int, default=32, help="Number of log-spaced bands")
+    parser.add_argument("--report", type=float, default=5.0,
+                        help="Seconds between latency reports (0 = off)")
+    args = parser.parse_args()
+
+    df = pd.read_csv('coordinates.csv')
+    positions = df[['X', 'Y', 'Z']].to_numpy(dtype=float)
+    LED_COUNT = len(positions)
+
+    LED_PIN        = 18
+    LED_FREQ_HZ    = 800000
+    LED_DMA        = 10
+    LED_BRIGHTNESS = 125
+    LED_INVERT     = False
+    LED_CHANNEL    = 0
+    strip = PixelStrip(LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
+    strip.begin()
+
+    sample_rate = args.rate
+    if args.wav:
+        with wave.open(args.wav, 'rb') as w:
+            if w.getsampwidth() != 2:
+                parser.error("--wav must be 16-bit PCM")
+            sample_rate = w.getframerate()
+
+    ring = SPSCRing(max(8 * args.chunk, sample_rate))
+    stop = threading.Event()
+    proc = None
+    if args.wav:
+        capture = threading.Thread(target=capture_wav, args=(args.wav, ring, args.block, stop))
+    elif args.fifo:
+        capture = threading.Thread(target=capture_pcm,
+                                   args=(open(args.fifo, 'rb', buffering=0), ring, args.block, stop))
+    else:
+        proc = subprocess.Popen(["arecord", "-q", "-D", args.device, "-f", "S16_LE", "-c", "1",
+                                 "-r", str(sample_rate), "-t", "raw"],
+                                stdout=subprocess.PIPE, bufsize=0)
+        capture = threading.Thread(target=capture_pcm, args=(proc.stdout, ring, args.block, stop))
+
+    visualizer = SpectrumVisualizer(LED_COUNT, sample_rate, args.chunk,
+                                    weights=band_weights(positions, args.bands, args.mapping))
+    analyzer = LiveAnalyzer(ring, visualizer, sample_rate, args.hop)
+    analysis = threading.Thread(target=analyzer.run, args=(stop,))
+    latency = LatencyMeter()
+    for t in (capture, analysis):
+        t.daemon = True
+        t.start()
+
+    frame_time = 1.0 / args.fps
+    last_seq, last_report = 0, time.monotonic()
+    try:
+        while not stop.is_set():
+            latest = analyzer.latest
+            if latest is None or latest[4] == last_seq:
+                time.sleep(frame_time / 4)
+                continue
+            led_mag, rms, hue_offset, sample_t, last_seq = latest
+            show_rgb(strip, visualizer.render(led_mag, rms, hue_offset))
+            now = time.monotonic()
+            latency.add(now - sample_t)
+            if args.report and now - last_report >= args.report:
+                mean, worst, frames = latency.take()
+                print("latency avg %.1f ms, max %.1f ms, %d frames, %d hops skipped"
+                      % (mean * 1000, worst * 1000, frames, analyzer.skipped))
+                last_report = now
+            time.sleep(max(0.0, frame_time - (time.monotonic() - now)))
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    if proc is not None:
+        proc.kill()
+    show_rgb(strip, np.zeros((LED_COUNT, 3)))
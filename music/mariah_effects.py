@@ -0,0 +1,168 @@
+"""
+Effects of the mariah show, registered by name for show_timeline.
+
+Kept free of strip and web-server setup so the same code drives the live
+show (mariah.py) and offline rendering (prerender.py).
+"""
+import math
+import numpy as np
+import pandas as pd
+from show_timeline import effect, ShowRenderer
+from color_math import palette, gather, random_colors, scale_colors, blend_colors, z_normalize
+import compositor
+
+df = pd.read_csv('coordinates.csv')  # CSV must have columns: X, Y, Z.
+LED_COUNT = len(df)
+
+# Phase effects draw the base frame here ((N, 3) array in strip channel order);
+# ShowRenderer then composites cue layers on top.
+frame = np.zeros((LED_COUNT, 3), dtype=np.float32)
+FRAME_TIME = 0.05   # nominal frame period; spiral speeds are offsets per frame
+
+led_index = np.arange(LED_COUNT)
+norm_z    = z_normalize(df["Z"].to_numpy())
+
+# ====================================================
+# Color Palettes (for GRB strips) – GRB ordering assumed.
+# ====================================================
+red_color, green_color, white_color, gold_color, yellow_color, pink_color = palette([
+    (255, 0, 0), (0, 255, 0), (255, 255, 255), (255, 215, 0), (255, 255, 0), (255, 105, 180)])
+
+standard_palette = palette([(255, 0, 0), (0, 255, 0), (255, 255, 255)])
+accent_palette = palette([(255, 165, 0), (255, 105, 180), (147, 112, 219), (255, 255, 0),
+                          (173, 216, 230), (255, 99, 71), (144, 238, 144)])
+new_palette = palette([(173, 216, 230), (255, 105, 180), (147, 112, 219),
+                       (100, 240, 100), (255, 160, 122), (230, 230, 250)])
+new_accent_palette = palette([(255, 0, 0), (0, 255, 0), (255, 255, 0), (255, 255, 255)])
+bright_palette = palette([(255, 255, 255), (255, 255, 0), (255, 105, 180),
+                          (0, 191, 255), (0, 255, 0), (255, 0, 0)])
+phase7_accent = palette([(255, 105, 180), (255, 165, 0), (173, 216, 230)])
+pulse_palette = palette([(255, 255, 255), (255, 255, 0), (255, 0, 0), (0, 255, 0), (255, 105, 180)])
+twinkle_palette = palette([(255, 255, 255), (255, 105, 180)])
+
+# Final section: alternating pink and white, each mixed halfway with green.
+final_base = blend_colors(gather(palette([(255, 105, 180), (255, 255, 255)]), led_index),
+                          green_color, 0.5)
+
+# ====================================================
+# New Effect: Bridge Transition Twinkle (Phase 6)
+# ====================================================
+def bridge_transition_effect(adjusted_elapsed, bridge_start, bridge_end, offset, brightness_factor):
+    t = (adjusted_elapsed - bridge_start) / (bridge_end - bridge_start)
+    spiral = scale_colors(gather(new_palette, led_index + int(offset)), brightness_factor)
+    twinkle = np.random.uniform(0.8, 1.0, LED_COUNT)
+    sparkle = scale_colors(random_colors(bright_palette, LED_COUNT), brightness_factor * twinkle)
+    frame[:] = blend_colors(spiral, sparkle, t)
+
+# ====================================================
+# New Effect: Final Section Spiral and Fadeout (Phases 8 & 9)
+# ====================================================
+def update_final_spiral(offset, brightness_factor, base_speed):
+    frame[:] = scale_colors(final_base, brightness_factor)
+
+def update_final_fadeout(offset, brightness_factor, fade_progress):
+    frame[:] = scale_colors(final_base, brightness_factor * (1 - fade_progress))
+
+# ====================================================
+# Existing Effect: Gradual Bottom-Up Lighting with White & Pink Twinkle (Phase 1)
+# ====================================================
+def gradual_bottom_up_effect(adjusted_elapsed, flash1_time):
+    fraction = min(adjusted_elapsed / flash1_time, 1.0)
+    twinkle = np.random.uniform(0.8, 1.0, LED_COUNT)
+    colors = scale_colors(random_colors(twinkle_palette, LED_COUNT), twinkle)
+    frame[:] = np.where((norm_z <= fraction)[:, None], colors, 0)
+
+# ====================================================
+# Existing Effects: Pulse, Slow Spiral, Fast Spiral, etc.
+# ====================================================
+def init_pulse_state():
+    return {
+        'phases': np.random.uniform(0, 2*math.pi, LED_COUNT),
+        'colors': random_colors(pulse_palette, LED_COUNT)
+    }
+
+def pulse_fast(pulse_state, pulse_elapsed, pulse_speed):
+    brightness = 0.5 * (1 + np.sin(2 * math.pi * pulse_speed * pulse_elapsed + pulse_state['phases']))
+    change = np.random.random(LED_COUNT) < 0.1
+    pulse_state['colors'][change] = random_colors(pulse_palette, int(change.sum()))
+    frame[:] = scale_colors(pulse_state['colors'], brightness)
+
+def update_slow_spiral(offset, brightness_factor=1.0):
+    frame[:] = scale_colors(gather(standard_palette, led_index + int(offset)), brightness_factor)
+
+def accent_spiral(base_palette, accent_colors, offset, brightness_factor, accent):
+    idx = led_index + int(offset)
+    base = gather(base_palette, idx)
+    if accent:
+        base = blend_colors(base, gather(accent_colors, idx), 0.5)
+    frame[:] = scale_colors(base, brightness_factor)
+
+def update_fast_spiral(offset, brightness_factor=1.0, accent=False):
+    accent_spiral(standard_palette, accent_palette, offset, brightness_factor, accent)
+
+def update_fast_spiral_new(offset, brightness_factor=1.0, accent=False):
+    accent_spiral(new_palette, new_accent_palette, offset, brightness_factor, accent)
+
+def update_fast_spiral_phase7(offset, brightness_factor=1.0, accent=False):
+    accent_spiral(standard_palette, phase7_accent, offset, brightness_factor, accent)
+
+# ====================================================
+# Effect Registry (names used by the show spec)
+# ====================================================
+@effect("bottom_up")
+def _bottom_up(renderer, t, phase, params):
+    gradual_bottom_up_effect(t - phase.start, phase.end - phase.start)
+
+@effect("slow_spiral")
+def _slow_spiral(renderer, t, phase, params):
+    update_slow_spiral(renderer.offset, renderer.param(params, "brightness", 1.0))
+    renderer.offset += renderer.param(params, "speed", 0.0) * renderer.step
+
+@effect("pulse")
+def _pulse(renderer, t, phase, params):
+    if "pulse" not in renderer.scratch:
+        renderer.scratch["pulse"] = init_pulse_state()
+    pulse_fast(renderer.scratch["pulse"], t - phase.start, renderer.param(params, "pulse_speed", 3.0))
+
+def _accent_spiral(update):
+    def run(renderer, t, phase, params):
+        accent = renderer.in_interval(params.get("accent"), t)
+        update(renderer.offset, renderer.param(params, "brightness", 1.0), accent)
+        renderer.offset += renderer.param(params, "speed", 0.0) * renderer.step
+    return run
+
+effect("fast_spiral")(_accent_spiral(update_fast_spiral))
+effect("fast_spiral_new")(_accent_spiral(update_fast_spiral_new))
+effect("fast_spiral_phase7")(_accent_spiral(update_fast_spiral_phase7))
+
+@effect("bridge_twinkle")
+def _bridge_twinkle(renderer, t, phase, params):
+    bridge_transition_effect(t, phase.start, phase.end, renderer.offset,
+                             renderer.param(params, "brightness", 1.0))
+    renderer.offset += renderer.param(params, "speed", 0.0) * renderer.step
+
+@effect("final_spiral")
+def _final_spiral(renderer, t, phase, params):
+    speed = renderer.param(params, "speed", 0.0)
+    update_final_spiral(renderer.offset, renderer.param(params, "brightness", 1.0), speed)
+    renderer.offset += speed * renderer.step
+
+@effect("final_fadeout")
+def _final_fadeout(renderer, t, phase, params):
+    fade_progress = phase.progress(t)
+    update_final_fadeout(renderer.offset, renderer.param(params, "brightness", 1.0), fade_progress)
+    renderer.offset += renderer.param(params, "speed", 0.0) * (1 - fade_progress) * renderer.step
+
+@effect("flash")
+def _flash(renderer, t, cue, params):
+    color = palette([params.get("color", (255, 215, 0))])[0]
+    hold, fade = params.get("hold", 0.15), params.get("fade", 0.6)
+    renderer.layers.add(compositor.flash(color, hold, fade), cue.time, hold + fade,
+                    params.get("blend", "over"))
+
+# ====================================================
+# Renderer
+# ====================================================
+def make_renderer(show, verbose=False):
+    """Fresh ShowRenderer for a compiled show, drawing into this module's frame."""
+    return ShowRenderer(show, frame, FRAME_TIME, verbose)
@@ -0,0 +1,136 @@
+"""
+Show clock locked to the browser's audio playback.
+
+The page (static/playback_sync.js) keeps a WebSocket open to the Pi. A few
+times a second it pings the server to estimate the offset between its clock
+and the server's (NTP style: the sample with the smallest round trip wins),
+then reports audio.currentTime together with the server time at which it was
+sampled and whether the audio is actually playing.
+
+PlaybackClock fits position against server time over the recent reports to
+follow the audio clock's drift, and slews the show clock toward that fit by
+adjusting its rate, so the lights never jump for small errors. Large errors
+(seeks) snap immediately; pauses and buffering stalls freeze the clock.
+When the audio ends, or stays paused for too long, finished() tells the
+show loop to stop.
+"""
+import json
+import time
+import threading
+import collections
+import numpy as np
+
+
+class PlaybackClock:
+    """
+    slew_time:      seconds over which a small error is worked off.
+    jump_threshold: errors above this (seconds) snap instead of slewing.
+    max_slew:       largest rate correction applied while slewing.
+    window:         number of recent reports used to estimate drift.
+    """
+
+    def __init__(self, slew_time=1.0, jump_threshold=0.25, max_slew=0.05, window=16,
+                 clock=time.monotonic):
+        self.slew_time      = slew_time
+        self.jump_threshold = jump_threshold
+        self.max_slew       = max_slew
+        self.clock          = clock
+        self.samples        = collections.deque(maxlen=window)
+        self.lock           = threading.Lock()
+        self.playing        = False
+        self.synced         = False
+        self.ended          = False
+        self.paused_since   = None
+        self.base_time      = clock()
+        self.base_pos       = 0.0
+        self.rate           = 1.0
+        self.audio_rate     = 1.0
+
+    def _position(self, t):
+        if not self.playing:
+            return self.base_pos
+        return self.base_pos + self.rate * (t - self.base_time)
+
+    def now(self):
+        """Current song position in seconds."""
+        with self.lock:
+            return self._position(self.clock())
+
+    def start(self, position=0.0):
+        """Free-run from `position` until the first sync report arrives."""
+        with self.lock:
+            self.base_time, self.base_pos = self.clock(), position
+            self.rate, self.playing, self.synced = 1.0, True, False
+            self.ended, self.paused_since = False, None
+            self.samples.clear()
+
+    def stop(self):
+        with self.lock:
+            self.base_pos = self._position(self.clock())
+            if self.playing:
+                self.paused_since = self.clock()
+            self.playing = False
+
+    def finished(self, idle_timeout=None):
+        """
+        Whether the audio has ended, or (given `idle_timeout`) has been
+        paused or stalled for longer than that many seconds.
+        """
+        with self.lock:
+            if self.ended:
+                return True
+            return (idle_timeout is not None and self.paused_since is not None
+                    and self.clock() - self.paused_since > idle_timeout)
+
+    def observe(self, server_time, position, playing, ended=False):
+        """Fold in one report: audio was at `position` at `server_time`."""
+        with self.lock:
+            t = self.clock()
+            self.synced = True
+            self.ended = self.ended or ended
+            if not playing:
+                if self.paused_since is None:
+                    self.paused_since = t
+                self.base_time, self.base_pos = t, position
+                self.playing, self.rate = False, 1.0
+                self.samples.clear()
+                return
+
+            # Drop the drift history across seeks and resumes.
+            if self.samples:
+                t0, p0 = self.samples[-1]
+                if abs((position - p0) - self.audio_rate * (server_time - t0)) > self.jump_threshold:
+                    self.samples.clear()
+            self.samples.append((server_time, position))
+            ts = np.array([s[0] for s in self.samples])
+            ps = np.array([s[1] for s in self.samples])
+            if ts[-1] - ts[0] >= 2.0:
+                self.audio_rate = float(np.clip(np.polyfit(ts - ts[-1], ps, 1)[0], 0.98, 1.02))
+            else:
+                self.audio_rate = 1.0
+            target = position + self.audio_rate * (t - server_time)
+
+            current = self._position(t)
+            error = target - current
+            if not self.playing or abs(error) > self.jump_threshold:
+                current, correction = target, 0.0
+            else:
+                correction = float(np.clip(error / self.slew_time, -self.max_slew, self.max_slew))
+            self.base_time, self.base_pos = t, current
+            self.rate = self.audio_rate + correction
+            self.playing = True
+            self.paused_since = None
+
+
+def handle_sync_message(clock, raw):
+    """
+    Process one message from the page's sync socket; returns the reply to
+    send (for pings) or None.
+    """
+    msg = json.loads(raw)
+    if msg.get("type") == "ping":
+        return json.dumps({"type": "pong", "c0": msg["c0"], "s": clock.clock()})
+    if msg.get("type") == "position":
+        clock.observe(float(msg["t"]), float(msg["pos"]), bool(msg["playing"]),
+                      bool(msg.get("ended", False)))
+    return None
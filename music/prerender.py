@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered song shows.
+
+A show is rendered once against a virtual clock with a seeded RNG, so the
+random twinkles are fixed too, and every frame is stored in a compressed
+.npz next to the song (audio/mariah.mp3 -> audio/mariah.frames.npz). Frames
+are stored as differences from the previous frame, which compress far
+better than raw frames since most LEDs change slowly.
+
+FramePlayer decodes the file once into packed Color ints and looks frames up
+by song time: the live loop does no effect math, and seeking is free.
+The file records a hash of the show spec, its label file, the effects
+module's source and the tree coordinates; a stale file, or one rendered for
+a different LED count, is ignored.
+
+Usage: python3 prerender.py mariah_show.json [--fps 60] [--seed 0] [--effects mariah_effects]
+"""
+import os
+import json
+import hashlib
+import argparse
+import importlib
+import importlib.util
+import numpy as np
+from show_timeline import load_show
+from color_math import pack_rgb
+
+COORDS_CSV = 'coordinates.csv'   # read by the effects modules from the working directory
+EFFECTS    = 'mariah_effects'
+
+
+def spec_hash(show_file, effects=EFFECTS):
+    """
+    SHA-1 over everything the frames depend on besides fps and seed: the
+    show spec, the label file it references, the effects module's name and
+    source, and the LED coordinates.
+    """
+    h = hashlib.sha1()
+    with open(show_file, 'rb') as f:
+        raw = f.read()
+    h.update(raw)
+    paths = []
+    labels = json.loads(raw).get("labels") if show_file.endswith(".json") else None
+    if labels:
+        paths.append(os.path.join(os.path.dirname(os.path.abspath(show_file)), labels))
+    module = importlib.util.find_spec(effects)
+    if module is None or module.origin is None:
+        raise ImportError("effects module not found: %r" % effects)
+    h.update(effects.encode())
+    paths += [module.origin, COORDS_CSV]
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def frames_path(show_file):
+    """Frame file for a show: next to its "audio" track, else next to the spec."""
+    base = os.path.splitext(show_file)[0]
+    if show_file.endswith(".json"):
+        with open(show_file) as f:
+            audio = json.load(f).get("audio")
+        if audio:
+            base = os.path.join(os.path.dirname(show_file), os.path.splitext(audio)[0])
+    return base + ".frames.npz"
+
+
+def render_show(show_file, effects=EFFECTS, fps=60, seed=0, out=None):
+    """Render every frame of a show at `fps` and write the frame file."""
+    module = importlib.import_module(effects)
+    np.random.seed(seed)
+    show = load_show(show_file)
+    renderer = module.make_renderer(show)
+    count = int(np.ceil(show.end * fps))
+    frames = np.empty((count, module.LED_COUNT, 3), dtype=np.uint8)
+    for i in range(count):
+        frames[i] = np.clip(renderer.render(i / fps), 0, 255)
+
+    delta = frames.copy()
+    delta[1:] -= frames[:-1]    # uint8 wrap-around; cumsum in uint8 undoes it
+    out = out or frames_path(show_file)
+    np.savez_compressed(out, delta=delta, fps=fps, seed=seed, spec=spec_hash(show_file, effects))
+    return out
+
+
+class FramePlayer:
+    """Frames of a pre-rendered show, indexed by song time."""
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            frames = np.cumsum(data['delta'], axis=0, dtype=np.uint8)
+            self.fps  = int(data['fps'])
+            self.spec = str(data['spec'])
+        self.frame_count, self.led_count = frames.shape[:2]
+        self.frames = frames
+        self.packed = pack_rgb(frames.reshape(-1, 3)).reshape(self.frame_count, self.led_count)
+
+    def index(self, t):
+        return min(max(int(t * self.fps), 0), self.frame_count - 1)
+
+    def frame_at(self, t):
+        """(N, 3) uint8 frame at song time t (clamped to the show)."""
+        return self.frames[self.index(t)]
+
+    def packed_at(self, t):
+        """Packed Color ints for song time t (clamped to the show)."""
+        return self.packed[self.index(t)]
+
+    @classmethod
+    def load(cls, show_file, led_count=None, effects=EFFECTS):
+        """
+        Player for a show's frame file, or None if it is missing, out of
+        date, or (given led_count) rendered for a different strip.
+        """
+        path = frames_path(show_file)
+        if not os.path.exists(path):
+            return None
+        player = cls(path)
+        if (player.spec != spec_hash(show_file, effects)
+                or (led_count is not None and player.led_count != led_count)):
+            print("Ignoring stale pre-rendered frames:", path)
+            return None
+        return player
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-render a song show to a frame file")
+    parser.add_argument("show", help="Show spec (.json) or Audacity label file")
+    parser.add_argument("--fps", type=int, default=60, help="Frames per second")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random twinkles")
+    parser.add_argument("--effects", default=EFFECTS,
+                        help="Module that registers the show's effects")
+    parser.add_argument("--out", default=None, help="Output file (default: next to the song)")
+    args = parser.parse_args()
+    print(render_show(args.show, args.effects, args.fps, args.seed, args.out))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Automatic show labels from the cached audio analysis.
+
+Builds on audio_analysis: from a track's onset envelope, beats and band
+energies it picks downbeats (4/4 bar phase), energy-based section
+boundaries (novelty between the bars before and after each downbeat),
+strong accents to flash on and the final fade-out. The result is written as
+an Audacity label track and returned as the event list run_led_show uses:
+[{"time": seconds, "label": name}, ...].
+
+Usage: python3 show_labels.py audio/*.mp3 [--out-dir labels] [--beats]
+"""
+import os
+import sys
+import argparse
+import numpy as np
+from audio_analysis import AnalysisPool, TrackFeatures
+
+BEATS_PER_BAR   = 4
+SECTION_BARS    = 4      # bars compared on either side of a candidate boundary
+COARSE_BANDS    = 16     # band energies are pooled to this many for section features
+FLASH_MIN_ENV   = 0.5    # onset strength needed for a flash accent
+FLASH_MIN_JUMP  = 1.5    # RMS after / before ratio needed for a flash accent
+FLASH_GAP       = 2.0    # minimum seconds between flashes
+FADE_LEVEL      = 0.5    # fade-out starts once RMS stays below this x median
+FADE_MAX        = 30.0   # only look for the fade-out in the last N seconds
+
+
+def _smooth(x, n):
+    if n <= 1 or len(x) == 0:
+        return x
+    return np.convolve(x, np.ones(n) / n, mode='same')
+
+
+def downbeats(features, meter=BEATS_PER_BAR):
+    """
+    Every `meter`-th beat, starting at the phase where low-frequency onset
+    energy is strongest (kick drums and bass notes tend to land on the one).
+    """
+    beats = features.beats
+    if len(beats) < meter:
+        return beats[:1]
+    bands = features.bands.astype(np.float32)
+    low = np.log1p(100.0 * bands[:, :max(1, bands.shape[1] // 4)].mean(axis=1))
+    low_flux = np.zeros(len(low), dtype=np.float32)
+    low_flux[1:] = np.maximum(np.diff(low), 0)
+    frames = np.minimum((beats * features.frame_rate).astype(np.int64), len(low) - 1)
+    scores = [low_flux[frames[p::meter]].mean() for p in range(meter)]
+    return beats[int(np.argmax(scores))::meter]
+
+
+def section_boundaries(features, bars, width=SECTION_BARS):
+    """
+    Bar start times where the music changes: per-bar pooled log band
+    energies and RMS are z-normalized, and the distance between the mean of
+    the `width` bars before and after each bar line is peak-picked.
+    """
+    n_frames = len(features)
+    starts = np.unique(np.minimum((bars * features.frame_rate).astype(np.int64), n_frames - 1))
+    if len(starts) < 2 * width + 1:
+        return np.zeros(0)
+    logb = np.log1p(100.0 * features.bands.astype(np.float32))
+    pooled = np.add.reduceat(logb, np.linspace(0, logb.shape[1], COARSE_BANDS,
+                                               endpoint=False).astype(np.int64), axis=1)
+    frame_feat = np.column_stack([pooled, np.log1p(100.0 * features.rms)])
+    counts = np.diff(np.append(starts, n_frames))
+    bar_feat = np.add.reduceat(frame_feat, starts, axis=0) / counts[:, None]
+    bar_feat = (bar_feat - bar_feat.mean(axis=0)) / (bar_feat.std(axis=0) + 1e-6)
+
+    csum = np.vstack([np.zeros(bar_feat.shape[1]), np.cumsum(bar_feat, axis=0)])
+    b = np.arange(width, len(bar_feat) - width + 1)
+    before = (csum[b] - csum[b - width]) / width
+    after = (csum[np.minimum(b + width, len(bar_feat))] - csum[b]) / width
+    novelty = np.zeros(len(bar_feat))
+    novelty[b] = np.linalg.norm(after - before, axis=1)
+
+    thresh = novelty[b].mean() + 0.5 * novelty[b].std()
+    picked = []
+    for i in np.argsort(-novelty):
+        if novelty[i] < thresh:
+            break
+        if all(abs(i - j) >= 2 * width for j in picked):
+            picked.append(i)
+    return np.sort(starts[picked]) / features.frame_rate
+
+
+def flash_accents(features, min_env=FLASH_MIN_ENV, min_jump=FLASH_MIN_JUMP, gap=FLASH_GAP):
+    """Onsets that are both strong and mark a jump in loudness."""
+    fr = features.frame_rate
+    env = features.onset_env.astype(np.float32)
+    rms = features.rms
+    w = max(1, int(0.2 * fr))
+    out, last = [], -np.inf
+    for t in features.onsets:
+        i = int(t * fr)
+        if env[i] < min_env or t - last < gap:
+            continue
+        before = rms[max(0, i - w):i].mean() if i > 0 else 0.0
+        after = rms[i:i + w].mean()
+        if after >= min_jump * max(before, 1e-6):
+            out.append(t)
+            last = t
+    return np.asarray(out)
+
+
+def fade_out(features, level=FADE_LEVEL, max_len=FADE_MAX):
+    """Time after which the track stays quiet until the end, or None."""
+    fr = features.frame_rate
+    rms = _smooth(features.rms, max(1, int(fr)))
+    if len(rms) == 0:
+        return None
+    loud = np.flatnonzero(rms >= level * np.median(rms))
+    if len(loud) == 0 or loud[-1] + 1 >= len(rms):
+        return None
+    t = (loud[-1] + 1) / fr
+    return t if features.duration - t <= max_len else None
+
+
+def detect_events(features, include_beats=False):
+    """
+    Event list (sorted by time) in the structure run_led_show consumes:
+    Intro, SectionN starts, FlashN accents, FadeOut and End, plus Beat /
+    Downbeat points when include_beats is set.
+    """
+    bars = downbeats(features)
+    events = [{"time": 0.0, "label": "Intro"}]
+    for k, t in enumerate(section_boundaries(features, bars), 1):
+        events.append({"time": float(t), "label": "Section%d" % k})
+    for k, t in enumerate(flash_accents(features), 1):
+        events.append({"time": float(t), "label": "Flash%d" % k})
+    fade = fade_out(features)
+    if fade is not None:
+        events.append({"time": float(fade), "label": "FadeOut"})
+    events.append({"time": float(features.duration), "label": "End"})
+    if include_beats:
+        bar_set = set(np.round(bars, 6).tolist())
+        for t in features.beats:
+            label = "Downbeat" if round(float(t), 6) in bar_set else "Beat"
+            events.append({"time": float(t), "label": label})
+    events.sort(key=lambda e: e["time"])
+    return events
+
+
+def write_labels(events, path):
+    """Write events as an Audacity label track (start, end, label per line)."""
+    with open(path, 'w') as f:
+        for e in events:
+            end = e.get("end", e["time"])
+            f.write("%.6f\t%.6f\t%s\n" % (e["time"], end, e["label"]))
+
+
+def read_labels(path):
+    """Read an Audacity label track back into an event list."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) < 3 or parts[0].startswith('\\'):
+                continue
+            event = {"time": float(parts[0]), "label": parts[2]}
+            if float(parts[1]) != event["time"]:
+                event["end"] = float(parts[1])
+            events.append(event)
+    return events
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate show labels for audio tracks")
+    parser.add_argument("tracks", nargs="+", help="Audio files to label")
+    parser.add_argument("--out-dir", default="labels",
+                        help="Directory for the <track>_labels.txt files")
+    parser.add_argument("--bands", type=int, default=32,
+                        help="Number of log-spaced analysis bands")
+    parser.add_argument("--beats", action="store_true",
+                        help="Also write every beat and downbeat as a label")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for tracks that are not cached yet")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    pool = AnalysisPool(args.workers)
+    futures = {track: pool.submit(track, args.bands) for track in args.tracks}
+    status = 0
+    for track, fut in futures.items():
+        try:
+            features = TrackFeatures(fut.result())
+        except Exception as e:
+            print("%s: analysis failed: %s" % (track, e), file=sys.stderr)
+            status = 1
+            continue
+        name = os.path.splitext(os.path.basename(track))[0]
+        out = os.path.join(args.out_dir, name + "_labels.txt")
+        events = detect_events(features, include_beats=args.beats)
+        write_labels(events, out)
+        print("%s -> %s (%.1f BPM, %d events)" % (track, out, features.tempo, len(events)))
+    pool.shutdown(wait=True)
+    sys.exit(status)
@@ -0,0 +1,284 @@
+"""
+Data-driven show timelines.
+
+A show is described by a JSON spec (or directly by an Audacity label file)
+and compiled once into sorted tables:
+
+  phases     non-overlapping [start, end) spans, each naming a registered
+             effect and its params; looked up with bisect.
+  cues       every label of the track plus explicit cue times, each with the
+             actions to run when playback crosses it; also found by bisect.
+  intervals  named sets of [start, end) spans (e.g. back vocals), merged and
+             sorted so membership is one bisect.
+
+Effects are addressed by name through EFFECTS, filled by the @effect
+decorator in the show script. Times in a spec are seconds or label names
+from the label file; "Label#2" picks the label's second occurrence.
+
+Spec layout:
+
+  {
+    "labels": "mariah_labels.txt",
+    "latency_offset": -0.5,
+    "state": {"final_brightness": 0.8},
+    "phases": [{"from": 0, "to": "Flash1", "effect": "bottom_up", "params": {}}],
+    "cues": [{"match": "*Flash*", "effect": "flash"},
+             {"at": "HighNote2", "set": {"final_brightness": 1.0}}],
+    "intervals": {"back_vocals": [["BackVocalsStart", "BackVocalsStop"]]},
+    "end": "End"
+  }
+
+Param values of the form "$name" are read from the show state at run time,
+so cues can change them with "set". A "match" rule with "points": true only
+matches point labels, not the start of region labels.
+"""
+import os
+import json
+import bisect
+import fnmatch
+from show_labels import read_labels
+from compositor import Compositor
+
+EFFECTS = {}
+
+
+def effect(name):
+    """Register a function under `name` in the effect registry."""
+    def register(fn):
+        EFFECTS[name] = fn
+        return fn
+    return register
+
+
+class Phase:
+    def __init__(self, start, end, effect, params):
+        self.start  = start
+        self.end    = end
+        self.effect = effect
+        self.params = params
+
+    def progress(self, t):
+        """Fraction of the phase elapsed at time t, clamped to [0, 1]."""
+        span = self.end - self.start
+        return min(max((t - self.start) / span, 0.0), 1.0) if span > 0 else 1.0
+
+
+class Cue:
+    def __init__(self, time, label, actions):
+        self.time    = time
+        self.label   = label
+        self.actions = actions
+
+
+class Timeline:
+    """Compiled show: phase, cue and interval tables plus the run-time state."""
+
+    def __init__(self, phases, cues, intervals, end, latency_offset=0.0, state=None):
+        self.phases         = sorted(phases, key=lambda p: p.start)
+        self.cues           = sorted(cues, key=lambda c: c.time)
+        self.intervals      = intervals
+        self.end            = end
+        self.latency_offset = latency_offset
+        self.initial_state  = dict(state or {})
+        self.state          = dict(self.initial_state)
+        self._phase_starts  = [p.start for p in self.phases]
+        self._cue_times     = [c.time for c in self.cues]
+
+    def reset(self):
+        self.state = dict(self.initial_state)
+
+    def phase_at(self, t):
+        """The phase active at time t, or None between/after phases."""
+        i = bisect.bisect_right(self._phase_starts, t) - 1
+        if i >= 0 and t < self.phases[i].end:
+            return self.phases[i]
+        return None
+
+    def cues_between(self, t0, t1):
+        """Cues with t0 < time <= t1, in time order."""
+        lo = bisect.bisect_right(self._cue_times, t0)
+        hi = bisect.bisect_right(self._cue_times, t1)
+        return self.cues[lo:hi]
+
+    def in_interval(self, name, t):
+        """Whether t falls inside one of the named intervals."""
+        if name not in self.intervals:
+            return False
+        starts, ends = self.intervals[name]
+        i = bisect.bisect_right(starts, t) - 1
+        return i >= 0 and t < ends[i]
+
+    def param(self, params, key, default=None):
+        """A phase/cue param, resolving "$name" references against the state."""
+        value = params.get(key, default)
+        if isinstance(value, str) and value.startswith("$"):
+            return self.state[value[1:]]
+        return value
+
+
+class ShowRenderer:
+    """
+    Steps a compiled show to song time t: runs the cues crossed since the
+    previous call, draws the active phase into `frame` and composites the
+    cue layers on top. Going backwards rebuilds the cue-driven state and
+    resets the playback state below, so any sequence of times works (live
+    playback with seeks, or offline rendering).
+
+    Effects are called as fn(renderer, t, phase_or_cue, params) and keep
+    their playback state here rather than on the show:
+
+    frame:      (N, 3) array the phase effects draw into.
+    frame_time: nominal frame period; spiral speeds are offsets per frame.
+    offset:     spiral offset accumulated by the phase effects.
+    step:       frames elapsed since the previous render, for advancing offset.
+    layers:     Compositor with the cue layers.
+    scratch:    dict for any other per-effect state (e.g. pulse phases).
+    """
+
+    def __init__(self, show, frame, frame_time=0.05, verbose=False):
+        self.show       = show
+        self.frame      = frame
+        self.frame_time = frame_time
+        self.verbose    = verbose
+        self.layers     = Compositor()
+        self.reset()
+
+    def reset(self):
+        """Back to the start of the show."""
+        self.show.reset()
+        self.layers.clear()
+        self.offset  = 0
+        self.step    = 0.0
+        self.scratch = {}
+        self.last_t  = float("-inf")
+
+    def param(self, params, key, default=None):
+        return self.show.param(params, key, default)
+
+    def in_interval(self, name, t):
+        return self.show.in_interval(name, t)
+
+    def render(self, t):
+        """(N, 3) frame for song time t."""
+        show = self.show
+        if t < self.last_t:
+            self.reset()
+            for cue in show.cues_between(float("-inf"), t):
+                for action in cue.actions:
+                    show.state.update(action.get("set", {}))
+            self.last_t = t
+        # Spiral offsets advance with song time, scaled to the nominal frame period.
+        self.step = (t - self.last_t) / self.frame_time if self.last_t > float("-inf") else 0.0
+
+        for cue in show.cues_between(self.last_t, t):
+            if self.verbose:
+                print("Triggering event:", cue.label, "at adjusted time", t)
+            for action in cue.actions:
+                show.state.update(action.get("set", {}))
+                if action.get("effect"):
+                    EFFECTS[action["effect"]](self, t, cue, action.get("params", {}))
+        self.last_t = t
+
+        phase = show.phase_at(t)
+        if phase is not None:
+            EFFECTS[phase.effect](self, t, phase, phase.params)
+        else:
+            self.frame[:] = 0
+        return self.layers.render(self.frame, t)
+
+
+def _label_table(labels):
+    table = {}
+    for e in labels:
+        table.setdefault(e["label"], []).append(e["time"])
+    return table
+
+
+def _resolve(ref, table):
+    if isinstance(ref, (int, float)):
+        return float(ref)
+    name, _, nth = ref.rpartition("#") if "#" in ref else (ref, "", "1")
+    times = table.get(name)
+    if not times or int(nth) > len(times):
+        raise ValueError("unknown label in show spec: %r" % ref)
+    return times[int(nth) - 1]
+
+
+def _merge(spans):
+    starts, ends = [], []
+    for s, e in sorted(spans):
+        if starts and s <= ends[-1]:
+            ends[-1] = max(ends[-1], e)
+        else:
+            starts.append(s)
+            ends.append(e)
+    return starts, ends
+
+
+def compile_show(spec, base_dir="."):
+    """Compile a show spec dict into a Timeline."""
+    labels = []
+    if spec.get("labels"):
+        labels = read_labels(os.path.join(base_dir, spec["labels"]))
+    labels += spec.get("markers", [])
+    table = _label_table(labels)
+
+    phases = []
+    for p in spec.get("phases", []):
+        if p["effect"] not in EFFECTS:
+            raise ValueError("unknown effect in show spec: %r" % p["effect"])
+        phases.append(Phase(_resolve(p["from"], table), _resolve(p["to"], table),
+                            p["effect"], p.get("params", {})))
+    phases.sort(key=lambda p: p.start)
+    for a, b in zip(phases, phases[1:]):
+        if b.start < a.end:
+            raise ValueError("overlapping phases at %.3f s" % b.start)
+
+    rules = spec.get("cues", [])
+    for rule in rules:
+        if rule.get("effect") and rule["effect"] not in EFFECTS:
+            raise ValueError("unknown effect in show spec: %r" % rule["effect"])
+    cues = []
+    for e in labels:
+        actions = [r for r in rules if "match" in r and fnmatch.fnmatchcase(e["label"], r["match"])
+                   and not (r.get("points") and "end" in e)]
+        cues.append(Cue(e["time"], e["label"], actions))
+    for r in rules:
+        if "at" in r:
+            label = r["at"] if isinstance(r["at"], str) else "cue"
+            cues.append(Cue(_resolve(r["at"], table), label, [r]))
+
+    intervals = {name: _merge((_resolve(a, table), _resolve(b, table)) for a, b in spans)
+                 for name, spans in spec.get("intervals", {}).items()}
+
+    if "end" in spec:
+        end = _resolve(spec["end"], table)
+    else:
+        end = max([p.end for p in phases] + [c.time for c in cues] + [0.0])
+    return Timeline(phases, cues, intervals, end,
+                    spec.get("latency_offset", 0.0), spec.get("state"))
+
+
+def spec_from_labels(path):
+    """
+    Show spec for a bare Audacity label file: region labels naming a
+    registered effect become phases, and point labels naming one become
+    cues that trigger it.
+    """
+    labels = read_labels(path)
+    phases = [{"from": e["time"], "to": e["end"], "effect": e["label"]}
+              for e in labels if "end" in e and e["label"] in EFFECTS]
+    cue_names = sorted({e["label"] for e in labels if "end" not in e and e["label"] in EFFECTS})
+    return {"labels": os.path.basename(path), "phases": phases,
+            "cues": [{"match": name, "effect": name, "points": True} for name in cue_names]}
+
+
+def load_show(path):
+    """Load and compile a show from a .json spec or an Audacity .txt label file."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    if path.endswith(".txt"):
+        spec = spec_from_labels(path)
+    else:
+        with open(path) as f:
+            spec = json.load(f)
+    return compile_show(spec, base_dir)
@@ -0,0 +1,130 @@
+"""
+Spectrum-to-LED pipeline for the audio visualizer.
+
+Log-spaced frequency bands are precomputed as a filterbank matrix, and the
+tree geometry as an LED-to-band weight matrix (bass at the base rising to
+treble at the top, bands around the trunk, or plain LED order). The two are
+multiplied once, so per-LED magnitudes for a chunk are one matrix-vector
+product over the FFT magnitudes. Brightness smoothing, hue mapping and
+HSV->RGB conversion then run across all LEDs at once.
+"""
+import numpy as np
+from color_math import hsv_to_rgb
+
+HUE_SPAN = 0.66   # hue range spread over the bands / dominant frequency (red to blue)
+MAPPINGS = ("height", "theta", "index")
+
+
+def log_filterbank(n_bands, chunk_size, sample_rate, f_min=20.0):
+    """
+    (n_bands, chunk_size // 2 + 1) matrix whose rows average the rFFT bins
+    falling in each logarithmically spaced band from f_min to Nyquist.
+    Bands that contain no bin are all-zero rows.
+    """
+    frequencies = np.fft.rfftfreq(chunk_size, d=1.0/sample_rate)
+    boundaries = np.logspace(np.log10(f_min), np.log10(sample_rate / 2.0), n_bands + 1)
+    band = np.searchsorted(boundaries, frequencies, side='right') - 1
+    inside = (band >= 0) & (band < n_bands)
+    fb = np.zeros((n_bands, len(frequencies)), dtype=np.float32)
+    fb[band[inside], np.flatnonzero(inside)] = 1.0
+    counts = fb.sum(axis=1, keepdims=True)
+    np.divide(fb, counts, out=fb, where=counts > 0)
+    return fb
+
+
+def band_weights(positions, n_bands, mapping="height"):
+    """
+    (N, n_bands) matrix spreading band magnitudes over the LEDs.
+
+    height: band position follows normalized Z (bass at the bottom).
+    theta:  band position follows the angle around the trunk.
+    index:  bands follow LED order (one band per LED when counts match).
+
+    For height/theta each LED interpolates linearly between the two nearest
+    bands, so the matrix has at most two non-zeros per row.
+    """
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    if mapping == "index":
+        weights = np.zeros((n, n_bands), dtype=np.float32)
+        weights[np.arange(n), np.arange(n) * n_bands // n] = 1.0
+        return weights
+    if mapping == "height":
+        z = positions[:, 2]
+        frac = (z - z.min()) / (z.max() - z.min()) if z.max() > z.min() else np.zeros(n)
+    elif mapping == "theta":
+        center = positions[:, :2].mean(axis=0)
+        theta = np.arctan2(positions[:, 1] - center[1], positions[:, 0] - center[0])
+        frac = (theta + np.pi) / (2 * np.pi)
+    else:
+        raise ValueError("unknown mapping: %r" % mapping)
+    u = frac * (n_bands - 1)
+    lo = np.floor(u).astype(np.int64)
+    hi = np.minimum(lo + 1, n_bands - 1)
+    w_hi = (u - lo).astype(np.float32)
+    weights = np.zeros((n, n_bands), dtype=np.float32)
+    np.add.at(weights, (np.arange(n), lo), 1.0 - w_hi)
+    np.add.at(weights, (np.arange(n), hi), w_hi)
+    return weights
+
+
+class SpectrumVisualizer:
+    """
+    Turns audio chunks into LED frames.
+
+    led_count:    number of LEDs.
+    sample_rate:  audio sample rate in Hz.
+    chunk_size:   samples per analysed chunk.
+    led_scale:    gain on each LED's band magnitude.
+    global_scale: gain on the chunk's overall RMS.
+    smoothing:    weight of the previous brightness (higher = more persistence).
+    weights:      (led_count, n_bands) LED-to-band matrix from band_weights;
+                  defaults to one band per LED in LED order.
+    """
+
+    def __init__(self, led_count, sample_rate, chunk_size=1024,
+                 led_scale=10.0, global_scale=3.0, smoothing=0.3, weights=None):
+        if weights is None:
+            weights = np.eye(led_count, dtype=np.float32)
+        self.led_count    = led_count
+        self.chunk_size   = chunk_size
+        self.led_scale    = led_scale
+        self.global_scale = global_scale
+        self.smoothing    = smoothing
+        self.n_bands      = weights.shape[1]
+        self.weights      = weights
+        self.window       = np.hanning(chunk_size).astype(np.float32)
+        # FFT bins -> bands -> LEDs, folded into one (led_count, bins) matrix.
+        self.filterbank   = weights @ log_filterbank(self.n_bands, chunk_size, sample_rate)
+        # Each LED's hue follows the frequency band it shows.
+        self.base_hue     = weights @ (np.arange(self.n_bands) / self.n_bands) * HUE_SPAN
+        self.brightness   = np.zeros(led_count)
+
+    def analyze(self, chunk):
+        """
+        Per-LED band magnitudes, RMS and dominant-frequency hue offset for
+        one chunk.
+        """
+        rms = np.sqrt(np.mean(chunk**2))
+        magnitude = np.abs(np.fft.rfft(chunk * self.window))
+        # Derive a global hue offset from the dominant frequency in the chunk.
+        dominant_norm = np.argmax(magnitude) / (len(magnitude) - 1)
+        hue_offset = dominant_norm * HUE_SPAN
+        return self.filterbank @ magnitude, rms, hue_offset
+
+    def map_bands(self, band_mag):
+        """Per-LED magnitudes from n_bands band magnitudes (e.g. cached analysis)."""
+        return self.weights @ np.asarray(band_mag, dtype=np.float32)
+
+    def render(self, led_mag, rms, hue_offset):
+        """(led_count, 3) RGB frame (0-255) from per-LED magnitudes."""
+        # Blend local frequency magnitude and overall amplitude.
+        target = np.clip(np.tanh(led_mag * self.led_scale + rms * self.global_scale), 0, 1)
+        # Smooth the brightness for a more fluid effect.
+        self.brightness = self.smoothing * self.brightness + (1 - self.smoothing) * target
+        hue = (self.base_hue + hue_offset + 0.1 * self.brightness) % 1.0
+        return np.floor(hsv_to_rgb(hue, 1.0, self.brightness) * 255)
+
+    def process(self, chunk):
+        """Analyse a chunk and return its RGB frame."""
+        return self.render(*self.analyze(chunk))
@@ -0,0 +1,95 @@
+// Analyses an <audio> element in the browser and streams band energies to
+// the Pi (see client_bands.py). The server sends the band edges, FFT size,
+// frame rate and dB range on connect; each frame is then sent as bytes:
+// n_bands log-coded magnitudes, RMS, dominant frequency.
+// Browsers without Web Audio simply never send, and the Pi analyses itself.
+function startBandStream(audio, path) {
+  var Ctx = window.AudioContext || window.webkitAudioContext;
+  if (!Ctx) return;
+  var ws = null;
+  var config = null;
+  var ctx = null, analyser = null;
+  var binBand = null, counts = null, spectrum = null, samples = null;
+  var timer = null;
+
+  function setup() {
+    if (ctx || !config) return;
+    try {
+      ctx = new Ctx();
+      analyser = ctx.createAnalyser();
+      ctx.createMediaElementSource(audio).connect(analyser);
+      analyser.connect(ctx.destination);
+    } catch (e) {
+      console.warn('Band analysis unavailable, the Pi will analyse instead', e);
+      ctx = analyser = null;
+      return;
+    }
+    analyser.fftSize = config.fft_size;
+    analyser.smoothingTimeConstant = 0;   // the Pi smooths brightness itself
+    var bins = analyser.frequencyBinCount;
+    var nBands = config.edges.length - 1;
+    spectrum = new Float32Array(bins);
+    samples = new Float32Array(config.fft_size);
+    binBand = new Int16Array(bins);
+    counts = new Float32Array(nBands);
+    for (var k = 0; k < bins; k++) {
+      var f = k * ctx.sampleRate / config.fft_size, b = -1;
+      while (b + 1 < config.edges.length && config.edges[b + 1] <= f) b++;
+      binBand[k] = b < nBands ? b : -1;
+      if (binBand[k] >= 0) counts[binBand[k]]++;
+    }
+    if (ctx.state === 'suspended') ctx.resume();
+  }
+
+  function code(db) {
+    var q = Math.round((db - config.min_db) * 255 / (config.max_db - config.min_db));
+    return q < 0 ? 0 : q > 255 ? 255 : q;
+  }
+
+  function send() {
+    if (!analyser || !ws || ws.readyState !== WebSocket.OPEN) return;
+    if (audio.paused || audio.ended) return;
+    var nBands = counts.length;
+    var bands = new Float32Array(nBands);
+    analyser.getFloatFrequencyData(spectrum);
+    // The analyser reports |X|/N in dB with a Blackman window; rescale to the
+    // Pi's unnormalised Hann-windowed rFFT (coherent gain 0.5 vs 0.42).
+    var scale = config.fft_size * 0.5 / 0.42;
+    var peak = 0, peakMag = -1;
+    for (var k = 0; k < spectrum.length; k++) {
+      var mag = Math.pow(10, spectrum[k] / 20) * scale;
+      if (mag > peakMag) { peak = k; peakMag = mag; }
+      if (binBand[k] >= 0) bands[binBand[k]] += mag;
+    }
+    analyser.getFloatTimeDomainData(samples);
+    var sum = 0;
+    for (var i = 0; i < samples.length; i++) sum += samples[i] * samples[i];
+
+    var msg = new Uint8Array(nBands + 2);
+    for (var b = 0; b < nBands; b++) {
+      msg[b] = counts[b] > 0 && bands[b] > 0 ? code(20 * Math.log10(bands[b] / counts[b])) : 0;
+    }
+    msg[nBands] = Math.min(255, Math.round(Math.sqrt(sum / samples.length) * 255));
+    msg[nBands + 1] = Math.round(peak / (spectrum.length - 1) * 255);
+    ws.send(msg.buffer);
+  }
+
+  function connect() {
+    var proto = location.protocol === 'https:' ? 'wss://' : 'ws://';
+    ws = new WebSocket(proto + location.host + (path || '/bands'));
+    ws.binaryType = 'arraybuffer';
+    ws.onmessage = function (ev) {
+      var msg = JSON.parse(ev.data);
+      if (msg.type !== 'config') return;
+      config = msg;
+      if (!audio.paused) setup();
+      clearInterval(timer);
+      timer = setInterval(send, 1000 / config.fps);
+    };
+    ws.onclose = function () { setTimeout(connect, 1000); };
+  }
+
+  // Audio contexts may only start from a user gesture, so wait for play.
+  audio.addEventListener('play', setup);
+  connect();
+}
@@ -0,0 +1,51 @@
+// Keeps the Pi's show clock locked to an <audio> element.
+// Estimates the offset between this page's clock and the server's from
+// ping/pong round trips (lowest round trip wins), then reports the audio
+// position, the server time it was sampled at and whether it is playing.
+// The 'ended' event is flagged so the Pi can end the show.
+function startPlaybackSync(audio, path) {
+  var ws = null;
+  var offsets = [];
+  var stalled = false;
+
+  function now() { return performance.now() / 1000; }
+
+  function bestOffset() {
+    return offsets.reduce(function (a, b) { return b.rtt < a.rtt ? b : a; }).offset;
+  }
+
+  function connect() {
+    var proto = location.protocol === 'https:' ? 'wss://' : 'ws://';
+    ws = new WebSocket(proto + location.host + (path || '/sync'));
+    ws.onmessage = function (ev) {
+      var msg = JSON.parse(ev.data);
+      if (msg.type === 'pong') {
+        var c1 = now();
+        offsets.push({rtt: c1 - msg.c0, offset: msg.s - (msg.c0 + c1) / 2});
+        if (offsets.length > 8) offsets.shift();
+      }
+    };
+    ws.onclose = function () { setTimeout(connect, 1000); };
+  }
+
+  function report(ended) {
+    if (!ws || ws.readyState !== WebSocket.OPEN) return;
+    ws.send(JSON.stringify({type: 'ping', c0: now()}));
+    if (!offsets.length) return;
+    ws.send(JSON.stringify({
+      type: 'position',
+      pos: audio.currentTime,
+      t: now() + bestOffset(),
+      playing: !audio.paused && !audio.ended && !stalled && audio.readyState >= 3,
+      ended: ended === true
+    }));
+  }
+
+  audio.addEventListener('waiting', function () { stalled = true; report(); });
+  audio.addEventListener('playing', function () { stalled = false; report(); });
+  audio.addEventListener('pause', report);
+  audio.addEventListener('seeked', report);
+  audio.addEventListener('ended', function () { report(true); });
+  setInterval(report, 250);
+  connect();
+}
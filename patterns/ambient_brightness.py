@@ -1,6 +1,7 @@
 import time
 import smbus
 from rpi_ws281x import PixelStrip
+import framebus   # publishes shown frames for the web preview
 
 BH1750_ADDR = 0x23
 BH1750_CMD  = 0x10
@@ -35,4 +36,6 @@ def _patched_show(self, *args, **kwargs):
     self.setBrightness(br)
     return _original_show(self, *args, **kwargs)
 
-PixelStrip.show = _patched_show
+# Offscreen patterns (playlist children) leave brightness to the runner.
+if not framebus.OFFSCREEN:
+    PixelStrip.show = _patched_show
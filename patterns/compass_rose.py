@@ -1,14 +1,20 @@
 """
 Compass Rose / Angular Starburst effect on a 3D LED tree:
 Lights up LEDs in rotating angular slices (like a compass needle or starburst).
+Optionally renders several beams at different speeds and/or soft beam edges.
+Width, speed, interval, color, direction and softness can be changed live
+through the control channel (see control.py).
 """
 import os
 import time
 import math
 import argparse
+import numpy as np
 import pandas as pd
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness
+from led_frame import FrameWriter
+from control import ControlChannel
 
 parser = argparse.ArgumentParser(description="Compass Rose angular starburst on 3D LED tree")
 parser.add_argument("-n", "--num-slices", type=int, default=8,
@@ -23,11 +29,15 @@ parser.add_argument("--color", nargs=3, type=int, default=[255,255,255], metavar
                     help="Beam color RGB")
 parser.add_argument("--reverse", action="store_true",
                     help="Rotate in reverse direction")
+parser.add_argument("--soft", action="store_true",
+                    help="Continuous angular falloff instead of hard slices")
+parser.add_argument("--beam-rps", nargs="+", type=float, default=None, metavar="RPS",
+                    help="One rotation speed per beam (overrides --rps; beams start evenly spaced)")
 args = parser.parse_args()
 
 NUM_SLICES = args.num_slices
 WIDTH      = max(1, min(NUM_SLICES, args.width))
-RPS        = args.rps
+BEAM_RPS   = np.array(args.beam_rps or [args.rps])
 INTERVAL   = args.interval
 COLOR      = tuple(args.color)
 REVERSE    = -1.0 if args.reverse else 1.0
@@ -35,19 +45,17 @@ REVERSE    = -1.0 if args.reverse else 1.0
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
 df         = pd.read_csv(COORDS_CSV)
-positions  = df[['X','Y','Z']].values.tolist()
+positions  = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT  = len(positions)
 
-xs = [p[0] for p in positions]
-ys = [p[1] for p in positions]
-cx = sum(xs) / LED_COUNT
-cy = sum(ys) / LED_COUNT
+cx, cy = positions[:, 0].mean(), positions[:, 1].mean()
+theta     = np.arctan2(positions[:, 1] - cy, positions[:, 0] - cx)  # -pi..pi
+led_frac  = (theta / (2 * math.pi) + 1.0) % 1.0                     # normalize to [0,1)
+led_slice = (led_frac * NUM_SLICES).astype(np.intp) % NUM_SLICES
 
-led_frac = []
-for x, y, _ in positions:
-    theta = math.atan2(y - cy, x - cx)  # -pi..pi
-    frac  = (theta / (2 * math.pi) + 1.0) % 1.0  # normalize to [0,1)
-    led_frac.append(frac)
+BEAM_START = np.arange(len(BEAM_RPS)) / len(BEAM_RPS)
+HALF_WIDTH = WIDTH / (2 * NUM_SLICES)
+COLOR_ARR  = np.array(COLOR, dtype=np.float32)
 
 LED_PIN        = 18
 LED_FREQ_HZ    = 800000
@@ -60,28 +68,39 @@ strip = PixelStrip(
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
 strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
+control = ControlChannel(args)
 
-def clear_strip():
-    """Turn off all LEDs."""
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
+def beam_intensity(pos):
+    """
+    Per-LED intensity (0-1) for beams whose leading edges sit at the
+    angular fractions in `pos`.
+    """
+    if args.soft:
+        d = np.abs((led_frac[None, :] - pos[:, None] - HALF_WIDTH + 0.5) % 1.0 - 0.5)
+        level = 0.5 * (1 + np.cos(np.pi * np.minimum(d / HALF_WIDTH, 1.0)))
+        return level.max(axis=0)
+    current_slice = (pos * NUM_SLICES).astype(np.intp)
+    lit = (led_slice[None, :] - current_slice[:, None]) % NUM_SLICES < WIDTH
+    return lit.any(axis=0).astype(np.float32)
 
-start = time.perf_counter()
+# Beam positions advance by speed * dt, so speed changes don't make them jump.
+pos  = BEAM_START.copy()
+last = time.perf_counter()
 try:
     while True:
-        t = (time.perf_counter() - start)
-        pos = (t * RPS * REVERSE) % 1.0
-        current_slice = int(pos * NUM_SLICES)
-        active = {(current_slice + offset) % NUM_SLICES for offset in range(WIDTH)}
-
-        clear_strip()
-        for i, frac in enumerate(led_frac):
-            slice_idx = int(frac * NUM_SLICES)
-            if slice_idx in active:
-                strip.setPixelColor(i, Color(*COLOR))
-        strip.show()
+        if control.poll():
+            WIDTH      = max(1, min(NUM_SLICES, args.width))
+            HALF_WIDTH = WIDTH / (2 * NUM_SLICES)
+            BEAM_RPS   = np.array(args.beam_rps or [args.rps])
+            INTERVAL   = args.interval
+            COLOR_ARR  = np.array(args.color, dtype=np.float32)
+            REVERSE    = -1.0 if args.reverse else 1.0
+        now = time.perf_counter()
+        pos = (pos + (now - last) * BEAM_RPS * REVERSE) % 1.0
+        last = now
+        frame.show(beam_intensity(pos)[:, None] * COLOR_ARR)
         time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
-    clear_strip()
-    strip.show()
+    frame.clear()
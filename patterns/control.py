@@ -0,0 +1,71 @@
+"""
+Live parameter updates for running patterns.
+
+app.py starts a pattern with the path of a Unix datagram socket in
+XMAS_CONTROL_SOCKET. Each datagram is a JSON object mapping argparse dest
+names to new values. A pattern creates a ControlChannel around its parsed
+args and calls poll() once per frame; poll() applies whatever arrived to the
+args namespace and returns the names that changed, so the next frame is
+drawn with the new values and the pattern can rebuild anything derived
+from them.
+"""
+import os
+import json
+import socket
+
+CONTROL_ENV = "XMAS_CONTROL_SOCKET"
+
+
+class ControlChannel:
+    """Receiving end, bound by the pattern process. Inert if no path is set."""
+
+    def __init__(self, args, path=None):
+        self.args = args
+        self.path = path or os.environ.get(CONTROL_ENV)
+        self.sock = None
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sock.bind(self.path)
+            self.sock.setblocking(False)
+
+    def poll(self):
+        """Apply pending updates to args; returns the set of changed names."""
+        changed = set()
+        if self.sock is None:
+            return changed
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            try:
+                update = json.loads(data)
+            except ValueError:
+                continue
+            for name, value in update.items():
+                if hasattr(self.args, name) and getattr(self.args, name) != value:
+                    setattr(self.args, name, value)
+                    changed.add(name)
+        return changed
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.sock = None
+
+
+def send_params(path, params):
+    """
+    Send a parameter update to the pattern listening on `path`. Returns
+    False if nothing is listening (yet).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.sendto(json.dumps(params).encode(), path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+    return True
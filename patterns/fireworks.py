@@ -1,15 +1,16 @@
 import time
 import random
-import math
 import pandas as pd
 from rpi_ws281x import PixelStrip, Color
 import ambient_brightness
+from spatial_index import SpatialIndex
 
 BASE_DIR   = __import__('os').path.dirname(__import__('os').path.abspath(__file__))
 COORDS_CSV = __import__('os').path.join(BASE_DIR, 'coordinates.csv')
 df         = pd.read_csv(COORDS_CSV)
 df['led_index'] = df.index
 LED_COUNT  = len(df)
+index      = SpatialIndex.from_csv(COORDS_CSV)
 
 LED_PIN        = 18
 LED_FREQ_HZ    = 800000
@@ -58,17 +59,9 @@ def animate_fireworks(interval=0.05,
         prev_time = now
 
         if random.random() < spawn_chance:
-            center = df.sample(n=1).iloc[0]
-            cx, cy, cz = center['X'], center['Y'], center['Z']
-            local_leds = []
-            for _, row in df.iterrows():
-                dx = row['X'] - cx
-                dy = row['Y'] - cy
-                dz = row['Z'] - cz
-                if math.sqrt(dx*dx + dy*dy + dz*dz) <= local_radius:
-                    local_leds.append(int(row['led_index']))
-            if not local_leds:
-                local_leds = [int(center['led_index'])]
+            center_idx = random.randrange(LED_COUNT)
+            _, hits, _ = index.within_radius(index.positions[center_idx], local_radius)
+            local_leds = hits.tolist() or [center_idx]
             chosen_group = random.choice(color_groups)
             colors = {idx: random.choice(chosen_group) for idx in local_leds}
             active_fireworks.append({
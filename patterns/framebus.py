@@ -0,0 +1,271 @@
+"""
+Shared-memory snapshot of the last frame shown on the tree.
+
+Importing this module hooks PixelStrip.show (like ambient_brightness does) so
+that, while someone is watching the web preview, every committed frame is
+copied into a small memory-mapped file. The web app reads that snapshot and
+streams it to browsers; the pattern never serializes or talks to clients, and
+when nobody is watching the hook only checks a timestamp.
+
+With XMAS_OFFSCREEN set to a file path, the pattern renders offscreen
+instead: PixelStrip becomes an in-memory strip that never touches the
+hardware, and every show() publishes into that file. The first show()
+blocks until the file's gate is opened, so the playlist runner can start a
+pattern early, let it do its setup, and only have it render once its
+transition begins (see playlist.py).
+
+File layout (little endian):
+  0   uint32   seq           even when stable, odd while a frame is written
+  4   uint32   led_count
+  8   float64  viewer_until  time.time() until which a viewer is connected
+  16  float64  frame_time    time.time() of the last published frame
+  24  uint32   gate          offscreen patterns render once this is non-zero
+  28  uint32   (unused)
+  32  uint8    rgb[led_count][3]
+"""
+import os
+import mmap
+import json
+import time
+import struct
+import tempfile
+import threading
+import numpy as np
+from rpi_ws281x import PixelStrip
+
+FRAMEBUS_ENV   = "XMAS_FRAMEBUS"
+OFFSCREEN_ENV  = "XMAS_OFFSCREEN"
+OFFSCREEN      = os.environ.get(OFFSCREEN_ENV)
+HEADER_SIZE    = 32
+STRIP_ORDER    = [1, 0, 2]   # the tree's strip is GRB: packed colors are Color(g, r, b)
+VIEWER_TIMEOUT = 2.0   # seconds a viewer mark stays valid without refresh
+
+
+def bus_path():
+    """Path of the shared frame file (XMAS_FRAMEBUS, else in /dev/shm)."""
+    if os.environ.get(FRAMEBUS_ENV):
+        return os.environ[FRAMEBUS_ENV]
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "xmas-framebus")
+
+
+class FrameBus:
+    """
+    One side of the shared frame file. Both the pattern and the web app
+    open it with their LED count; the file only ever grows, so a mapping
+    can't end up past the end of it.
+    """
+
+    def __init__(self, led_count, path=None):
+        size = HEADER_SIZE + led_count * 3
+        fd = os.open(path or bus_path(), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.led_count = led_count
+        self.counters  = np.frombuffer(self.mm, dtype=np.uint32, count=2)
+        self.times     = np.frombuffer(self.mm, dtype=np.float64, count=2, offset=8)
+        self.gate      = np.frombuffer(self.mm, dtype=np.uint32, count=1, offset=24)
+        self.pixels    = np.frombuffer(self.mm, dtype=np.uint8, count=led_count * 3,
+                                       offset=HEADER_SIZE).reshape(led_count, 3)
+
+    def viewed(self):
+        return time.time() < self.times[0]
+
+    def mark_viewed(self):
+        self.times[0] = time.time() + VIEWER_TIMEOUT
+
+    def open_gate(self):
+        self.gate[0] = 1
+
+    def gate_open(self):
+        return bool(self.gate[0])
+
+    def has_frame(self):
+        return int(self.counters[0]) > 0
+
+    def publish(self, rgb):
+        """Copy an (N, 3) 0-255 frame into the snapshot."""
+        seq = int(self.counters[0])
+        self.counters[0] = seq + 1
+        self.pixels[:] = rgb
+        self.counters[1] = self.led_count
+        self.times[1] = time.time()
+        self.counters[0] = seq + 2
+
+    def publish_packed(self, packed):
+        """
+        Publish 24-bit strip colors. The strip is GRB, so red is bits 8-15
+        and green bits 16-23.
+        """
+        packed = np.asarray(packed, dtype=np.uint32)
+        self.publish((packed[:, None] >> np.array([8, 16, 0], dtype=np.uint32)) & 0xFF)
+
+    def snapshot(self, out):
+        """
+        Copy the current frame into out; returns (seq, frame_time), or None
+        if a writer kept it busy.
+        """
+        for _ in range(8):
+            seq = int(self.counters[0])
+            if seq & 1:
+                continue
+            out[:] = self.pixels
+            frame_time = float(self.times[1])
+            if int(self.counters[0]) == seq:
+                return seq, frame_time
+        return None
+
+
+def encode_key(rgb):
+    """Whole frame: b'K' + N*3 RGB bytes."""
+    return b"K" + rgb.tobytes()
+
+
+def encode_delta(rgb, prev):
+    """
+    Changed LEDs since prev: b'D' + uint16 count + count * (uint16 index,
+    R, G, B). Falls back to a key frame when that would be smaller.
+    """
+    changed = np.flatnonzero((rgb != prev).any(axis=1))
+    if 3 + 5 * len(changed) >= 1 + rgb.size:
+        return encode_key(rgb)
+    records = np.empty(len(changed), dtype=[("index", "<u2"), ("rgb", "u1", 3)])
+    records["index"] = changed
+    records["rgb"] = rgb[changed]
+    return b"D" + struct.pack("<H", len(changed)) + records.tobytes()
+
+
+class PreviewHub:
+    """
+    Web-app side: one thread samples the bus for all connected clients and
+    keeps the latest frame with its pre-encoded key frame, so per-client
+    work is only decimation and delta encoding.
+    """
+
+    def __init__(self, led_count, max_fps=60.0):
+        self.led_count  = led_count
+        self.max_fps    = max_fps
+        self.lock       = threading.Lock()
+        self.clients    = 0
+        self.latest     = None   # (seq, rgb, key_bytes)
+        self.source_fps = 0.0
+        self.thread     = None
+
+    def join(self):
+        with self.lock:
+            self.clients += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def leave(self):
+        with self.lock:
+            self.clients -= 1
+
+    def stats(self):
+        return json.dumps({"type": "stats", "source_fps": round(self.source_fps, 1),
+                           "clients": self.clients})
+
+    def _run(self):
+        bus = FrameBus(self.led_count)
+        frame = np.zeros((self.led_count, 3), dtype=np.uint8)
+        last_seq, last_time = None, None
+        while True:
+            if self.clients <= 0:
+                self.source_fps = 0.0
+                time.sleep(0.5)
+                continue
+            bus.mark_viewed()
+            snap = bus.snapshot(frame)
+            if snap is not None and snap[0] != last_seq:
+                seq, frame_time = snap
+                if last_time is not None and frame_time > last_time:
+                    # Frames published per second by the pattern, smoothed.
+                    steps = max(1, (seq - last_seq) // 2)
+                    rate = steps / (frame_time - last_time)
+                    self.source_fps = 0.8 * self.source_fps + 0.2 * rate if self.source_fps else rate
+                last_seq, last_time = seq, frame_time
+                rgb = frame.copy()
+                self.latest = (seq, rgb, encode_key(rgb))
+            time.sleep(1.0 / self.max_fps)
+
+
+class OffscreenStrip:
+    """
+    Stand-in for the parts of PixelStrip the patterns use, backed by a
+    numpy buffer. Brightness is left to whoever shows the frame for real.
+    """
+
+    def __init__(self, num, *args, **kwargs):
+        self.pixels     = np.zeros(num, dtype=np.uint32)
+        self.brightness = 255
+
+    def begin(self):
+        pass
+
+    def show(self):
+        global _bus
+        if _bus is None:
+            _bus = FrameBus(len(self.pixels), OFFSCREEN)
+        while not _bus.gate_open():
+            time.sleep(0.02)
+        _bus.publish_packed(self.pixels)
+
+    def numPixels(self):
+        return len(self.pixels)
+
+    def __len__(self):
+        return len(self.pixels)
+
+    def setPixelColor(self, n, color):
+        self.pixels[n] = color
+
+    def setPixelColorRGB(self, n, red, green, blue, white=0):
+        self.pixels[n] = (red << 16) | (green << 8) | blue
+
+    def getPixelColor(self, n):
+        return int(self.pixels[n])
+
+    def __setitem__(self, pos, value):
+        self.pixels[pos] = value
+
+    def __getitem__(self, pos):
+        return self.pixels[pos]
+
+    def setBrightness(self, brightness):
+        self.brightness = brightness
+
+    def getBrightness(self):
+        return self.brightness
+
+
+_bus = None
+_original_show = PixelStrip.show
+
+
+def _publishing_show(self, *args, **kwargs):
+    global _bus
+    result = _original_show(self, *args, **kwargs)
+    if _bus is None:
+        try:
+            _bus = FrameBus(self.numPixels())
+        except OSError:
+            _bus = False
+    if _bus and _bus.viewed():
+        # FrameWriter leaves its packed frame on the strip; others are read back.
+        packed = getattr(self, "framebuffer", None)
+        _bus.publish_packed(packed if packed is not None else self[:])
+    return result
+
+if OFFSCREEN:
+    # Patterns hold the PixelStrip class already, so swap its methods.
+    for _name in ("__init__", "begin", "show", "numPixels", "__len__", "setPixelColor",
+                  "setPixelColorRGB", "getPixelColor", "__setitem__", "__getitem__",
+                  "setBrightness", "getBrightness"):
+        setattr(PixelStrip, _name, getattr(OffscreenStrip, _name))
+else:
+    PixelStrip.show = _publishing_show
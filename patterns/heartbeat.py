@@ -1,14 +1,51 @@
+"""
+Heartbeat effect on a 3D LED tree:
+A double-pulse "lub-dub" glow. With --spatial, each beat ripples outward from
+a center LED instead of lighting the whole tree at once.
+Period, intensities and frame delay can be changed live (control.py).
+"""
 import os
 import time
-import math
+import argparse
+import numpy as np
 import pandas as pd
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness
+from led_frame import FrameWriter
+from control import ControlChannel
+
+parser = argparse.ArgumentParser(description="Heartbeat pulse on 3D LED tree")
+parser.add_argument("--period", type=float, default=1.0,
+                    help="Seconds per heartbeat cycle (~60 BPM)")
+parser.add_argument("--min-intensity", type=int, default=20,
+                    help="LED value at trough")
+parser.add_argument("--max-intensity", type=int, default=255,
+                    help="LED value at peak")
+parser.add_argument("--frame-delay", type=float, default=0.02,
+                    help="Seconds between frames")
+parser.add_argument("--spatial", action="store_true",
+                    help="Propagate each beat outward from --center")
+parser.add_argument("--center", type=int, default=None,
+                    help="Index of the LED the beat starts from (default: nearest to tree centroid)")
+parser.add_argument("--wave-speed", type=float, default=20.0,
+                    help="Propagation speed of the spatial beat (units per second)")
+parser.add_argument("--lut-size", type=int, default=512,
+                    help="Envelope samples per beat period")
+args = parser.parse_args()
+if not args.wave_speed > 0:
+    parser.error("--wave-speed must be positive")
+
+BEAT_PERIOD     = args.period
+MIN_INTENSITY   = args.min_intensity
+MAX_INTENSITY   = args.max_intensity
+FRAME_DELAY     = args.frame_delay
+LUT_SIZE        = max(2, args.lut_size)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
 df = pd.read_csv(COORDS_CSV)
-LED_COUNT = len(df)
+positions = df[['X','Y','Z']].to_numpy(dtype=float)
+LED_COUNT = len(positions)
 
 LED_PIN        = 18      # PWM pin
 LED_FREQ_HZ    = 800000  # LED signal frequency in hertz
@@ -22,38 +59,63 @@ strip = PixelStrip(
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
 strip.begin()
-
-BEAT_PERIOD     = 1.0    # seconds per heartbeat cycle (~60 BPM)
-MIN_INTENSITY   = 20     # LED value at trough
-MAX_INTENSITY   = 255    # LED value at peak
-FRAME_DELAY     = 0.02   # ~50 FPS
+frame = FrameWriter(strip, LED_COUNT)
+control = ControlChannel(args)
 
 def heartbeat_envelope(t, period=BEAT_PERIOD):
     """
     Double‑pulse heartbeat curve using two Gaussians:
      - Primary pulse at t=0
      - Secondary (softer) at t=0.3*period
-    Returns a value in [0,1].
+    Accepts scalars or arrays; returns values in [0,1].
     """
     sigma1 = period * 0.08
     sigma2 = period * 0.08
-    p1 = math.exp(-0.5 * (t / sigma1) ** 2)
-    p2 = 0.6 * math.exp(-0.5 * ((t - 0.3 * period) / sigma2) ** 2)
+    p1 = np.exp(-0.5 * (t / sigma1) ** 2)
+    p2 = 0.6 * np.exp(-0.5 * ((t - 0.3 * period) / sigma2) ** 2)
     val = p1 + p2
-    return min(val, 1.0)
+    return np.minimum(val, 1.0)
+
+# Green level for each envelope sample, tabulated once per period.
+ENV_LUT   = heartbeat_envelope(np.arange(LUT_SIZE) * (BEAT_PERIOD / LUT_SIZE))
+LEVEL_LUT = MIN_INTENSITY + ENV_LUT * (MAX_INTENSITY - MIN_INTENSITY)
+
+if args.spatial:
+    if args.center is None:
+        center_idx = int(np.argmin(np.linalg.norm(positions - positions.mean(axis=0), axis=1)))
+    else:
+        center_idx = args.center
+    delay = np.linalg.norm(positions - positions[center_idx], axis=1) / args.wave_speed
+else:
+    delay = np.zeros(LED_COUNT)
+
+# Beat arrival per LED expressed in LUT steps, so a frame is one subtract,
+# one modulo and one gather.
+delay_steps = delay * (LUT_SIZE / BEAT_PERIOD)
+rgb = np.zeros((LED_COUNT, 3))
 
+# The LUT position accumulates dt / period, so period changes don't make it jump.
+step = 0.0
 try:
-    start_time = time.time()
+    last = time.time()
     while True:
-        elapsed = (time.time() - start_time) % BEAT_PERIOD
-        env = heartbeat_envelope(elapsed)
-        brightness = int(MIN_INTENSITY + env * (MAX_INTENSITY - MIN_INTENSITY))
-        color = Color(0, brightness, 0)
-        for i in range(LED_COUNT):
-            strip.setPixelColor(i, color)
-        strip.show()  
+        changed = control.poll()
+        if changed:
+            FRAME_DELAY = args.frame_delay
+            if changed & {"period", "min_intensity", "max_intensity"}:
+                BEAT_PERIOD   = args.period
+                MIN_INTENSITY = args.min_intensity
+                MAX_INTENSITY = args.max_intensity
+                ENV_LUT       = heartbeat_envelope(np.arange(LUT_SIZE) * (BEAT_PERIOD / LUT_SIZE), BEAT_PERIOD)
+                LEVEL_LUT     = MIN_INTENSITY + ENV_LUT * (MAX_INTENSITY - MIN_INTENSITY)
+                delay_steps   = delay * (LUT_SIZE / BEAT_PERIOD)
+        now = time.time()
+        step += (now - last) * (LUT_SIZE / BEAT_PERIOD)
+        last = now
+        idx = np.floor(step - delay_steps).astype(np.intp) % LUT_SIZE
+        rgb[:, 1] = LEVEL_LUT[idx]
+        frame.show(rgb)
         time.sleep(FRAME_DELAY)
 
 except KeyboardInterrupt:
-    strip.clear()
-    strip.show()
+    frame.clear()
@@ -1,14 +1,19 @@
 """
 Double Helix DNA Twist effect on a 3D LED tree:
 Two intertwining color bands spiral up/down the tree.
+Speed, direction, colors, turns, range and interval can be changed live
+(control.py).
 """
 import os
 import time
 import math
 import argparse
 import pandas as pd
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness
+from helix_field import HelixField
+from led_frame import FrameWriter
+from control import ControlChannel
 
 parser = argparse.ArgumentParser(description="Double Helix DNA Twist on 3D LED tree")
 parser.add_argument("--interval", type=float, default=0.05,
@@ -25,34 +30,33 @@ parser.add_argument("--reverse", action="store_true",
                     help="Reverse vertical direction")
 parser.add_argument("--range", type=float, default=1.0,
                     help="Fraction of tree height to animate (0–1)")
+parser.add_argument("--strands", type=int, default=2,
+                    help="Number of evenly spaced strands (colors alternate color1/color2)")
+parser.add_argument("--colors", nargs="+", type=int, default=None, metavar="RGB",
+                    help="Explicit strand colors as R G B triplets (overrides color1/color2)")
+parser.add_argument("--lut", type=int, default=0,
+                    help="Sine lookup table size (0 = exact sine)")
 args = parser.parse_args()
+if args.colors is not None and len(args.colors) % 3:
+    parser.error("--colors takes R G B triplets")
 
 INTERVAL = args.interval
 RPS      = args.rps
 TURNS    = args.turns
-COLOR1   = tuple(args.color1)
-COLOR2   = tuple(args.color2)
+COLORS   = ([args.colors[i:i+3] for i in range(0, len(args.colors), 3)]
+            if args.colors else [args.color1, args.color2])
+STRANDS  = max(1, args.strands)
 REVERSE  = -1.0 if args.reverse else 1.0
 Z_RANGE  = max(0.0, min(1.0, args.range))
 
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
 df         = pd.read_csv(COORDS_CSV)
-positions  = df[['X','Y','Z']].values.tolist()
+positions  = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT  = len(positions)
 
-zs = [p[2] for p in positions]
-z_min, z_max = min(zs), max(zs)
-height = z_max - z_min if z_max>z_min else 1.0
-
-led_theta = []
-led_znorm = []
-for x, y, z in positions:
-    theta = math.atan2(y, x)  # -π..π
-    z_norm = (z - z_min) / height
-    z_norm = z_norm * Z_RANGE
-    led_theta.append(theta)
-    led_znorm.append(z_norm)
+field         = HelixField(positions, TURNS, Z_RANGE, lut_size=args.lut)
+strand_colors = [COLORS[k % len(COLORS)] for k in range(STRANDS)]
 
 LED_PIN        = 18
 LED_FREQ_HZ    = 800000
@@ -66,30 +70,31 @@ strip = PixelStrip(
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
 strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
+control = ControlChannel(args)
 
-def clear_strip():
-    """Turn off all LEDs."""
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
-
-start = time.perf_counter()
+# The phase accumulates speed * dt, so speed changes don't make it jump.
+t    = 0.0
+last = time.perf_counter()
 try:
     while True:
-        t = (time.perf_counter() - start) * RPS * 2 * math.pi * REVERSE
-        clear_strip()
-        for i in range(LED_COUNT):
-            theta = led_theta[i]
-            zf    = led_znorm[i]
-            phase = theta + t + 2 * math.pi * TURNS * (1 - zf)
-            v1 = max(0.0, math.sin(phase))
-            v2 = max(0.0, math.sin(phase + math.pi))
-            r = int(COLOR1[0] * v1 + COLOR2[0] * v2)
-            g = int(COLOR1[1] * v1 + COLOR2[1] * v2)
-            b = int(COLOR1[2] * v1 + COLOR2[2] * v2)
-            strip.setPixelColor(i, Color(r, g, b))
-        strip.show()
+        changed = control.poll()
+        if changed:
+            INTERVAL = args.interval
+            RPS      = args.rps
+            REVERSE  = -1.0 if args.reverse else 1.0
+            if changed & {"color1", "color2"} and not args.colors:
+                COLORS        = [args.color1, args.color2]
+                strand_colors = [COLORS[k % len(COLORS)] for k in range(STRANDS)]
+            if changed & {"turns", "range"}:
+                TURNS   = args.turns
+                Z_RANGE = max(0.0, min(1.0, args.range))
+                field   = HelixField(positions, TURNS, Z_RANGE, lut_size=args.lut)
+        now = time.perf_counter()
+        t += (now - last) * RPS * 2 * math.pi * REVERSE
+        last = now
+        frame.show(field.strands(t, strand_colors))
         time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
-    clear_strip()
-    strip.show()
+    frame.clear()
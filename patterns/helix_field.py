@@ -0,0 +1,76 @@
+"""
+Cylindrical-phase engine shared by the helix-style patterns.
+
+Every LED gets a static phase theta + 2*pi*turns*(1 - z_norm), with theta
+measured around the tree centroid. A frame only adds the current spin to that
+precomputed phase and evaluates one vectorized sine (optionally through a
+lookup table), then maps the result onto strand colors or a color ramp.
+"""
+import math
+import numpy as np
+
+
+def make_ramp(stops, size=256):
+    """
+    Linearly interpolate a list of RGB stops into a (size, 3) color table.
+    """
+    stops = np.asarray(stops, dtype=np.float32).reshape(-1, 3)
+    if len(stops) == 1:
+        return np.repeat(stops, size, axis=0)
+    x = np.linspace(0.0, len(stops) - 1, size)
+    return np.stack([np.interp(x, np.arange(len(stops)), stops[:, c])
+                     for c in range(3)], axis=1)
+
+
+class HelixField:
+    """
+    Precomputed helix phase for a set of LED positions.
+
+    positions: (N, 3) array of LED coordinates.
+    turns:     helix turns from bottom to top.
+    z_range:   fraction of the tree height the helix spans (0-1).
+    lut_size:  entries in a sine lookup table; 0 uses np.sin directly.
+    """
+
+    def __init__(self, positions, turns, z_range=1.0, lut_size=0):
+        positions = np.asarray(positions, dtype=float)
+        cx, cy = positions[:, 0].mean(), positions[:, 1].mean()
+        theta  = np.arctan2(positions[:, 1] - cy, positions[:, 0] - cx)
+        z      = positions[:, 2]
+        height = z.max() - z.min()
+        z_norm = (z - z.min()) / height if height > 0 else np.zeros_like(z)
+        z_norm = z_norm * max(0.0, min(1.0, z_range))
+
+        self.base_phase = theta + 2 * math.pi * turns * (1 - z_norm)
+        self.lut = None
+        if lut_size:
+            self.lut = np.sin(np.arange(lut_size) * (2 * math.pi / lut_size))
+            self.lut_scale = lut_size / (2 * math.pi)
+
+    def wave(self, spin):
+        """sin(base_phase + spin) for every LED."""
+        phase = self.base_phase + spin
+        if self.lut is None:
+            return np.sin(phase)
+        idx = np.floor(phase * self.lut_scale).astype(np.intp) % len(self.lut)
+        return self.lut[idx]
+
+    def strands(self, spin, colors):
+        """
+        Sum of K evenly spaced strands: strand k contributes
+        colors[k] * max(0, sin(phase + 2*pi*k/K)). Returns an (N, 3) frame.
+        """
+        colors = np.asarray(colors, dtype=np.float32)
+        frame = np.zeros((len(self.base_phase), 3), dtype=np.float32)
+        for k, color in enumerate(colors):
+            v = np.maximum(self.wave(spin + 2 * math.pi * k / len(colors)), 0.0)
+            frame += v[:, None] * color
+        return frame
+
+    def ramp(self, spin, table):
+        """
+        Map 0.5 * (1 + sin(phase)) onto a (M, 3) color table from make_ramp.
+        """
+        u = 0.5 * (1.0 + self.wave(spin))
+        idx = (np.clip(u, 0.0, 1.0) * (len(table) - 1)).astype(np.intp)
+        return table[idx]
@@ -0,0 +1,51 @@
+"""
+Framebuffer helpers shared by the array-based patterns.
+
+Patterns build each frame as an (LED_COUNT, 3) RGB array and hand it to a
+FrameWriter, which packs it into 24-bit colors and only pushes the LEDs that
+changed since the previous frame to the strip. The packed frame is left on
+the strip as `framebuffer`, which the preview hook in framebus publishes.
+"""
+import numpy as np
+
+
+def pack_rgb(rgb):
+    """
+    Pack an (N, 3) array of 0-255 R, G, B values into uint32 colors,
+    matching rpi_ws281x.Color(r, g, b). music/color_math.py has a copy for
+    the music apps; keep the two identical.
+    """
+    rgb = np.clip(rgb, 0, 255).astype(np.uint32)
+    return (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+class FrameWriter:
+    """
+    Writes RGB frames to a PixelStrip, skipping LEDs whose color is unchanged.
+    """
+
+    def __init__(self, strip, led_count):
+        self.strip = strip
+        self.led_count = led_count
+        self.last = np.full(led_count, 0xFFFFFFFF, dtype=np.uint32)
+
+    def write(self, rgb):
+        """Stage an (N, 3) RGB frame on the strip without showing it."""
+        packed = pack_rgb(rgb)
+        changed = np.flatnonzero(packed != self.last)
+        if len(changed) == self.led_count:
+            self.strip[:] = packed.tolist()
+        else:
+            for i, c in zip(changed.tolist(), packed[changed].tolist()):
+                self.strip.setPixelColor(i, c)
+        self.last = packed
+        self.strip.framebuffer = packed
+
+    def show(self, rgb):
+        """Write an (N, 3) RGB frame and latch it onto the LEDs."""
+        self.write(rgb)
+        self.strip.show()
+
+    def clear(self):
+        """Turn off all LEDs."""
+        self.show(np.zeros((self.led_count, 3)))
@@ -3,21 +3,27 @@
 scanning_lightbeam.py
 
 Scanning Lightbeam effect on a 3D LED tree:
-Simulates a beam sweeping either horizontally (along Z), diagonally, or radially.
-LEDs light up briefly as the beam passes through their coordinate.
+Simulates beams sweeping through the tree along height, a diagonal, an arbitrary
+axis, radially, around the trunk, or along the LED strand (geodesic).
+LEDs light up briefly as a beam passes through their coordinate.
 """
 import os
 import time
-import math
 import argparse
+import numpy as np
 import pandas as pd
 import ambient_brightness    # patches PixelStrip.show() for ambient dimming
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
+from led_frame import FrameWriter
+from spatial_index import SpatialIndex
+import sweep
 
 # ─── Argument Parsing ─────────────────────────────────────────────────────────
 parser = argparse.ArgumentParser(description="Scanning Lightbeam effect on 3D LED tree")
-parser.add_argument("--mode", choices=["horizontal","diagonal","radial"], default="horizontal",
-                    help="Sweep mode: horizontal (Z), diagonal (X+Z), or radial")
+parser.add_argument("--mode", choices=["horizontal","diagonal","radial","axis","angle","geodesic"],
+                    default="horizontal",
+                    help="Sweep mode: horizontal (Z), diagonal (X+Z), radial, axis (see --axis), "
+                         "angle (around the trunk), or geodesic (along the LEDs from --source)")
 parser.add_argument("--interval", type=float, default=0.05,
                     help="Seconds between frames")
 parser.add_argument("--speed", type=float, default=1.0,
@@ -28,7 +34,17 @@ parser.add_argument("--color", nargs=3, type=int, default=[255,255,255], metavar
                     help="Beam color RGB")
 parser.add_argument("--reverse", action="store_true",
                     help="Reverse sweep direction")
+parser.add_argument("--axis", nargs=3, type=float, default=[1.0, 0.0, 1.0], metavar=("X","Y","Z"),
+                    help="Sweep direction for --mode axis")
+parser.add_argument("--source", type=int, default=0,
+                    help="Starting LED index for --mode geodesic")
+parser.add_argument("--beams", type=int, default=1,
+                    help="Number of evenly spaced beams")
+parser.add_argument("--profile", choices=sweep.PROFILES, default="hard",
+                    help="Beam edge profile")
 args = parser.parse_args()
+if args.mode == "axis" and not any(args.axis):
+    parser.error("--axis must not be the zero vector")
 
 MODE       = args.mode
 INTERVAL   = args.interval
@@ -41,43 +57,25 @@ REVERSE    = -1.0 if args.reverse else 1.0
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV  = os.path.join(BASE_DIR, 'coordinates.csv')
 df          = pd.read_csv(COORDS_CSV)
-positions   = df[['X','Y','Z']].values.tolist()
+positions   = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT   = len(positions)
 
-# Precompute ranges and normalized coords
-xs = [p[0] for p in positions]
-ys = [p[1] for p in positions]
-zs = [p[2] for p in positions]
-
-x_min, x_max = min(xs), max(xs)
-y_min, y_max = min(ys), max(ys)
-z_min, z_max = min(zs), max(zs)
-
-# For radial mode, compute centroid XY
-a_x = sum(xs)/LED_COUNT
-a_y = sum(ys)/LED_COUNT
-
-def radial_coord(p):
-    return math.hypot(p[0]-a_x, p[1]-a_y)
-
-# Precompute normalized coordinate based on mode
-data_coord = []
+# Precompute the per-LED sweep coordinate for the chosen mode
 if MODE == 'horizontal':
-    rng = z_max - z_min
-    for x, y, z in positions:
-        data_coord.append((z - z_min)/rng if rng > 0 else 0.0)
+    data_coord = sweep.height_field(positions)
 elif MODE == 'diagonal':
-    # combine X and Z: use (x_norm + z_norm)/2
-    x_rng = x_max - x_min
-    z_rng = z_max - z_min
-    for x, y, z in positions:
-        xn = (x - x_min)/x_rng if x_rng > 0 else 0.0
-        zn = (z - z_min)/z_rng if z_rng > 0 else 0.0
-        data_coord.append((xn + zn)/2)
+    data_coord = sweep.diagonal_field(positions)
+elif MODE == 'axis':
+    data_coord = sweep.axis_field(positions, args.axis)
+elif MODE == 'angle':
+    data_coord = sweep.angle_field(positions)
+elif MODE == 'geodesic':
+    data_coord = sweep.geodesic_field(SpatialIndex.from_csv(COORDS_CSV), args.source)
 else:  # radial
-    a_max = max(radial_coord(p) for p in positions)
-    for p in positions:
-        data_coord.append(radial_coord(p)/a_max if a_max > 0 else 0.0)
+    data_coord = sweep.radial_field(positions)
+
+engine     = sweep.SweepEngine(data_coord, periodic=(MODE == 'angle'))
+BEAM_START = np.arange(max(1, args.beams)) / max(1, args.beams)
 
 # ─── Strip Configuration ───────────────────────────────────────────────────────
 LED_PIN        = 18
@@ -93,26 +91,17 @@ strip = PixelStrip(
 )
 strip.begin()
 
-# Helper to clear all LEDs
-def clear_strip():
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
+frame = FrameWriter(strip, LED_COUNT)
 
 # Main Loop
 start = time.perf_counter()
 try:
     while True:
         t = (time.perf_counter() - start) * SPEED * REVERSE
-        # beam position cycles from 0 to 1
-        pos = (t % 1.0)
-        clear_strip()
-        # light LEDs within thickness
-        for i, frac in enumerate(data_coord):
-            if abs(frac - pos) <= THICK_FRAC/2:
-                strip.setPixelColor(i, Color(*COLOR_RGB))
-        strip.show()
+        # beam positions cycle from 0 to 1
+        pos = (BEAM_START + t) % 1.0
+        frame.show(engine.render(pos, THICK_FRAC, COLOR_RGB, args.profile))
         time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
-    clear_strip()
-    strip.show()
+    frame.clear()
@@ -6,12 +6,13 @@ Simulate icicles forming from top to bottom on a 3D LED tree, with shimmer and m
 """
 import os
 import time
-import random
-import math
 import argparse
+import numpy as np
 import pandas as pd
 import ambient_brightness    # patches PixelStrip.show() for ambient dimming
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
+from led_frame import FrameWriter
+from spatial_index import SpatialIndex
 
 # ─── Argument Parsing ─────────────────────────────────────────────────────────
 parser = argparse.ArgumentParser(description="Icicle Growth effect on 3D LED tree")
@@ -37,40 +38,39 @@ HOLD_TIME   = args.hold_time
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV  = os.path.join(BASE_DIR, 'coordinates.csv')
 df          = pd.read_csv(COORDS_CSV)
-positions   = df[['X','Y','Z']].values.tolist()
+positions   = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT   = len(positions)
 
 # determine Z bounds for top selection
-tree_zs    = [pos[2] for pos in positions]
-tree_z_min = min(tree_zs)
-tree_z_max = max(tree_zs)
+tree_zs    = positions[:, 2]
+tree_z_min = tree_zs.min()
+tree_z_max = tree_zs.max()
 # indices of top-tier LEDs (within top 10% of height)
 top_threshold = tree_z_max - 0.1*(tree_z_max - tree_z_min)
-seed_indices = [i for i,z in enumerate(tree_zs) if z >= top_threshold]
+seed_indices = np.flatnonzero(tree_zs >= top_threshold)
 
-# Precompute lower-neighbor mapping: for each LED, nearest neighbor with lower Z
-children = {}
-for i, (x,y,z) in enumerate(positions):
-    # find all candidates below
-    cand = [(j, math.dist((x,y,z), positions[j]))
-            for j,(x2,y2,z2) in enumerate(positions) if z2 < z]
-    if cand:
-        # pick closest
-        j,_ = min(cand, key=lambda t:t[1])
-        children[i] = j
+# lower-neighbor mapping: for each LED, nearest neighbor with lower Z (-1 if none).
+# Z strictly decreases along it, so every walk ends without cycles.
+children = SpatialIndex.from_csv(COORDS_CSV).lower_neighbors()
 
-# build icicle paths
-paths = []
-for _ in range(NUM_ICICLES):
-    start = random.choice(seed_indices)
-    path = [start]
-    while path[-1] in children:
-        nxt = children[path[-1]]
-        # avoid cycles
-        if nxt in path:
-            break
-        path.append(nxt)
-    paths.append(path)
+# build icicle paths, all walked together, as a (NUM_ICICLES, max_len) array padded with -1
+cur = np.random.choice(seed_indices, NUM_ICICLES)
+steps = [cur]
+while (cur >= 0).any():
+    cur = np.where(cur >= 0, children[np.maximum(cur, 0)], -1)
+    steps.append(cur)
+paths    = np.stack(steps[:-1], axis=1)
+valid    = paths >= 0
+path_len = valid.sum(axis=1)
+max_len  = paths.shape[1]
+
+# icy color gradient along each path: tip is white, base is blue
+frac = np.arange(max_len)[None, :] / np.maximum(1, path_len - 1)[:, None]
+path_colors = np.empty(paths.shape + (3,))
+path_colors[..., 0] = 255 * (1 - frac)
+path_colors[..., 1] = 255 * (1 - frac)
+path_colors[..., 2] = 255
+col_idx = np.arange(max_len)[None, :]
 
 # ─── Strip Setup ───────────────────────────────────────────────────────────────
 LED_PIN        = 18
@@ -86,62 +86,50 @@ strip = PixelStrip(
 )
 strip.begin()
 
-# helper to clear all
-def clear_strip():
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
+frame = FrameWriter(strip, LED_COUNT)
 
-# map position in path to icy color gradient
-def icy_color(idx, length):
-    frac = idx / max(1, length-1)
-    # tip is white, base is blue
-    r = int(255*(1-frac))
-    g = int(255*(1-frac))
-    b = 255
-    return (r, g, b)
+def render(cur_n, shimmer_p=0.0):
+    """
+    RGB frame with the first cur_n LEDs of every icicle lit; each lit LED
+    shimmers (dims to 50-100%) with probability shimmer_p.
+    """
+    lit = valid & (col_idx < cur_n)
+    colors = path_colors[lit]
+    if shimmer_p > 0:
+        shimmer = np.random.random(len(colors)) < shimmer_p
+        colors[shimmer] *= np.random.uniform(0.5, 1.0, (shimmer.sum(), 1))
+    rgb = np.zeros((LED_COUNT, 3))
+    rgb[paths[lit]] = colors
+    return rgb
 
 # ─── Animation Loop ───────────────────────────────────────────────────────────
-while True:
-    # growth phase
-    max_len = max(len(p) for p in paths)
-    # total grow time per icicle
-    total_time = max_len / GROW_SPEED
-    t0 = time.time()
-    while True:
-        elapsed = time.time() - t0
-        frac = min(1.0, elapsed / total_time)
-        # current growth index
-        cur_n = int(frac * max_len)
-        clear_strip()
-        # draw each path
-        for path in paths:
-            for i, led in enumerate(path[:cur_n]):
-                r,g,b = icy_color(i, len(path))
-                # shimmer
-                if random.random() < SHIMMER_P:
-                    scale = random.uniform(0.5,1.0)
-                    r,g,b = int(r*scale), int(g*scale), int(b*scale)
-                strip.setPixelColor(led, Color(r, g, b))
-        strip.show()
-        time.sleep(INTERVAL)
-        if elapsed >= total_time:
-            break
-    # hold full icicles
-    time.sleep(HOLD_TIME)
-    # melting phase (reverse growth)
-    t0 = time.time()
+# total grow time per icicle
+total_time = max_len / GROW_SPEED
+try:
     while True:
-        elapsed = time.time() - t0
-        frac = min(1.0, elapsed / total_time)
-        cur_n = max_len - int(frac * max_len)
-        clear_strip()
-        for path in paths:
-            for i, led in enumerate(path[:cur_n]):
-                r,g,b = icy_color(i, len(path))
-                strip.setPixelColor(led, Color(r, g, b))
-        strip.show()
-        time.sleep(INTERVAL)
-        if elapsed >= total_time:
-            break
-    # short pause before next cycle
-    time.sleep(1.0)
+        # growth phase
+        t0 = time.time()
+        while True:
+            elapsed = time.time() - t0
+            # current growth index
+            cur_n = int(min(1.0, elapsed / total_time) * max_len)
+            frame.show(render(cur_n, SHIMMER_P))
+            time.sleep(INTERVAL)
+            if elapsed >= total_time:
+                break
+        # hold full icicles
+        time.sleep(HOLD_TIME)
+        # melting phase (reverse growth)
+        t0 = time.time()
+        while True:
+            elapsed = time.time() - t0
+            cur_n = max_len - int(min(1.0, elapsed / total_time) * max_len)
+            frame.show(render(cur_n))
+            time.sleep(INTERVAL)
+            if elapsed >= total_time:
+                break
+        # short pause before next cycle
+        time.sleep(1.0)
+
+except KeyboardInterrupt:
+    frame.clear()
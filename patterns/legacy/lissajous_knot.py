@@ -3,53 +3,72 @@
 lissajous_knot.py
 
 3D Lissajous Knot animation on a 3D LED tree:
-Traces a parametric knot path; nearest LED to the moving point lights up each frame,
-leaving a fading trail.
+Traces one or more parametric knot paths; the LEDs nearest each moving point light
+up every frame, leaving a fading trail.
 """
 import os
 import time
 import math
 import argparse
+import numpy as np
 import pandas as pd
 import ambient_brightness    # patches PixelStrip.show() for ambient dimming
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
+from led_frame import FrameWriter
+from spatial_index import SpatialIndex
 
 # ─── Argument Parsing ─────────────────────────────────────────────────────────
 parser = argparse.ArgumentParser(description="3D Lissajous Knot on LED tree")
-parser.add_argument("--a", type=float, default=3.0, help="frequency a for x(t)")
-parser.add_argument("--b", type=float, default=2.0, help="frequency b for y(t)")
-parser.add_argument("--c", type=float, default=5.0, help="frequency c for z(t)")
-parser.add_argument("--delta", type=float, default=math.pi/2,
-                    help="phase offset δ for x(t)")
+parser.add_argument("--a", nargs="+", type=float, default=[3.0],
+                    help="frequency a for x(t), one value per tracer (values cycle)")
+parser.add_argument("--b", nargs="+", type=float, default=[2.0],
+                    help="frequency b for y(t), one value per tracer")
+parser.add_argument("--c", nargs="+", type=float, default=[5.0],
+                    help="frequency c for z(t), one value per tracer")
+parser.add_argument("--delta", nargs="+", type=float, default=[math.pi/2],
+                    help="phase offset δ for x(t), one value per tracer")
+parser.add_argument("--tracers", type=int, default=None,
+                    help="Number of simultaneous tracers (default: longest parameter list)")
 parser.add_argument("--interval", type=float, default=0.02,
                     help="Seconds between frames")
 parser.add_argument("--fade", type=float, default=0.9,
                     help="Fade factor per frame (0-1) for trail")
-parser.add_argument("--color", nargs=3, type=int, default=[255,255,255], metavar=('R','G','B'),
-                    help="Trail color RGB")
+parser.add_argument("--color", nargs="+", type=int, default=[255,255,255], metavar="RGB",
+                    help="Trail colors as R G B triplets, one per tracer (colors cycle)")
+parser.add_argument("--splat-k", type=int, default=1,
+                    help="Spread each tracer over its k nearest LEDs for sub-LED motion")
 args = parser.parse_args()
+if len(args.color) % 3:
+    parser.error("--color takes R G B triplets")
 
-# Unpack parameters
-a, b, c = args.a, args.b, args.c
-delta     = args.delta
+# Unpack parameters; tracer k uses entry k of each list (cycling) and is
+# started 2πk/M later along the curve so identical knots don't overlap.
+NUM_TRACERS = args.tracers or max(len(args.a), len(args.b), len(args.c),
+                                  len(args.delta), len(args.color) // 3)
+
+def per_tracer(values):
+    return np.array([values[k % len(values)] for k in range(NUM_TRACERS)], dtype=float)
+
+a, b, c   = per_tracer(args.a), per_tracer(args.b), per_tracer(args.c)
+delta     = per_tracer(args.delta)
+t_offset  = 2 * math.pi * np.arange(NUM_TRACERS) / NUM_TRACERS
+colors    = np.array(args.color, dtype=np.float32).reshape(-1, 3)
+COL       = colors[np.arange(NUM_TRACERS) % len(colors)]
 INTERVAL  = args.interval
 FADE      = max(0.0, min(1.0, args.fade))
-COL       = tuple(args.color)
+SPLAT_K   = max(1, args.splat_k)
 
 # ─── Load LED coordinates ─────────────────────────────────────────────────────
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
 df         = pd.read_csv(COORDS_CSV)
-positions  = df[['X','Y','Z']].values.tolist()
+positions  = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT  = len(positions)
+index      = SpatialIndex.from_csv(COORDS_CSV)
 
 # Determine spatial bounds to map parametric [-1,1] to tree extents
-xs = [p[0] for p in positions]
-ys = [p[1] for p in positions]
-zs = [p[2] for p in positions]
-x_min, x_max = min(xs), max(xs)
-y_min, y_max = min(ys), max(ys)
-z_min, z_max = min(zs), max(zs)
+lo = positions.min(axis=0)
+hi = positions.max(axis=0)
 
 # Setup LED strip
 LED_PIN        = 18
@@ -64,52 +83,37 @@ strip = PixelStrip(
 )
 strip.begin()
 
-# Initialize trail intensity buffer
-trail = [0.0] * LED_COUNT
+frame = FrameWriter(strip, LED_COUNT)
 
-# Map normalized parametric point to tree coords
-def map_to_tree(xn, yn, zn):
-    x = x_min + (xn + 1) * 0.5 * (x_max - x_min)
-    y = y_min + (yn + 1) * 0.5 * (y_max - y_min)
-    z = z_min + (zn + 1) * 0.5 * (z_max - z_min)
-    return (x, y, z)
+# Initialize trail buffer (RGB per LED)
+trail = np.zeros((LED_COUNT, 3), dtype=np.float32)
 
-# Utility to clear strip
-def clear_strip():
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0,0,0))
+# Map normalized parametric points (M, 3) to tree coords
+def map_to_tree(pts):
+    return lo + (pts + 1) * 0.5 * (hi - lo)
 
 # Main loop
 start = time.perf_counter()
 try:
     while True:
-        t = time.perf_counter() - start
-        # Parametric Lissajous coordinates
-        xn = math.sin(a * t + delta)
-        yn = math.sin(b * t)
-        zn = math.sin(c * t)
-        # Map to real coords
-        px, py, pz = map_to_tree(xn, yn, zn)
-        # Find nearest LED
-        best_idx = min(range(LED_COUNT),
-                       key=lambda i: (positions[i][0]-px)**2 +
-                                     (positions[i][1]-py)**2 +
-                                     (positions[i][2]-pz)**2)
+        t = time.perf_counter() - start + t_offset
+        # Parametric Lissajous coordinates for every tracer
+        pts = map_to_tree(np.stack([np.sin(a * t + delta),
+                                    np.sin(b * t),
+                                    np.sin(c * t)], axis=1))
         # Fade trail
-        for i in range(LED_COUNT):
-            trail[i] *= FADE
-        # Light current point at full intensity
-        trail[best_idx] = 1.0
+        trail *= FADE
+        # Light current points at full intensity
+        if SPLAT_K == 1:
+            np.maximum.at(trail, index.nearest(pts), COL)
+        else:
+            idx, sq_dist = index.knn(pts, SPLAT_K, return_sq_dist=True)
+            w = 1.0 / (np.sqrt(sq_dist) + 1e-6)
+            w /= w[:, :1]
+            np.maximum.at(trail, idx.ravel(), (w[:, :, None] * COL[:, None, :]).reshape(-1, 3))
         # Render
-        for i, intensity in enumerate(trail):
-            val = int(max(0.0, min(1.0, intensity)) * 255)
-            r = int(COL[0] * (val/255.0))
-            g = int(COL[1] * (val/255.0))
-            b = int(COL[2] * (val/255.0))
-            strip.setPixelColor(i, Color(r, g, b))
-        strip.show()
+        frame.show(trail)
         time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
-    clear_strip()
-    strip.show()
+    frame.clear()
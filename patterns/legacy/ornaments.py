@@ -6,12 +6,15 @@ Animate ornaments "falling" onto a 3D LED tree, bouncing and then twinkling when
 """
 import os
 import time
-import random
 import math
 import argparse
+import numpy as np
 import pandas as pd
 import ambient_brightness    # patches PixelStrip.show() for ambient dimming
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
+from led_frame import FrameWriter
+from particles import ParticleSystem, MOVING, RESTING, FALLOFFS
+from spatial_index import SpatialIndex
 
 # ─── Argument Parsing ─────────────────────────────────────────────────────────
 parser = argparse.ArgumentParser(description="Ornament Drop effect on 3D LED tree")
@@ -24,9 +27,15 @@ parser.add_argument("-s", "--speed", type=float, default=5.0,
 parser.add_argument("--hold-time", type=float, default=2.0,
                     help="Seconds to hold twinkle before respawn")
 parser.add_argument("--bounce-damp", type=float, default=0.5,
-                    help="Damping factor for bounce height")
+                    help="Damping factor for bounce height (0-1)")
 parser.add_argument("--init-offset", type=float, default=0.2,
                     help="Spawn Z offset as fraction of tree height")
+parser.add_argument("--gravity", type=float, default=30.0,
+                    help="Downward acceleration after the first bounce (units/s^2)")
+parser.add_argument("--splat-radius", type=float, default=0.0,
+                    help="Light LEDs within this distance of a falling ornament (0 = nearest LED only)")
+parser.add_argument("--falloff", choices=FALLOFFS, default="linear",
+                    help="Brightness falloff across the splat radius")
 args = parser.parse_args()
 
 NUM_ORNAMENTS = args.num_ornaments
@@ -35,18 +44,21 @@ SPEED         = args.speed
 HOLD_TIME     = args.hold_time
 BOUNCE_DAMP   = args.bounce_damp
 INIT_OFFSET   = args.init_offset
+GRAVITY       = args.gravity
 
 # ─── LED & Coordinate Setup ────────────────────────────────────────────────────
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV  = os.path.join(BASE_DIR, 'coordinates.csv')
 df          = pd.read_csv(COORDS_CSV)
-positions   = df[['X','Y','Z']].values.tolist()
+positions   = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT   = len(positions)
+index       = SpatialIndex.from_csv(COORDS_CSV)
 
-# find tree z bounds
-tree_zs    = [pos[2] for pos in positions]
-tree_z_min = min(tree_zs)
-tree_z_max = max(tree_zs)
+# find tree bounds once
+tree_lo     = positions.min(axis=0)
+tree_hi     = positions.max(axis=0)
+tree_z_min  = tree_lo[2]
+tree_z_max  = tree_hi[2]
 tree_height = tree_z_max - tree_z_min
 
 # ─── Strip Configuration ───────────────────────────────────────────────────────
@@ -63,92 +75,93 @@ strip = PixelStrip(
 )
 strip.begin()
 
-def clear_strip():
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
+frame = FrameWriter(strip, LED_COUNT)
 
 # possible ornament colors (r, g, b)
-ORNAMENT_COLORS = [
+ORNAMENT_COLORS = np.array([
     (0, 255, 0),    # red
     (215, 255, 0),  # gold
     (0, 0, 255),    # blue
-]
-
-# helper to spawn a new ornament
-def new_ornament():
-    x = random.uniform(min(p[0] for p in positions), max(p[0] for p in positions))
-    y = random.uniform(min(p[1] for p in positions), max(p[1] for p in positions))
-    z = tree_z_max + INIT_OFFSET * tree_height
-    color = random.choice(ORNAMENT_COLORS)
-    return {
-        'x': x, 'y': y, 'current_z': z,
-        'state': 'falling', 'bounce_h': INIT_OFFSET * tree_height,
-        'color': color,
-        'tw_f': random.uniform(1.0, 3.0),
-        'phase': random.uniform(0, 2*math.pi),
-        'land_time': None,
-        'landed_idx': None,
-    }
+], dtype=np.float32)
+
+# Each bounce reaches BOUNCE_DAMP times the height of the one before, starting
+# from the drop height, so the first impact is as fast as a fall from there
+# and the bounce speed keeps sqrt(BOUNCE_DAMP) per impact. A bounce lower than
+# 1% of the tree height counts as landed.
+REST_HEIGHT = 0.01
+DROP_SPEED  = math.sqrt(2 * GRAVITY * INIT_OFFSET * tree_height)
+SPEED_DAMP  = math.sqrt(max(0.0, BOUNCE_DAMP))
+REST_SPEED  = math.sqrt(2 * GRAVITY * REST_HEIGHT * tree_height)
+
+def bounce_count(init_offset, bounce_damp):
+    """Bounces before an ornament dropped from init_offset (of the tree height) settles."""
+    if init_offset <= REST_HEIGHT or bounce_damp <= 0:
+        return 0
+    if bounce_damp >= 1:
+        return math.inf
+    return max(0, int(math.floor(math.log(REST_HEIGHT / init_offset) / math.log(bounce_damp))))
+
+# The defaults are meant to give a few shrinking bounces before the twinkle.
+assert bounce_count(parser.get_default("init_offset"), parser.get_default("bounce_damp")) >= 1
+
+ornaments  = ParticleSystem(NUM_ORNAMENTS)
+tw_f       = np.zeros(NUM_ORNAMENTS)
+tw_phase   = np.zeros(NUM_ORNAMENTS)
+land_time  = np.zeros(NUM_ORNAMENTS)
+landed_idx = np.zeros(NUM_ORNAMENTS, dtype=np.intp)
+bouncing   = np.zeros(NUM_ORNAMENTS, dtype=bool)
+
+# helper to spawn n new ornaments above the tree
+def spawn_ornaments(n):
+    pos = np.random.uniform(tree_lo, tree_hi, (n, 3))
+    pos[:, 2] = tree_z_max + INIT_OFFSET * tree_height
+    color = ORNAMENT_COLORS[np.random.randint(len(ORNAMENT_COLORS), size=n)]
+    slots = ornaments.spawn(pos, (0.0, 0.0, -SPEED), color)
+    tw_f[slots]     = np.random.uniform(1.0, 3.0, len(slots))
+    tw_phase[slots] = np.random.uniform(0, 2*math.pi, len(slots))
+    bouncing[slots] = False
 
 # initialize ornaments
-ornaments = [new_ornament() for _ in range(NUM_ORNAMENTS)]
+spawn_ornaments(NUM_ORNAMENTS)
 
 # main animation loop
 prev_time = time.time()
-while True:
-    now = time.time()
-    dt = now - prev_time
-    prev_time = now
-
-    # update ornament physics
-    for o in ornaments:
-        if o['state'] == 'falling':
-            o['current_z'] -= SPEED * dt
-            if o['current_z'] <= tree_z_min:
-                o['state'] = 'bounce'
-                o['bounce_h'] = INIT_OFFSET * tree_height
-        elif o['state'] == 'bounce':
-            o['bounce_h'] *= BOUNCE_DAMP
-            o['current_z'] = tree_z_min + o['bounce_h']
-            if o['bounce_h'] < 0.01 * tree_height:
-                # landed
-                o['state'] = 'landed'
-                o['current_z'] = tree_z_min
-                # find closest LED index to land point
-                min_i = min(range(LED_COUNT),
-                    key=lambda i: (
-                        (positions[i][0]-o['x'])**2 +
-                        (positions[i][1]-o['y'])**2 +
-                        (positions[i][2]-o['current_z'])**2
-                    )
-                )
-                o['landed_idx'] = min_i
-                o['land_time'] = now
-        elif o['state'] == 'landed':
-            if now - o['land_time'] >= HOLD_TIME:
-                # respawn
-                o.update(new_ornament())
-
-    # draw frame
-    clear_strip()
-    for o in ornaments:
-        if o['state'] in ('falling', 'bounce'):
-            # map current position to nearest LED
-            idx = min(range(LED_COUNT),
-                key=lambda i: (
-                    (positions[i][0]-o['x'])**2 +
-                    (positions[i][1]-o['y'])**2 +
-                    (positions[i][2]-o['current_z'])**2
-                )
-            )
-            strip.setPixelColor(idx, Color(*o['color']))
-        else:  # landed => twinkle
-            t = now - o['land_time']
-            f = 0.5 + 0.5 * math.sin(2*math.pi*o['tw_f']*t + o['phase'])
-            r = int(o['color'][0] * f)
-            g = int(o['color'][1] * f)
-            b = int(o['color'][2] * f)
-            strip.setPixelColor(o['landed_idx'], Color(r, g, b))
-
-    strip.show()
-    time.sleep(INTERVAL)
+try:
+    while True:
+        now = time.time()
+        dt = now - prev_time
+        prev_time = now
+
+        # update ornament physics: fall at SPEED, then bounce under gravity
+        falling = (ornaments.state == MOVING) & ~bouncing
+        ornaments.vel[falling, 2] = -SPEED
+        impact = falling & (ornaments.pos[:, 2] - SPEED * dt <= tree_z_min)
+        ornaments.vel[impact, 2] = -DROP_SPEED
+        bouncing |= impact
+        landed = ornaments.step(dt, GRAVITY, tree_z_min, SPEED_DAMP, REST_SPEED)
+        if len(landed):
+            # find closest LED index to each land point
+            landed_idx[landed] = index.nearest(ornaments.pos[landed])
+            land_time[landed] = now
+
+        expired = np.flatnonzero((ornaments.state == RESTING) & (now - land_time >= HOLD_TIME))
+        if len(expired):
+            # respawn
+            ornaments.kill(expired)
+            spawn_ornaments(len(expired))
+
+        # draw frame
+        if args.splat_radius > 0:
+            rgb = ornaments.splat(index, LED_COUNT, args.splat_radius, args.falloff, states=(MOVING,))
+        else:
+            rgb = ornaments.stamp(index, LED_COUNT, states=(MOVING,))
+        # landed => twinkle
+        resting = np.flatnonzero(ornaments.state == RESTING)
+        f = 0.5 + 0.5 * np.sin(2*math.pi*tw_f[resting]*(now - land_time[resting]) + tw_phase[resting])
+        rgb[landed_idx[resting]] = ornaments.color[resting] * f[:, None]
+
+        frame.show(rgb)
+        time.sleep(INTERVAL)
+
+except KeyboardInterrupt:
+    frame.clear()
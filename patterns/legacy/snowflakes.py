@@ -1,19 +1,21 @@
 #!/usr/bin/env python3
 import os
 import time
-import random
-import math
+import numpy as np
 import pandas as pd
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness    # patches PixelStrip.show() to apply ambient dimming
+from led_frame import FrameWriter
+from particles import ParticleSystem, MOVING
+from spatial_index import SpatialIndex
 
 # ─── LED & Coordinate Setup ────────────────────────────────────────────────────
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV  = os.path.join(BASE_DIR, 'coordinates.csv')
 df          = pd.read_csv(COORDS_CSV)
-df['led_index'] = df.index
-positions   = df[['X','Y','Z']].values.tolist()
+positions   = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT   = len(positions)
+index       = SpatialIndex.from_csv(COORDS_CSV)
 
 # ─── Strip Configuration ───────────────────────────────────────────────────────
 LED_PIN        = 18      # PWM pin (data)
@@ -28,49 +30,37 @@ strip = PixelStrip(
     LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
 strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
 
 def clear_strip():
     """Turn off all LEDs."""
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
+    frame.clear()
 
 def animate_snowflakes(csv_file, interval=0.05, num_snowflakes=5,
-                       speed=0.1, threshold=1.0):
+                       speed=0.1, threshold=1.0, falloff="hard"):
     """
     Animate white snowflakes falling forever.
+    Each flake lights the LEDs within `threshold` of it, weighted by
+    `falloff` ("hard", "linear", "smooth" or "gaussian").
     """
     # Determine tree bounds from the CSV.
-    tree_x_min, tree_x_max = df['X'].min(), df['X'].max()
-    tree_y_min, tree_y_max = df['Y'].min(), df['Y'].max()
-    tree_z_min, tree_z_max = df['Z'].min(), df['Z'].max()
+    lo = positions.min(axis=0)
+    hi = positions.max(axis=0)
+
+    def top_spawn_points(n):
+        pts = np.random.uniform(lo, hi, (n, 3))
+        pts[:, 2] = hi[2]
+        return pts
 
     # Initialize snowflake particles.
-    snowflakes = []
-    for _ in range(num_snowflakes):
-        snowflakes.append({
-            'x': random.uniform(tree_x_min, tree_x_max),
-            'y': random.uniform(tree_y_min, tree_y_max),
-            'z': tree_z_max
-        })
+    flakes = ParticleSystem(num_snowflakes)
+    flakes.spawn(top_spawn_points(num_snowflakes), (0.0, 0.0, -speed), (255, 255, 255))
 
     prev_time = time.time()
 
     while True:
         # --- Draw Phase ---
-        clear_strip()
-
-        # Light any LED close enough to a snowflake
-        for idx, row in df.iterrows():
-            led_x, led_y, led_z = row['X'], row['Y'], row['Z']
-            for sf in snowflakes:
-                dx = led_x - sf['x']
-                dy = led_y - sf['y']
-                dz = led_z - sf['z']
-                if math.sqrt(dx*dx + dy*dy + dz*dz) <= threshold:
-                    strip.setPixelColor(int(row['led_index']), Color(255, 255, 255))
-                    break
-
-        strip.show()
+        frame.show(flakes.splat(index, LED_COUNT, threshold, falloff))
         time.sleep(interval)
 
         # --- Update Phase ---
@@ -78,13 +68,10 @@ def animate_snowflakes(csv_file, interval=0.05, num_snowflakes=5,
         dt = current_time - prev_time
         prev_time = current_time
 
-        for sf in snowflakes:
-            sf['z'] -= speed * dt
-            if sf['z'] < tree_z_min:
-                # respawn at top
-                sf['x'] = random.uniform(tree_x_min, tree_x_max)
-                sf['y'] = random.uniform(tree_y_min, tree_y_max)
-                sf['z'] = tree_z_max
+        flakes.step(dt)
+        # respawn at top
+        melted = np.flatnonzero((flakes.state == MOVING) & (flakes.pos[:, 2] < lo[2]))
+        flakes.pos[melted] = top_spawn_points(len(melted))
 
 if __name__ == '__main__':
     # Adjust parameters as desired
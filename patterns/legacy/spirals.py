@@ -1,9 +1,10 @@
 import time
 import math
 import pandas as pd
-import colorsys
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness
+from led_frame import FrameWriter
+from spiral_palette import SpiralPalette, hue_ramp
 
 def animate_spirals(csv_file, duration=30, interval=0.05, spiral_factor=4*math.pi, speed=2.0):
     """
@@ -24,7 +25,6 @@ def animate_spirals(csv_file, duration=30, interval=0.05, spiral_factor=4*math.p
     """
     # Load LED coordinates; assume CSV rows correspond to physical LED order.
     df = pd.read_csv(csv_file)
-    df['led_index'] = df.index
 
     # LED strip configuration.
     LED_COUNT      = len(df)
@@ -39,45 +39,22 @@ def animate_spirals(csv_file, duration=30, interval=0.05, spiral_factor=4*math.p
     strip = PixelStrip(LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA,
                        LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
     strip.begin()
+    frame = FrameWriter(strip, LED_COUNT)
 
-    # Determine the tree’s bounds and compute the center for X and Y.
-    tree_x_min, tree_x_max = df['X'].min(), df['X'].max()
-    tree_y_min, tree_y_max = df['Y'].min(), df['Y'].max()
-    tree_z_min, tree_z_max = df['Z'].min(), df['Z'].max()
-
-    x_center = (tree_x_min + tree_x_max) / 2.0
-    y_center = (tree_y_min + tree_y_max) / 2.0
+    # Static spiral phase per LED (relative to the tree center) and a
+    # precomputed full-saturation hue ramp.
+    spiral = SpiralPalette(df[['X','Y','Z']].to_numpy(dtype=float), spiral_factor)
+    hues = hue_ramp()
 
     # Main animation loop.
     start_time = time.time()
     while time.time() - start_time < duration:
         t = time.time() - start_time
-        # Process each LED.
-        for _, row in df.iterrows():
-            idx = int(row['led_index'])
-            x, y, z = row['X'], row['Y'], row['Z']
-            # Convert (x, y) to polar coordinates relative to the tree center.
-            theta = math.atan2(y - y_center, x - x_center)  # angle in radians
-            # Normalize z (height) to range 0..1.
-            norm_z = (z - tree_z_min) / (tree_z_max - tree_z_min) if tree_z_max > tree_z_min else 0
-
-            # Compute a phase that produces the spiral pattern.
-            phase = theta + norm_z * spiral_factor + speed * t
-            # Map the phase to a hue value in the range [0, 1].
-            hue = (phase % (2 * math.pi)) / (2 * math.pi)
-            # Convert HSV to RGB (with full saturation and brightness).
-            r_float, g_float, b_float = colorsys.hsv_to_rgb(hue, 1, 1)
-            r = int(r_float * 255)
-            g = int(g_float * 255)
-            b = int(b_float * 255)
-            strip.setPixelColor(idx, Color(r, g, b))
-        strip.show()
+        frame.show(spiral.render(hues, speed * t))
         time.sleep(interval)
 
     # Turn off all LEDs when the animation ends.
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
-    strip.show()
+    frame.clear()
 
 if __name__ == '__main__':
     # Replace 'coordinates.csv' with the path to your LED coordinates file if necessary.
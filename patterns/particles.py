@@ -0,0 +1,114 @@
+"""
+Struct-of-arrays particle system for object-driven patterns.
+
+Position, velocity, color, state and age live in preallocated NumPy arrays.
+Spawning fills dead slots and killing just marks them dead, so nothing is
+allocated per particle; physics and drawing are vectorized over every
+particle at once.
+"""
+import numpy as np
+
+DEAD    = 0
+MOVING  = 1
+RESTING = 2
+
+FALLOFFS = ("hard", "linear", "smooth", "gaussian")
+
+
+def falloff_weight(d, radius, falloff="linear"):
+    """Weight (0-1) for LEDs at distance d from a particle of the given radius."""
+    u = np.clip(d / radius, 0.0, 1.0) if radius > 0 else np.zeros_like(d)
+    if falloff == "hard":
+        return np.ones_like(u)
+    if falloff == "smooth":
+        return 1.0 - u * u * (3.0 - 2.0 * u)
+    if falloff == "gaussian":
+        return np.exp(-4.5 * u * u)
+    return 1.0 - u
+
+
+class ParticleSystem:
+    """
+    Fixed-capacity pool of particles.
+
+    capacity: maximum number of live particles.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.pos   = np.zeros((capacity, 3), dtype=np.float32)
+        self.vel   = np.zeros((capacity, 3), dtype=np.float32)
+        self.color = np.zeros((capacity, 3), dtype=np.float32)
+        self.level = np.ones(capacity, dtype=np.float32)   # per-particle brightness
+        self.age   = np.zeros(capacity, dtype=np.float32)
+        self.state = np.full(capacity, DEAD, dtype=np.int8)
+
+    def spawn(self, pos, vel, color):
+        """
+        Start len(pos) particles in free slots (fewer if the pool is full).
+        Returns the slot indices used.
+        """
+        pos = np.atleast_2d(pos)
+        slots = np.flatnonzero(self.state == DEAD)[:len(pos)]
+        n = len(slots)
+        self.pos[slots]   = pos[:n]
+        self.vel[slots]   = np.broadcast_to(vel, (len(pos), 3))[:n]
+        self.color[slots] = np.broadcast_to(color, (len(pos), 3))[:n]
+        self.level[slots] = 1.0
+        self.age[slots]   = 0.0
+        self.state[slots] = MOVING
+        return slots
+
+    def kill(self, slots):
+        """Free the given slots (index array or boolean mask)."""
+        self.state[slots] = DEAD
+
+    def step(self, dt, gravity=0.0, floor=None, bounce_damp=0.5, rest_speed=0.0):
+        """
+        Advance moving particles by dt seconds.
+
+        gravity:     downward acceleration along Z (units/s^2).
+        floor:       Z of the ground plane; particles crossing it bounce.
+        bounce_damp: fraction of vertical speed kept on each bounce.
+        rest_speed:  bounces slower than this settle the particle (RESTING).
+        Returns the slots that came to rest during this step.
+        """
+        self.age[self.state != DEAD] += dt
+        moving = self.state == MOVING
+        self.vel[moving, 2] -= gravity * dt
+        self.pos[moving] += self.vel[moving] * dt
+        if floor is None:
+            return np.empty(0, dtype=np.intp)
+
+        hit = moving & (self.pos[:, 2] <= floor) & (self.vel[:, 2] < 0)
+        self.pos[hit, 2] = floor
+        self.vel[hit, 2] *= -bounce_damp
+        settled = hit & (self.vel[:, 2] < rest_speed)
+        self.vel[settled] = 0.0
+        self.state[settled] = RESTING
+        return np.flatnonzero(settled)
+
+    def splat(self, index, led_count, radius, falloff="linear", states=(MOVING, RESTING)):
+        """
+        Draw particles onto an (led_count, 3) frame. Each particle lights
+        the LEDs within `radius` of it, weighted by `falloff`; overlapping
+        particles keep the brightest value per channel.
+        """
+        frame = np.zeros((led_count, 3), dtype=np.float32)
+        sel = np.flatnonzero(np.isin(self.state, states))
+        if len(sel) == 0:
+            return frame
+        q, led, d = index.within_radius(self.pos[sel], radius)
+        w = falloff_weight(d, radius, falloff) * self.level[sel[q]]
+        np.maximum.at(frame, led, self.color[sel[q]] * w[:, None])
+        return frame
+
+    def stamp(self, index, led_count, states=(MOVING, RESTING)):
+        """Draw each particle onto its single nearest LED."""
+        frame = np.zeros((led_count, 3), dtype=np.float32)
+        sel = np.flatnonzero(np.isin(self.state, states))
+        if len(sel) == 0:
+            return frame
+        led = index.nearest(self.pos[sel])
+        np.maximum.at(frame, led, self.color[sel] * self.level[sel, None])
+        return frame
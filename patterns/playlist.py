@@ -0,0 +1,247 @@
+"""
+Playlist runner: rotates through patterns with crossfades.
+
+The runner owns the strip. Each playlist entry runs as its usual pattern
+script in offscreen mode (see framebus.py), rendering into its own shared
+frame file. The next entry is started `preload` seconds early so its imports
+and precomputation are done before it's needed, but it blocks on its first
+frame until its transition begins; only then do both patterns render, while
+the runner blends the outgoing and incoming frames. Once the fade is done
+the outgoing process is stopped.
+
+Playlist file (written by app.py from a playlists/*.json spec):
+
+  {
+    "order": "sequential" | "shuffle",
+    "transition": 3.0,            # crossfade seconds
+    "preload": 10.0,              # seconds before a transition to start the next pattern
+    "hours": ["16:30", "01:00"],  # optional: only run in this window, dark otherwise
+    "entries": [
+      {"name": "twister", "cmd": ["python3", ".../twister.py", ...],
+       "duration": 60, "between": ["17:00", "23:00"]}   # between is optional
+    ]
+  }
+"""
+import os
+import json
+import time
+import uuid
+import random
+import signal
+import argparse
+import datetime
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+from rpi_ws281x import PixelStrip
+import ambient_brightness
+from led_frame import FrameWriter
+from framebus import FrameBus, OFFSCREEN_ENV, STRIP_ORDER
+
+parser = argparse.ArgumentParser(description="Pattern playlist with crossfades")
+parser.add_argument("--playlist", required=True,
+                    help="Resolved playlist JSON (see module docstring)")
+parser.add_argument("--fps", type=float, default=50.0,
+                    help="Frame rate of the blended output")
+parser.add_argument("--seed", type=int, default=None,
+                    help="Random seed for shuffled playlists")
+args = parser.parse_args()
+
+with open(args.playlist) as f:
+    PLAYLIST = json.load(f)
+
+TRANSITION = max(0.0, float(PLAYLIST.get("transition", 3.0)))
+PRELOAD    = max(float(PLAYLIST.get("preload", 10.0)), TRANSITION)
+IDLE_CHECK = 60.0   # seconds between schedule checks while dark
+RETRY      = 2.0    # seconds to wait after a pattern fails to start
+
+BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
+COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
+df         = pd.read_csv(COORDS_CSV)
+LED_COUNT  = len(df)
+
+LED_PIN        = 18
+LED_FREQ_HZ    = 800000
+LED_DMA        = 10
+LED_BRIGHTNESS = 255
+LED_INVERT     = False
+LED_CHANNEL    = 0
+
+strip = PixelStrip(
+    LED_COUNT, LED_PIN, LED_FREQ_HZ,
+    LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
+)
+strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
+
+
+def in_window(window, now):
+    """Whether datetime `now` falls in ["HH:MM", "HH:MM"] (may wrap midnight)."""
+    if not window:
+        return True
+    start, end = [int(h) * 60 + int(m) for h, m in (w.split(":") for w in window)]
+    minute = now.hour * 60 + now.minute
+    return start <= minute < end if start <= end else minute >= start or minute < end
+
+
+class Slot:
+    """One offscreen pattern process and the frame file it renders into."""
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.path  = os.path.join(tempfile.gettempdir(), "xmas-offscreen-%s" % uuid.uuid4().hex[:8])
+        self.bus   = FrameBus(LED_COUNT, self.path)
+        self.rgb   = np.zeros((LED_COUNT, 3), dtype=np.uint8)
+        self.proc  = subprocess.Popen(entry["cmd"], env=dict(os.environ, **{OFFSCREEN_ENV: self.path}))
+
+    def start(self):
+        self.bus.open_gate()
+
+    def started(self):
+        return self.bus.gate_open()
+
+    def ready(self):
+        return self.bus.has_frame()
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def frame(self):
+        """Latest frame; the last one is held if the process has exited."""
+        self.bus.snapshot(self.rgb)
+        return self.rgb
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class Dark:
+    """Placeholder slot for time outside the playlist's hours."""
+
+    entry = {"name": "(dark)", "duration": IDLE_CHECK}
+    rgb   = np.zeros((LED_COUNT, 3), dtype=np.uint8)
+
+    def start(self):
+        pass
+
+    def started(self):
+        return True
+
+    def ready(self):
+        return True
+
+    def alive(self):
+        return True
+
+    def frame(self):
+        return self.rgb
+
+    def stop(self):
+        pass
+
+
+class Picker:
+    """Chooses the next entry: in order or shuffled, honoring time windows."""
+
+    def __init__(self, playlist, seed=None):
+        self.entries = playlist["entries"]
+        self.shuffle = playlist.get("order", "sequential") == "shuffle"
+        self.hours   = playlist.get("hours")
+        self.rng     = random.Random(seed)
+        self.queue   = []
+        self.last    = None
+
+    def next(self, now):
+        """Next entry to play at datetime `now`, or None to stay dark."""
+        if not in_window(self.hours, now):
+            return None
+        eligible = [i for i, e in enumerate(self.entries) if in_window(e.get("between"), now)]
+        if not eligible:
+            return None
+        if self.shuffle:
+            self.queue = [i for i in self.queue if i in eligible]
+            if not self.queue:
+                self.queue = eligible[:]
+                self.rng.shuffle(self.queue)
+                # Don't play the same entry twice in a row across refills.
+                if len(self.queue) > 1 and self.queue[0] == self.last:
+                    self.queue.append(self.queue.pop(0))
+            i = self.queue.pop(0)
+        else:
+            after = [i for i in eligible if self.last is None or i > self.last]
+            i = (after or eligible)[0]
+        self.last = i
+        return self.entries[i]
+
+
+def _terminate(signum, frame_):
+    raise SystemExit(0)
+
+signal.signal(signal.SIGTERM, _terminate)
+
+picker     = Picker(PLAYLIST, args.seed)
+current    = None
+incoming   = None
+play_until = 0.0    # monotonic time at which the current entry starts fading out
+retry_at   = 0.0
+fade_start = None
+out        = np.zeros((LED_COUNT, 3), dtype=np.float32)
+black      = np.zeros((LED_COUNT, 3), dtype=np.float32)
+frame_time = 1.0 / args.fps
+
+try:
+    while True:
+        now = time.monotonic()
+
+        # A pattern that exits early hands over to the next one right away.
+        if current is not None and not current.alive() and play_until > now:
+            play_until = now
+        # Preload the next entry so it is set up before its transition.
+        if incoming is None and now >= play_until - PRELOAD and now >= retry_at:
+            entry = picker.next(datetime.datetime.now())
+            incoming = Slot(entry) if entry is not None else Dark()
+        # A pattern that dies before its turn is skipped.
+        if incoming is not None and not incoming.alive():
+            print("Playlist: skipping", incoming.entry["name"], "(exited)")
+            incoming.stop()
+            incoming, fade_start, retry_at = None, None, now + RETRY
+
+        # Start the transition when the current entry is over (or has died).
+        if (incoming is not None and not incoming.started()
+                and (current is None or now >= play_until or not current.alive())):
+            incoming.start()
+        if incoming is not None and incoming.started() and fade_start is None and incoming.ready():
+            fade_start = now
+
+        outgoing = current.frame() if current is not None else black
+        if fade_start is not None:
+            a = min((now - fade_start) / TRANSITION, 1.0) if TRANSITION > 0 else 1.0
+            np.multiply(outgoing, 1.0 - a, out=out)
+            out += a * incoming.frame()
+            if a >= 1.0:
+                if current is not None:
+                    current.stop()
+                print("Playlist: now playing", incoming.entry["name"])
+                current, incoming, fade_start = incoming, None, None
+                play_until = now + float(current.entry["duration"])
+        else:
+            out[:] = outgoing
+        # Frames on the bus are RGB; FrameWriter takes the strip's GRB order.
+        frame.show(out[:, STRIP_ORDER])
+
+        time.sleep(max(0.0, frame_time - (time.monotonic() - now)))
+
+except (KeyboardInterrupt, SystemExit):
+    pass
+finally:
+    for slot in (current, incoming):
+        if slot is not None:
+            slot.stop()
+    frame.clear()
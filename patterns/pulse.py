@@ -1,14 +1,21 @@
 """
 Galaxy Core Pulse effect on a 3D LED tree:
 Expanding radial ripples from a central LED, fading outward.
+With --period and --random-centers, overlapping ripples drop onto the tree
+like rain on a pond.
+Speed, thickness, color and interval can be changed live (control.py); they
+apply to ripples emitted from then on.
 """
 import os
 import time
-import math
 import argparse
+import numpy as np
 import pandas as pd
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness
+from led_frame import FrameWriter
+from ripples import RippleField
+from control import ControlChannel
 
 parser = argparse.ArgumentParser(description="Galaxy Core Pulse effect on 3D LED tree")
 parser.add_argument("--center", type=int, default=None,
@@ -21,24 +28,40 @@ parser.add_argument("--thickness", type=float, default=0.1,
                     help="Pulse thickness as fraction of max distance (0-1)")
 parser.add_argument("--color", nargs=3, type=int, default=[255,255,255],
                     metavar=('R','G','B'), help="Base RGB color for the pulse")
+parser.add_argument("--period", type=float, default=None,
+                    help="Seconds between new ripples (default: one ring at a time)")
+parser.add_argument("--random-centers", action="store_true",
+                    help="Start each ripple at a random LED")
+parser.add_argument("--random-colors", action="store_true",
+                    help="Give each ripple a random color instead of --color")
+parser.add_argument("--blend", choices=["max", "add"], default="max",
+                    help="How overlapping ripples combine")
+parser.add_argument("--max-ripples", type=int, default=16,
+                    help="Maximum number of simultaneous ripples")
 args = parser.parse_args()
+if args.period is not None and not args.period > 0:
+    parser.error("--period must be positive")
 
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
 df         = pd.read_csv(COORDS_CSV)
-positions  = df[['X','Y','Z']].values.tolist()
+positions  = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT  = len(positions)
 
 if args.center is None:
-    centroid = [sum(c)/LED_COUNT for c in zip(*positions)]
-    center_idx = min(range(LED_COUNT), key=lambda i: math.dist(positions[i], centroid))
+    centroid = positions.mean(axis=0)
+    center_idx = int(np.argmin(np.linalg.norm(positions - centroid, axis=1)))
 else:
     center_idx = args.center
-center_pos = positions[center_idx]
 
-distances = [math.dist(center_pos, pos) for pos in positions]
-max_dist = max(distances)
+max_dist  = np.linalg.norm(positions - positions[center_idx], axis=1).max()
 thickness = args.thickness * max_dist
+period    = args.period or (max_dist + thickness) / args.speed
+
+if args.random_centers:
+    field = RippleField(positions, capacity=args.max_ripples)
+else:
+    field = RippleField(positions, centers=[center_idx], capacity=args.max_ripples)
 
 LED_PIN        = 18
 LED_FREQ_HZ    = 800000
@@ -52,34 +75,30 @@ strip = PixelStrip(
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
 strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
+control = ControlChannel(args)
 
-def clear_strip():
-    """Turn off all LEDs."""
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0,0,0))
-
-base_r, base_g, base_b = args.color
+def ripple_color():
+    """Color for the next ripple."""
+    if args.random_colors:
+        return np.random.randint(0, 256, 3)
+    return args.color
 
 start_time = time.perf_counter()
+next_emit = 0.0
 try:
     while True:
+        if control.poll() & {"speed", "thickness"}:
+            thickness = args.thickness * max_dist
+            period    = args.period or (max_dist + thickness) / args.speed
         t = time.perf_counter() - start_time
-        radius = (t * args.speed) % (max_dist + thickness)
-
-        for i, d in enumerate(distances):
-            diff = abs(d - radius)
-            if diff <= thickness:
-                factor = 1 - (diff / thickness)
-                r = int(base_r * factor)
-                g = int(base_g * factor)
-                b = int(base_b * factor)
-            else:
-                r = g = b = 0
-            strip.setPixelColor(i, Color(r, g, b))
+        while next_emit <= t:
+            field.emit(next_emit, args.speed, thickness, ripple_color(),
+                       center=None if args.random_centers else 0)
+            next_emit += period
 
-        strip.show()
+        frame.show(field.render(t, args.blend))
         time.sleep(args.interval)
 
 except KeyboardInterrupt:
-    clear_strip()
-    strip.show()
+    frame.clear()
@@ -0,0 +1,74 @@
+"""
+Vectorized ripple engine for expanding-ring effects on a 3D LED tree.
+
+Active ripples live in small fixed-size arrays (center, birth time, speed,
+thickness, color). Distances from every candidate center to every LED are
+precomputed once, so a frame is one broadcasted falloff over
+(ripples x LEDs) followed by a max or additive reduction.
+"""
+import numpy as np
+
+
+class RippleField:
+    """
+    Pool of expanding rings over a fixed set of LED positions.
+
+    positions: (N, 3) array of LED coordinates.
+    centers:   LED indices ripples may start from (default: every LED).
+    capacity:  maximum number of simultaneous ripples; emitting into a full
+               pool replaces the oldest ripple.
+    """
+
+    def __init__(self, positions, centers=None, capacity=16):
+        positions = np.asarray(positions, dtype=np.float32)
+        if centers is None:
+            centers = np.arange(len(positions))
+        self.centers   = np.asarray(centers, dtype=np.intp)
+        self.dist      = np.linalg.norm(
+            positions[self.centers][:, None, :] - positions[None, :, :], axis=2
+        )
+        self.reach     = self.dist.max(axis=1)
+        self.led_count = len(positions)
+
+        self.center    = np.zeros(capacity, dtype=np.intp)
+        self.birth     = np.zeros(capacity)
+        self.speed     = np.zeros(capacity, dtype=np.float32)
+        self.thickness = np.ones(capacity, dtype=np.float32)
+        self.color     = np.zeros((capacity, 3), dtype=np.float32)
+        self.active    = np.zeros(capacity, dtype=bool)
+
+    def emit(self, t, speed, thickness, color, center=None, rng=np.random):
+        """
+        Start a ripple at time t. `center` is a position in `centers`
+        (default: a random one).
+        """
+        free = np.flatnonzero(~self.active)
+        slot = free[0] if len(free) else int(np.argmin(self.birth))
+        if center is None:
+            center = rng.randint(len(self.centers))
+        self.center[slot]    = center
+        self.birth[slot]     = t
+        self.speed[slot]     = speed
+        self.thickness[slot] = max(thickness, 1e-6)
+        self.color[slot]     = color
+        self.active[slot]    = True
+
+    def render(self, t, blend="max"):
+        """
+        Evaluate all active ripples at time t and return an (N, 3) float
+        RGB frame. blend is "max" (brightest ring wins) or "add".
+        """
+        act = np.flatnonzero(self.active)
+        radius = (t - self.birth[act]) * self.speed[act]
+        done = radius > self.reach[self.center[act]] + self.thickness[act]
+        self.active[act[done]] = False
+        act, radius = act[~done], radius[~done]
+        if len(act) == 0:
+            return np.zeros((self.led_count, 3), dtype=np.float32)
+
+        diff = np.abs(self.dist[self.center[act]] - radius[:, None])
+        falloff = np.clip(1.0 - diff / self.thickness[act, None], 0.0, 1.0)
+        layers = falloff[:, :, None] * self.color[act, None, :]
+        if blend == "add":
+            return np.minimum(layers.sum(axis=0), 255.0)
+        return layers.max(axis=0)
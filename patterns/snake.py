@@ -1,11 +1,11 @@
 import os
 import time
 import random
-import math
 import argparse
 import pandas as pd
 from rpi_ws281x import PixelStrip, Color
 import ambient_brightness
+from spatial_index import SpatialIndex
 
 parser = argparse.ArgumentParser(description="Multi‑snake effect on 3D LED tree")
 parser.add_argument("-n", "--num-snakes", type=int, default=1,
@@ -52,11 +52,7 @@ def clear_strip():
     for i in range(LED_COUNT):
         strip.setPixelColor(i, Color(0, 0, 0))
 
-dist_matrix = []
-for i, p in enumerate(positions):
-    dists = [(j, math.dist(p, q)) for j, q in enumerate(positions) if j != i]
-    dists.sort(key=lambda x: x[1])
-    dist_matrix.append([idx for idx, _ in dists[:NEIGHBORS_K]])
+dist_matrix = SpatialIndex.from_csv(COORDS_CSV).neighbors(NEIGHBORS_K).tolist()
 
 snakes = []
 colors = []
@@ -0,0 +1,168 @@
+"""
+Spatial index over the LED geometry for batched nearest/radius queries.
+
+Radius queries go through a uniform voxel grid (LEDs sorted by cell, so a
+query only touches the cells its sphere overlaps). Nearest and k-nearest
+queries use blocked squared-distance matrices, which on trees of a few
+thousand LEDs beat any tree walk done from Python. All queries take an
+(M, 3) array of points and return NumPy index arrays.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+_index_cache = {}
+
+
+class SpatialIndex:
+    """
+    Query structure over an (N, 3) array of LED positions.
+
+    cell_size: voxel edge length for radius queries (default: twice the
+               mean nearest-neighbour spacing).
+    """
+
+    BLOCK = 4096   # query rows per distance block
+
+    def __init__(self, positions, cell_size=None):
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.sq_norms  = np.einsum('ij,ij->i', self.positions, self.positions)
+        self._neighbors = {}
+        self._lower = None
+
+        if cell_size is None:
+            if len(self.positions) > 1:
+                spacing = np.sqrt(self.knn(self.positions, 2, return_sq_dist=True)[1][:, 1]).mean()
+            else:
+                spacing = 1.0
+            cell_size = 2.0 * spacing if spacing > 0 else 1.0
+        self.cell_size = float(cell_size)
+        self.origin    = self.positions.min(axis=0)
+        cells          = self._cell_of(self.positions)
+        self.dims      = cells.max(axis=0) + 1
+        keys           = self._key(cells)
+        self.order     = np.argsort(keys, kind='stable')
+        self.keys      = keys[self.order]
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        """Build (or reuse) the index for a coordinates CSV."""
+        path = os.path.abspath(csv_file)
+        stamp = (path, os.path.getmtime(path))
+        if stamp not in _index_cache:
+            df = pd.read_csv(path)
+            _index_cache[stamp] = cls(df[['X','Y','Z']].to_numpy(dtype=float))
+        return _index_cache[stamp]
+
+    def _cell_of(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _key(self, cells):
+        return (cells[:, 0] * self.dims[1] + cells[:, 1]) * self.dims[2] + cells[:, 2]
+
+    def _sq_dist(self, points):
+        """(M, N) squared distances from points to every LED."""
+        p_sq = np.einsum('ij,ij->i', points, points)
+        d = p_sq[:, None] - 2.0 * points @ self.positions.T + self.sq_norms[None, :]
+        return np.maximum(d, 0.0, out=d)
+
+    def nearest(self, points):
+        """Index of the closest LED to each of the (M, 3) points."""
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        out = np.empty(len(points), dtype=np.intp)
+        for s in range(0, len(points), self.BLOCK):
+            out[s:s + self.BLOCK] = self._sq_dist(points[s:s + self.BLOCK]).argmin(axis=1)
+        return out
+
+    def knn(self, points, k, return_sq_dist=False):
+        """
+        Indices of the k nearest LEDs to each point, nearest first, shape
+        (M, k). With return_sq_dist, also returns the matching squared
+        distances.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        k = min(k, len(self.positions))
+        idx = np.empty((len(points), k), dtype=np.intp)
+        dist = np.empty((len(points), k))
+        for s in range(0, len(points), self.BLOCK):
+            d = self._sq_dist(points[s:s + self.BLOCK])
+            part = np.argpartition(d, k - 1, axis=1)[:, :k]
+            part_d = np.take_along_axis(d, part, axis=1)
+            order = np.argsort(part_d, axis=1)
+            idx[s:s + self.BLOCK] = np.take_along_axis(part, order, axis=1)
+            dist[s:s + self.BLOCK] = np.take_along_axis(part_d, order, axis=1)
+        if return_sq_dist:
+            return idx, dist
+        return idx
+
+    def neighbors(self, k):
+        """(N, k) nearest other LEDs for every LED, cached per k."""
+        if k not in self._neighbors:
+            idx = self.knn(self.positions, k + 1)
+            # drop each LED itself, even if it ties with a duplicate position
+            others = np.argsort(idx == np.arange(len(idx))[:, None], axis=1, kind='stable')
+            self._neighbors[k] = np.take_along_axis(idx, others, axis=1)[:, :k]
+        return self._neighbors[k]
+
+    def lower_neighbors(self):
+        """
+        For every LED, the index of the closest LED strictly below it in Z
+        (-1 for the lowest LEDs). Computed once per index.
+        """
+        if self._lower is None:
+            z = self.positions[:, 2]
+            lower = np.full(len(z), -1, dtype=np.intp)
+            for s in range(0, len(z), self.BLOCK):
+                d = self._sq_dist(self.positions[s:s + self.BLOCK])
+                d[z[None, :] >= z[s:s + self.BLOCK, None]] = np.inf
+                best = d.argmin(axis=1)
+                has = np.isfinite(d[np.arange(len(best)), best])
+                lower[s:s + self.BLOCK][has] = best[has]
+            self._lower = lower
+        return self._lower
+
+    def within_radius(self, points, radius):
+        """
+        All (point, LED) pairs at most `radius` apart.
+        Returns (query_idx, led_idx, distance) arrays of equal length.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        span = int(np.ceil(radius / self.cell_size))
+        if (2 * span + 1) ** 3 >= np.prod(self.dims):
+            return self._within_radius_dense(points, radius)
+        rng = np.arange(-span, span + 1)
+        offsets = np.stack(np.meshgrid(rng, rng, rng, indexing='ij'), axis=-1).reshape(-1, 3)
+
+        cells = self._cell_of(points)[:, None, :] + offsets[None, :, :]
+        valid = np.all((cells >= 0) & (cells < self.dims), axis=2)
+        query = np.broadcast_to(np.arange(len(points))[:, None], valid.shape)[valid]
+        keys = self._key(cells[valid])
+
+        start = np.searchsorted(self.keys, keys, side='left')
+        count = np.searchsorted(self.keys, keys, side='right') - start
+        hit = count > 0
+        query, start, count = query[hit], start[hit], count[hit]
+
+        total = int(count.sum())
+        first = np.repeat(np.cumsum(count) - count, count)
+        slot = np.arange(total) - first + np.repeat(start, count)
+        q_idx = np.repeat(query, count)
+        led_idx = self.order[slot]
+
+        dist = np.linalg.norm(self.positions[led_idx] - points[q_idx], axis=1)
+        keep = dist <= radius
+        return q_idx[keep], led_idx[keep], dist[keep]
+
+    def _within_radius_dense(self, points, radius):
+        """within_radius for spheres that cover most of the grid anyway."""
+        q_parts, l_parts, d_parts = [], [], []
+        for s in range(0, len(points), self.BLOCK):
+            d = self._sq_dist(points[s:s + self.BLOCK])
+            q, l = np.nonzero(d <= radius * radius)
+            q_parts.append(q + s)
+            l_parts.append(l)
+            d_parts.append(np.sqrt(d[q, l]))
+        if not q_parts:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty.copy(), np.zeros(0, dtype=np.float64)
+        return np.concatenate(q_parts), np.concatenate(l_parts), np.concatenate(d_parts)
@@ -0,0 +1,131 @@
+"""
+Palette spiral renderer shared by spiral_themes.py and the legacy spiral
+animations.
+
+Each LED's spiral phase theta + z_norm * spiral_factor is static, so it is
+computed once and stored in color-table units. A frame is then an add, a
+modulo and a gather from a precomputed color table: one table per team theme
+(gamma corrected, in the GRB order the strip expects) or a rainbow hue ramp.
+"""
+import math
+import numpy as np
+
+TABLE_SIZE = 1024
+
+# Color palettes in GRB order
+THEMES = {
+    'eagles': [
+        (76, 0, 84),     # Midnight Green
+        (106, 4, 56),    # Green
+        (96, 96, 98),    # Silver
+        (255, 255, 255), # White
+        (187, 76, 23)    # Kelly Green
+    ],
+    'italian': [
+        (140, 0, 69),    # Green
+        (33, 205, 42),   # Red
+        (255, 255, 255)  # White
+    ],
+    'gwu': [
+        (57, 0, 77),     # Pantone 302
+        (153, 168, 129), # Pantone 7503
+        (255, 255, 255)  # White
+    ],
+    'christmas': [
+        (50, 1, 32),     # Evergreen
+        (34, 178, 34),   # Holly Red
+        (255, 255, 255), # Snow White
+        (215, 255, 0)    # Gold
+    ],
+    'rustic': [
+        (77, 38, 54),    # Deep Pine
+        (31, 145, 39),   # Cranberry
+        (210, 234, 172), # Warm Beige
+        (115, 184, 51)   # Copper
+    ],
+    'spartans': [
+        (255, 255, 255), # White
+        (144, 30, 255),  # rgb(30,144,255) => GRB
+        (215, 255, 0)    # rgb(255,215,0) => GRB
+    ],
+    'cherry': [
+        (255, 255, 255), # White
+        (182, 255, 193), # Light Pink
+        (105, 255, 180)  # Deep Pink
+    ],
+    'aussie': [
+        (0, 128, 128),   # Purple (RGB(128,0,128) => GRB(0,128,128))
+        (0, 75, 130),    # Dark Purple (RGB(75,0,130) => GRB(0,75,130))
+        (51, 102, 153),  # Medium Purple (RGB(102,51,153) => GRB(51,102,153))
+        (165, 255, 0),   # Orange (RGB(255,165,0) => GRB(165,255,0))
+        (255, 255, 0),   # Yellow
+        (0, 0, 255)      # Blue
+    ],
+    'northern': [
+        (255, 0, 120),   # Aurora Green
+        (50, 0, 255),    # Arctic Blue
+        (128, 0, 255),   # Electric Purple
+        (180, 0, 80),    # Soft Teal
+        (0, 0, 180),     # Midnight Sky
+        (100, 0, 200),   # Fading Violet
+        (80, 0, 200)     # Plasma Pink
+    ],
+    'sixers': [
+        (107, 0, 182),   # Blue
+        (23, 237, 76),   # Red
+        (43, 0, 92),     # Navy
+        (206, 196, 212)  # Silver
+    ],
+}
+
+
+def theme_table(team, size=TABLE_SIZE, gamma=0.5):
+    """
+    (size, 3) table mapping spiral phase to the team's discrete colors,
+    with gamma correction applied once. Unknown teams fall back to 'gwu'.
+    """
+    colors = np.array(THEMES.get(team.lower(), THEMES['gwu']), dtype=np.float64)
+    corrected = ((colors / 255.0) ** (1.0 / gamma) * 255).astype(np.int64)
+    slot = (np.arange(size) * len(colors)) // size
+    return corrected[slot]
+
+
+def hue_ramp(size=TABLE_SIZE):
+    """(size, 3) RGB table of fully saturated hues from 0 up to (not incl.) 1."""
+    h = np.arange(size) / size * 6.0
+    sector = h.astype(np.int64) % 6
+    f = h - np.floor(h)
+    one, q, t, zero = np.ones(size), 1.0 - f, f, np.zeros(size)
+    r = np.choose(sector, [one, q, zero, zero, t, one])
+    g = np.choose(sector, [t, one, one, q, zero, zero])
+    b = np.choose(sector, [zero, zero, t, one, one, q])
+    return (np.stack([r, g, b], axis=1) * 255).astype(np.int64)
+
+
+class SpiralPalette:
+    """
+    Precomputed spiral phase for a set of LED positions.
+
+    positions:     (N, 3) array of LED coordinates.
+    spiral_factor: twist in radians over the tree's height.
+    size:          color table length the phase is expressed in.
+    """
+
+    def __init__(self, positions, spiral_factor=4*math.pi, size=TABLE_SIZE):
+        positions = np.asarray(positions, dtype=float)
+        lo, hi = positions.min(axis=0), positions.max(axis=0)
+        x_center = (lo[0] + hi[0]) / 2.0
+        y_center = (lo[1] + hi[1]) / 2.0
+        theta  = np.arctan2(positions[:, 1] - y_center, positions[:, 0] - x_center)
+        norm_z = (positions[:, 2] - lo[2]) / (hi[2] - lo[2]) if hi[2] > lo[2] else 0.0
+        phase  = theta + norm_z * spiral_factor
+        self.size = size
+        self.base = phase * (size / (2 * math.pi))
+
+    def render(self, table, offset):
+        """
+        Colors for every LED with the spiral rotated by `offset` radians.
+        `table` must have `size` rows (theme_table / hue_ramp).
+        """
+        idx = np.floor(self.base + offset * (self.size / (2 * math.pi))).astype(np.int64) % self.size
+        return table[idx]
@@ -0,0 +1,72 @@
+"""
+Palette Spiral effect on a 3D LED tree:
+Team-color (or rainbow) spirals rotating around the tree.
+Theme, speed, twist and interval can be changed live (control.py).
+"""
+import os
+import time
+import math
+import argparse
+import pandas as pd
+from rpi_ws281x import PixelStrip
+import ambient_brightness
+from led_frame import FrameWriter
+from spiral_palette import SpiralPalette, THEMES, theme_table, hue_ramp
+from control import ControlChannel
+
+parser = argparse.ArgumentParser(description="Palette spiral on 3D LED tree")
+parser.add_argument("--theme", choices=sorted(THEMES) + ["rainbow"], default="gwu",
+                    help="Team color theme, or 'rainbow' for a full hue spiral")
+parser.add_argument("--interval", type=float, default=0.05,
+                    help="Seconds between frames")
+parser.add_argument("--speed", type=float, default=1.5,
+                    help="Spiral rotation speed (radians per second)")
+parser.add_argument("--spiral-factor", type=float, default=4*math.pi,
+                    help="Twist in radians from bottom to top of the tree")
+parser.add_argument("--duration", type=float, default=0.0,
+                    help="Seconds to run (0 = until stopped)")
+args = parser.parse_args()
+
+BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
+COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
+df         = pd.read_csv(COORDS_CSV)
+positions  = df[['X','Y','Z']].to_numpy(dtype=float)
+LED_COUNT  = len(positions)
+
+spiral = SpiralPalette(positions, args.spiral_factor)
+table  = hue_ramp() if args.theme == "rainbow" else theme_table(args.theme)
+
+LED_PIN        = 18
+LED_FREQ_HZ    = 800000
+LED_DMA        = 10
+LED_BRIGHTNESS = 125
+LED_INVERT     = False
+LED_CHANNEL    = 0
+
+strip = PixelStrip(
+    LED_COUNT, LED_PIN, LED_FREQ_HZ,
+    LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
+)
+strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
+control = ControlChannel(args)
+
+# The rotation accumulates speed * dt, so speed changes don't make it jump.
+angle = 0.0
+start = last = time.time()
+try:
+    while not args.duration or time.time() - start < args.duration:
+        changed = control.poll()
+        if "theme" in changed:
+            table = hue_ramp() if args.theme == "rainbow" else theme_table(args.theme)
+        if "spiral_factor" in changed:
+            spiral = SpiralPalette(positions, args.spiral_factor)
+        now = time.time()
+        angle += args.speed * (now - last)
+        last = now
+        frame.show(spiral.render(table, angle))
+        time.sleep(args.interval)
+
+except KeyboardInterrupt:
+    pass
+frame.clear()
@@ -0,0 +1,128 @@
+"""
+Generic sweep engine: beams travelling through a scalar field over the tree.
+
+A field assigns every LED a coordinate in [0, 1] (height, projection onto an
+axis, radial distance, angle, geodesic distance along the LED graph, ...).
+It is computed once; a frame then evaluates every beam's falloff profile
+against that field in one vectorized pass.
+"""
+import heapq
+import numpy as np
+
+PROFILES = ("hard", "linear", "cosine", "gaussian")
+
+
+def _normalize(values):
+    values = np.asarray(values, dtype=float)
+    rng = values.max() - values.min()
+    return (values - values.min()) / rng if rng > 0 else np.zeros_like(values)
+
+
+def axis_field(positions, axis):
+    """Projection onto an arbitrary (x, y, z) direction."""
+    axis = np.asarray(axis, dtype=float)
+    norm = np.linalg.norm(axis)
+    if not norm > 0:
+        raise ValueError("sweep axis must be a non-zero vector")
+    return _normalize(np.asarray(positions) @ (axis / norm))
+
+
+def height_field(positions):
+    """Normalized Z."""
+    return _normalize(np.asarray(positions)[:, 2])
+
+
+def diagonal_field(positions):
+    """Mean of normalized X and normalized Z (the legacy 'diagonal' sweep)."""
+    positions = np.asarray(positions)
+    return (_normalize(positions[:, 0]) + _normalize(positions[:, 2])) / 2
+
+
+def radial_field(positions):
+    """Horizontal distance from the XY centroid."""
+    positions = np.asarray(positions)
+    center = positions[:, :2].mean(axis=0)
+    r = np.linalg.norm(positions[:, :2] - center, axis=1)
+    return r / r.max() if r.max() > 0 else r
+
+
+def angle_field(positions):
+    """Angle around the XY centroid as a fraction of a turn (periodic)."""
+    positions = np.asarray(positions)
+    cx, cy = positions[:, :2].mean(axis=0)
+    theta = np.arctan2(positions[:, 1] - cy, positions[:, 0] - cx)
+    return (theta / (2 * np.pi)) % 1.0
+
+
+def geodesic_field(index, source, k=6):
+    """
+    Shortest-path distance from LED `source` over the symmetric k-nearest-
+    neighbour graph of a SpatialIndex, so sweeps follow the strand of LEDs
+    rather than cutting through empty space. Unreachable LEDs get 1.
+    """
+    nbrs = index.neighbors(k)
+    pos = index.positions
+    edges = [set() for _ in range(len(pos))]
+    for i, row in enumerate(nbrs.tolist()):
+        for j in row:
+            edges[i].add(j)
+            edges[j].add(i)
+
+    dist = np.full(len(pos), np.inf)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, i = heapq.heappop(heap)
+        if d > dist[i]:
+            continue
+        for j in edges[i]:
+            nd = d + float(np.linalg.norm(pos[i] - pos[j]))
+            if nd < dist[j]:
+                dist[j] = nd
+                heapq.heappush(heap, (nd, j))
+
+    reached = np.isfinite(dist)
+    out = np.ones(len(pos))
+    out[reached] = _normalize(dist[reached])
+    return out
+
+
+class SweepEngine:
+    """
+    Renders beams over a precomputed field.
+
+    field:    (N,) per-LED coordinate in [0, 1].
+    periodic: treat the field as wrapping around (e.g. angle_field).
+    """
+
+    def __init__(self, field, periodic=False):
+        self.field = np.asarray(field, dtype=np.float32)
+        self.periodic = periodic
+
+    def intensity(self, centers, width, profile="hard"):
+        """
+        (B, N) beam weights for beams centred at `centers` (field units),
+        each `width` wide in total.
+        """
+        centers = np.atleast_1d(np.asarray(centers, dtype=np.float32))
+        d = np.abs(self.field[None, :] - centers[:, None])
+        if self.periodic:
+            d = np.minimum(d % 1.0, 1.0 - d % 1.0)
+        u = d / max(width / 2.0, 1e-6)
+        if profile == "hard":
+            return (u <= 1.0).astype(np.float32)
+        if profile == "cosine":
+            return 0.5 * (1 + np.cos(np.pi * np.minimum(u, 1.0)))
+        if profile == "gaussian":
+            return np.exp(-2.0 * u * u)
+        return np.clip(1.0 - u, 0.0, 1.0)
+
+    def render(self, centers, width, colors, profile="hard"):
+        """
+        (N, 3) RGB frame; `colors` is one RGB row per beam (or a single
+        row shared by all). Overlapping beams keep the brightest channel.
+        """
+        w = self.intensity(centers, width, profile)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.float32).reshape(-1, 3),
+                                 (len(w), 3))
+        return (w[:, :, None] * colors[:, None, :]).max(axis=0)
@@ -1,14 +1,18 @@
 """
 Helical vortex/spiral twister effect on a 3D LED tree.
 LEDs light up in a rotating helix that ascends or descends continuously.
+Speed, direction, turns, range and interval can be changed live (control.py).
 """
 import os
 import time
 import math
 import argparse
 import pandas as pd
-from rpi_ws281x import PixelStrip, Color
+from rpi_ws281x import PixelStrip
 import ambient_brightness
+from helix_field import HelixField, make_ramp
+from led_frame import FrameWriter
+from control import ControlChannel
 
 parser = argparse.ArgumentParser(description="Vortex/Spiral Twister effect on 3D LED tree")
 parser.add_argument("-i", "--interval", type=float, default=0.05,
@@ -21,7 +25,13 @@ parser.add_argument("--reverse", action="store_true",
                     help="Rotate in reverse direction")
 parser.add_argument("--range", type=float, default=1.0,
                     help="Fractional Z range to animate (0–1), default full height")
+parser.add_argument("--ramp", nargs="+", type=int, default=[0,0,0, 255,255,255], metavar="RGB",
+                    help="Color ramp stops as R G B triplets, dark to bright (default black to white)")
+parser.add_argument("--lut", type=int, default=0,
+                    help="Sine lookup table size (0 = exact sine)")
 args = parser.parse_args()
+if len(args.ramp) % 3:
+    parser.error("--ramp takes R G B triplets")
 
 INTERVAL        = args.interval
 RPS             = args.rotations_per_sec
@@ -32,22 +42,11 @@ Z_RANGE_FRACTION= max(0.0, min(1.0, args.range))
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
 COORDS_CSV = os.path.join(BASE_DIR, 'coordinates.csv')
 df         = pd.read_csv(COORDS_CSV)
-positions  = df[['X','Y','Z']].values.tolist()
+positions  = df[['X','Y','Z']].to_numpy(dtype=float)
 LED_COUNT  = len(positions)
 
-tree_zs    = [pos[2] for pos in positions]
-tree_z_min = min(tree_zs)
-tree_z_max = max(tree_zs)
-tree_height= tree_z_max - tree_z_min
-
-led_theta = []
-led_znorm = []
-for (x, y, z) in positions:
-    theta = math.atan2(y, x) 
-    z_norm = (z - tree_z_min) / tree_height if tree_height>0 else 0.0
-    z_norm = z_norm * Z_RANGE_FRACTION
-    led_theta.append(theta)
-    led_znorm.append(z_norm)
+field      = HelixField(positions, HELIX_TURNS, Z_RANGE_FRACTION, lut_size=args.lut)
+RAMP       = make_ramp(args.ramp)
 
 LED_PIN        = 18
 LED_FREQ_HZ    = 800000
@@ -61,26 +60,28 @@ strip = PixelStrip(
     LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL
 )
 strip.begin()
+frame = FrameWriter(strip, LED_COUNT)
+control = ControlChannel(args)
 
-def clear_strip():
-    for i in range(LED_COUNT):
-        strip.setPixelColor(i, Color(0, 0, 0))
-
-start_time = time.perf_counter()
+# The spin phase accumulates speed * dt, so speed changes don't make it jump.
+spin_phase = 0.0
+last = time.perf_counter()
 try:
     while True:
-        now = time.perf_counter() - start_time
-        spin_phase = REVERSE * 2*math.pi * RPS * now
-        for i in range(LED_COUNT):
-            theta = led_theta[i]
-            zf    = led_znorm[i]
-            phase = theta + spin_phase + 2*math.pi * HELIX_TURNS * (1 - zf)
-            intensity = 0.5 * (1 + math.sin(phase))
-            bval = int(max(0, min(1, intensity)) * 255)
-            strip.setPixelColor(i, Color(bval, bval, bval))
-        strip.show()
+        changed = control.poll()
+        if changed:
+            INTERVAL = args.interval
+            RPS      = args.rotations_per_sec
+            REVERSE  = -1.0 if args.reverse else 1.0
+            if changed & {"turns", "range"}:
+                HELIX_TURNS      = args.turns
+                Z_RANGE_FRACTION = max(0.0, min(1.0, args.range))
+                field            = HelixField(positions, HELIX_TURNS, Z_RANGE_FRACTION, lut_size=args.lut)
+        now = time.perf_counter()
+        spin_phase += REVERSE * 2*math.pi * RPS * (now - last)
+        last = now
+        frame.show(field.ramp(spin_phase, RAMP))
         time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
-    clear_strip()
-    strip.show()
+    frame.clear()